@@ -1,5 +1,8 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox
 import threading
 import sys
 import os
@@ -7,18 +10,13 @@ import os
 # Agregar el directorio src al path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.real_data_collector import RealDataCollector
-from src.advanced_ai_analyzer import AdvancedAIAnalyzer
-from src.position_manager import PositionManager
-from src.position_manager_window import PositionManagerWindow
-from src.decision_engine import DecisionEngine
+# Los módulos de src (requests, numpy, colector...) se importan al usar cada componente por primera vez
+from src import registry
 
+IMPORTS_FINISHED = time.perf_counter()
 
 
 
-class Database:
-    def __init__(self):
-        pass
 
 class EducationalWindow:
     def __init__(self, parent):
@@ -512,16 +510,70 @@ class CryptoStockAnalyzerPro:
         self.root.title("🚀 TRADING ASSISTANT PRO - Datos Reales + Alertas + Educación")
         self.root.geometry("1400x900")
         
-        # Inicializar componentes PRO
-        self.data_collector = RealDataCollector()
-        self.ai_analyzer = AdvancedAIAnalyzer()
-        self.decision_engine = DecisionEngine()
-        self.position_manager = PositionManager()
-        self.database = Database()
+        # Componentes PRO: el registro los construye la primera vez que se usan
+        self.startup_timings = {'imports': IMPORTS_FINISHED - STARTUP_STARTED}
+        self.alert_monitor = None
         
+        ui_started = time.perf_counter()
         self.setup_ui()
+        self.startup_timings['setup_ui'] = time.perf_counter() - ui_started
+        
+        # La watchlist (que necesita el colector) se carga cuando la ventana ya está visible
+        self.root.after_idle(self.on_first_window)
+    
+    def on_first_window(self):
+        """Registrar el tiempo hasta la primera ventana, cargar la watchlist y, si está activada, la compactación"""
+        self.root.update_idletasks()
+        self.startup_timings['first_window'] = time.perf_counter() - STARTUP_STARTED
+        self.print_startup_report()
         self.load_saved_watchlist()
         
+        # La compactación borra instantáneas antiguas: sólo en segundo plano si se activa en la configuración
+        settings = self.data_collector.watchlist_config.get('settings', {})
+        if settings.get('background_compaction', False):
+            self.snapshot_compactor.start()
+    
+    def shutdown(self):
+        """Al cerrar la ventana: detener los hilos de fondo y cerrar las conexiones HTTP del pool"""
+        if self.alert_monitor is not None:
+            self.alert_monitor.stop()
+        registry.close_components()
+    
+    def print_startup_report(self):
+        """Informe de tiempos de arranque (segundos)"""
+        report = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.startup_timings.items())
+        print(f"⏱️ Startup: {report}")
+    
+    # Instancias compartidas del registro: la ventana de posiciones y el motor de decisiones
+    # usan el mismo PositionManager, y el analizador el mismo colector
+    @property
+    def data_collector(self):
+        return registry.get_data_collector()
+    
+    @property
+    def ai_analyzer(self):
+        return registry.get_ai_analyzer()
+    
+    @property
+    def database(self):
+        return registry.get_database()
+    
+    @property
+    def position_manager(self):
+        return registry.get_position_manager()
+    
+    @property
+    def decision_engine(self):
+        return registry.get_decision_engine()
+    
+    @property
+    def pipeline(self):
+        return registry.get_pipeline()
+    
+    @property
+    def snapshot_compactor(self):
+        return registry.get_snapshot_compactor()
+        
     def setup_ui(self):
         # Frame principal
         main_frame = ttk.Frame(self.root, padding="10")
@@ -555,10 +607,13 @@ class CryptoStockAnalyzerPro:
                    command=self.get_price_recommendations).grid(row=2, column=0, pady=3, sticky="ew")
         ttk.Button(control_frame, text="🔔 Check Alerts", 
                    command=self.check_alerts).grid(row=3, column=0, pady=3, sticky="ew")
+        self.monitor_button = ttk.Button(control_frame, text="📡 Start Alert Monitor", 
+                                         command=self.toggle_alert_monitor)
+        self.monitor_button.grid(row=4, column=0, pady=3, sticky="ew")
         ttk.Button(control_frame, text="📊 Position Manager", 
-                   command=self.open_position_manager).grid(row=4, column=0, pady=3, sticky="ew")
+                   command=self.open_position_manager).grid(row=5, column=0, pady=3, sticky="ew")
         ttk.Button(control_frame, text="📚 Trading Education", 
-                   command=self.open_education, style='Accent.TButton').grid(row=5, column=0, pady=3, sticky="ew")
+                   command=self.open_education, style='Accent.TButton').grid(row=6, column=0, pady=3, sticky="ew")
         
         # Panel de Watchlist
         watchlist_frame = ttk.LabelFrame(left_frame, text="📋 My Watchlist", padding="10")
@@ -632,6 +687,7 @@ class CryptoStockAnalyzerPro:
         
     def open_position_manager(self):
         """Abrir ventana de gestión de posiciones"""
+        from src.position_manager_window import PositionManagerWindow
         position_window = PositionManagerWindow(
             self.root, 
             self.position_manager, 
@@ -672,7 +728,7 @@ class CryptoStockAnalyzerPro:
         """Diálogo para agregar activo a watchlist"""
         dialog = tk.Toplevel(self.root)
         dialog.title("Add to Watchlist")
-        dialog.geometry("400x300")
+        dialog.geometry("400x340")
         dialog.resizable(False, False)
         
         # Centrar el diálogo
@@ -696,15 +752,21 @@ class CryptoStockAnalyzerPro:
         sell_entry = ttk.Entry(dialog, width=30)
         sell_entry.grid(row=3, column=1, padx=10, pady=5)
         
+        ttk.Label(dialog, text="Type:").grid(row=4, column=0, padx=10, pady=5, sticky="w")
+        type_combo = ttk.Combobox(dialog, values=["auto", "crypto", "stock"], state="readonly", width=27)
+        type_combo.set("auto")
+        type_combo.grid(row=4, column=1, padx=10, pady=5)
+        
         def save_asset():
             try:
                 symbol = symbol_entry.get().strip().upper()
                 custom_name = name_entry.get().strip()
                 buy_price = float(buy_entry.get()) if buy_entry.get().strip() else None
                 sell_price = float(sell_entry.get()) if sell_entry.get().strip() else None
+                asset_type = None if type_combo.get() == "auto" else type_combo.get()
                 
                 if symbol:
-                    self.data_collector.add_to_watchlist(symbol, custom_name, buy_price, sell_price)
+                    self.data_collector.add_to_watchlist(symbol, custom_name, buy_price, sell_price, asset_type)
                     self.load_saved_watchlist()
                     dialog.destroy()
                     messagebox.showinfo("Success", f"Added {symbol} to watchlist!")
@@ -717,7 +779,7 @@ class CryptoStockAnalyzerPro:
         
         # Botones
         button_frame = ttk.Frame(dialog)
-        button_frame.grid(row=4, column=0, columnspan=2, pady=20)
+        button_frame.grid(row=5, column=0, columnspan=2, pady=20)
         
         ttk.Button(button_frame, text="Save", command=save_asset).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
@@ -740,11 +802,13 @@ class CryptoStockAnalyzerPro:
                 self.start_progress()
                 self.update_status("Checking price alerts...", "blue")
                 
-                # Cargar datos actuales
+                # Símbolos de los campos más los de la watchlist
                 cryptos = [c.strip() for c in self.crypto_entry.get().split(',')]
                 stocks = [s.strip() for s in self.stock_entry.get().split(',')]
+                watchlist_cryptos, watchlist_stocks = self.data_collector.get_watchlist_symbols(cryptos, stocks)
                 
-                current_data = self.data_collector.update_all_data(cryptos, stocks)
+                # Sólo cotizaciones actuales: sin historial ni indicadores
+                current_data = self.data_collector.get_quotes(cryptos + watchlist_cryptos, stocks + watchlist_stocks)
                 
                 # Verificar alertas
                 alerts = self.data_collector.check_price_alerts(current_data)
@@ -762,12 +826,12 @@ class CryptoStockAnalyzerPro:
                         self.results_text.insert(tk.END, f"   Data Source: {alert['data_source']}\n")
                         self.results_text.insert(tk.END, "-"*40 + "\n\n")
                     
-                    self.update_status(f"Found {len(alerts)} active alerts!", "orange")
+                    self.update_status(f"Found {len(alerts)} active alerts! ({self.data_collector.last_quote_stats.get('total_time', 0):.2f}s)", "orange")
                 else:
                     self.results_text.insert(tk.END, "✅ No price alerts triggered.\n\n")
                     self.results_text.insert(tk.END, "Current prices are within your specified ranges.\n")
                     self.results_text.insert(tk.END, "Add more assets to watchlist or adjust alert prices.\n")
-                    self.update_status("No alerts triggered", "green")
+                    self.update_status(f"No alerts triggered ({self.data_collector.last_quote_stats.get('total_time', 0):.2f}s)", "green")
                 
             except Exception as e:
                 self.update_status(f"Error checking alerts: {str(e)}", "red")
@@ -777,6 +841,44 @@ class CryptoStockAnalyzerPro:
         
         threading.Thread(target=alerts_thread, daemon=True).start()
     
+    def toggle_alert_monitor(self):
+        """Arrancar o detener la vigilancia continua de alertas en segundo plano"""
+        if self.alert_monitor is not None and self.alert_monitor.is_running():
+            self.alert_monitor.stop()
+            self.monitor_button.config(text="📡 Start Alert Monitor")
+            self.update_status("Alert monitor stopped", "black")
+            return
+        
+        cryptos = [c.strip() for c in self.crypto_entry.get().split(',')]
+        stocks = [s.strip() for s in self.stock_entry.get().split(',')]
+        from src.alert_monitor import AlertMonitor
+        self.alert_monitor = AlertMonitor(self.data_collector, cryptos, stocks, interval=60)
+        self.alert_monitor.start()
+        self.monitor_button.config(text="⏹️ Stop Alert Monitor")
+        self.update_status("Alert monitor running (every 60s)", "blue")
+        self.root.after(1000, self.poll_alert_events)
+    
+    def poll_alert_events(self):
+        """Mostrar en la interfaz las alertas que el monitor dejó en su cola (hilo de Tk)"""
+        monitor = self.alert_monitor
+        if monitor is None:
+            return
+        
+        events = monitor.get_events()
+        if events:
+            self.results_text.insert(tk.END, f"\n📡 ALERT MONITOR - {len(events)} new alert(s)\n")
+            self.results_text.insert(tk.END, "="*50 + "\n")
+            for event in events:
+                self.results_text.insert(tk.END, f"⚠️ {event['message']}\n")
+                self.results_text.insert(tk.END, f"   Current Price: ${event['current_price']:.4f}\n")
+                self.results_text.insert(tk.END, f"   Triggered At: {event['triggered_at']}\n")
+                self.results_text.insert(tk.END, "-"*40 + "\n")
+            self.results_text.see(tk.END)
+            self.update_status(f"Alert monitor: {len(events)} new alert(s)", "orange")
+        
+        if monitor.is_running():
+            self.root.after(1000, self.poll_alert_events)
+    
     def get_price_recommendations(self):
         """Obtener recomendaciones de precios específicos"""
         def recommendations_thread():
@@ -788,13 +890,10 @@ class CryptoStockAnalyzerPro:
                 cryptos = [c.strip() for c in self.crypto_entry.get().split(',')]
                 stocks = [s.strip() for s in self.stock_entry.get().split(',')]
                 
-                current_data = self.data_collector.update_all_data(cryptos, stocks)
-                
-                # Ejecutar análisis avanzado
-                analysis_results = self.ai_analyzer.analyze_market()
-                
-                # Generar recomendaciones usando el motor de decisión avanzado
-                price_recommendations = self.decision_engine.get_recommendations()
+                # Datos, análisis y recomendaciones en una sola pasada
+                pipeline_result = self.pipeline.run(cryptos, stocks, include_recommendations=True)
+                current_data = pipeline_result['data']
+                price_recommendations = pipeline_result['recommendations']
                 
                 self.results_text.delete(1.0, tk.END)
                 self.results_text.insert(tk.END, "💰 PRICE RECOMMENDATIONS\n")
@@ -881,6 +980,18 @@ class CryptoStockAnalyzerPro:
                 self.results_text.insert(tk.END, f"   📈 Stocks: {', '.join(stocks)}\n")
                 self.results_text.insert(tk.END, f"   📊 Total Assets: {len(data)}\n\n")
                 
+                # Tiempos del refresco por proveedor
+                refresh_stats = self.data_collector.last_refresh_stats
+                if refresh_stats:
+                    self.results_text.insert(tk.END, f"⏱️ Refresh Time: {refresh_stats['total_time']:.2f}s ({refresh_stats['mode']})\n")
+                    for provider, stats in refresh_stats['providers'].items():
+                        self.results_text.insert(tk.END, f"   {provider}: {stats['wall_time']:.2f}s wall, {stats['requests']} requests, {stats['errors']} errors, {stats['throttled']} throttled\n")
+                        self.results_text.insert(tk.END, f"      connections: {stats['new_connections']} new, {stats['reused_connections']} reused (~{stats['connection_setup_saved']:.2f}s saved)\n")
+                    cache_stats = refresh_stats.get('cache', {})
+                    if cache_stats:
+                        self.results_text.insert(tk.END, f"   cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['revalidated']} revalidated, {cache_stats['stale']} stale\n")
+                    self.results_text.insert(tk.END, "\n")
+                
                 self.results_text.insert(tk.END, "📋 Current Market Data:\n")
                 self.results_text.insert(tk.END, "-"*40 + "\n")
                 
@@ -916,7 +1027,8 @@ class CryptoStockAnalyzerPro:
                 cryptos = [c.strip() for c in self.crypto_entry.get().split(',')]
                 stocks = [s.strip() for s in self.stock_entry.get().split(',')]
                 
-                current_data = self.data_collector.update_all_data(cryptos, stocks)
+                pipeline_result = self.pipeline.run(cryptos, stocks)
+                current_data = pipeline_result['data']
                 
                 if not current_data:
                     self.results_text.delete(1.0, tk.END)
@@ -926,8 +1038,8 @@ class CryptoStockAnalyzerPro:
                     self.stop_progress()
                     return
                 
-                # Ejecutar análisis avanzado
-                results = self.ai_analyzer.analyze_market()
+                # Análisis ya calculado sobre los datos en memoria
+                results = pipeline_result['analysis']
                 
                 self.results_text.delete(1.0, tk.END)
                 self.results_text.insert(tk.END, "🧠 ADVANCED MARKET ANALYSIS (1 Year + 1 Month Data)\n")
@@ -1024,6 +1136,7 @@ def main():
     root = tk.Tk()
     app = CryptoStockAnalyzerPro(root)
     root.mainloop()
+    app.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,239 @@
+import argparse
+import contextlib
+import json
+import sys
+import os
+import time
+
+# Agregar el directorio src al path (igual que app.py, pero sin importar Tkinter)
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def parse_symbols(value):
+    return [s.strip().upper() for s in (value or '').split(',') if s.strip()]
+
+
+def to_json(value):
+    """Convertir tipos de numpy y fechas para json.dumps"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def print_json(payload, compact=False, stream=None):
+    indent = None if compact else 2
+    print(json.dumps(payload, default=to_json, ensure_ascii=False, indent=indent), file=stream or sys.stdout)
+
+
+# Cada subcomando importa sólo los módulos que necesita
+
+def get_collector(save=True):
+    from src import registry
+    if not save:
+        # Sin base de datos: no se abre (ni se crea o migra) trading_data.db
+        from src.real_data_collector import RealDataCollector
+        registry.register_component('data_collector', RealDataCollector())
+    return registry.get_data_collector()
+
+
+def build_pipeline(collector, with_decisions=False, save=True):
+    from src import registry
+    from src.pipeline import AnalysisPipeline
+    
+    # Sin recomendaciones no hace falta cargar positions.json
+    decision_engine = registry.get_decision_engine() if with_decisions else None
+    # Con base de datos, el análisis y las recomendaciones se guardan en trading_data.db
+    database = registry.get_database() if save else None
+    return AnalysisPipeline(collector, registry.get_ai_analyzer(), decision_engine, database)
+
+
+def get_symbols(args, collector):
+    """Símbolos pedidos más los de la watchlist (si no se desactiva)"""
+    cryptos = parse_symbols(args.cryptos)
+    stocks = parse_symbols(args.stocks)
+    if not args.no_watchlist:
+        watchlist_cryptos, watchlist_stocks = collector.get_watchlist_symbols(cryptos, stocks)
+        cryptos += watchlist_cryptos
+        stocks += watchlist_stocks
+    return cryptos, stocks
+
+
+def cmd_update(args):
+    collector = get_collector()
+    cryptos, stocks = get_symbols(args, collector)
+    data = collector.update_all_data(cryptos, stocks, concurrent=not args.sequential)
+    return {
+        'data': {key: collector.summarize_asset(asset) for key, asset in data.items()},
+        'stats': collector.last_refresh_stats
+    }
+
+
+def cmd_analyze(args):
+    collector = get_collector(save=not args.no_save)
+    pipeline = build_pipeline(collector, save=not args.no_save)
+    if args.refresh:
+        cryptos, stocks = get_symbols(args, collector)
+        result = pipeline.run(cryptos, stocks)
+    else:
+        # Último resumen guardado: sin red
+        result = pipeline.process(collector.load_latest_summary())
+    return {'analysis': result['analysis']}
+
+
+def cmd_recommend(args):
+    collector = get_collector(save=not args.no_save)
+    pipeline = build_pipeline(collector, with_decisions=True, save=not args.no_save)
+    if args.refresh:
+        cryptos, stocks = get_symbols(args, collector)
+        result = pipeline.run(cryptos, stocks, include_recommendations=True)
+    else:
+        result = pipeline.process(collector.load_latest_summary(), include_recommendations=True)
+    return {'recommendations': result['recommendations']}
+
+
+def cmd_alerts(args):
+    # Las alertas sólo necesitan cotizaciones: sin base de datos
+    collector = get_collector(save=False)
+    cryptos = parse_symbols(args.cryptos)
+    stocks = parse_symbols(args.stocks)
+    
+    if args.watch:
+        # Servicio: una línea JSON por alerta nueva hasta Ctrl+C
+        from src.alert_monitor import AlertMonitor
+        
+        def emit(event):
+            print_json(event, compact=True, stream=args.output)
+            args.output.flush()
+        
+        monitor = AlertMonitor(collector, cryptos, stocks, interval=args.interval, callback=emit,
+                               confirmations=args.confirmations, cooldown=args.cooldown)
+        monitor.start()
+        try:
+            while monitor.is_running():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            monitor.stop()
+        return None
+    
+    watchlist_cryptos, watchlist_stocks = collector.get_watchlist_symbols(cryptos, stocks)
+    quotes = collector.get_quotes(cryptos + watchlist_cryptos, stocks + watchlist_stocks)
+    return {
+        'alerts': collector.check_price_alerts(quotes),
+        'stats': collector.last_quote_stats
+    }
+
+
+def cmd_add_alert(args):
+    collector = get_collector(save=False)
+    alert_id = collector.add_price_alert(args.symbol, args.type, args.price, args.name, args.asset_type)
+    return {'alert_id': alert_id, 'alert': collector.watchlist_config['alerts'][alert_id]}
+
+
+def cmd_compact(args):
+    from src import registry
+    
+    policy = {}
+    for name in ('keep_all_days', 'downsample_days', 'downsample_hours'):
+        if getattr(args, name) is not None:
+            policy[name] = getattr(args, name)
+    compactor = registry.get_snapshot_compactor()
+    compactor.set_policy(policy)
+    return {'stats': compactor.run_until_done()}
+
+
+def cmd_import(args):
+    from src import registry
+    from src.snapshot_importer import SnapshotImporter
+    
+    importer = SnapshotImporter(database=registry.get_database(), workers=args.workers)
+    return {'stats': importer.run(full=args.full)}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Crypto Stock Analyzer sin interfaz gráfica (salida JSON)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    def add_symbol_args(subparser):
+        subparser.add_argument('--cryptos', default='', help="Criptomonedas separadas por comas (BTC,ETH)")
+        subparser.add_argument('--stocks', default='', help="Acciones separadas por comas (AAPL,TSLA)")
+        subparser.add_argument('--no-watchlist', action='store_true', help="No añadir los símbolos de la watchlist")
+    
+    update_parser = subparsers.add_parser('update', help="Descargar datos e indicadores")
+    update_parser.add_argument('--compact', action='store_true', help="JSON en una sola línea")
+    add_symbol_args(update_parser)
+    update_parser.add_argument('--sequential', action='store_true', help="Sin peticiones concurrentes")
+    update_parser.set_defaults(func=cmd_update)
+    
+    analyze_parser = subparsers.add_parser('analyze', help="Análisis del último resumen guardado (se guarda en la base de datos)")
+    analyze_parser.add_argument('--compact', action='store_true', help="JSON en una sola línea")
+    add_symbol_args(analyze_parser)
+    analyze_parser.add_argument('--refresh', action='store_true', help="Actualizar datos antes de analizar")
+    analyze_parser.add_argument('--no-save', action='store_true', help="No abrir ni modificar la base de datos")
+    analyze_parser.set_defaults(func=cmd_analyze)
+    
+    recommend_parser = subparsers.add_parser('recommend', help="Recomendaciones de compra/venta (se guardan en la base de datos)")
+    recommend_parser.add_argument('--compact', action='store_true', help="JSON en una sola línea")
+    add_symbol_args(recommend_parser)
+    recommend_parser.add_argument('--refresh', action='store_true', help="Actualizar datos antes de recomendar")
+    recommend_parser.add_argument('--no-save', action='store_true', help="No abrir ni modificar la base de datos")
+    recommend_parser.set_defaults(func=cmd_recommend)
+    
+    alerts_parser = subparsers.add_parser('alerts', help="Comprobar alertas de precio")
+    alerts_parser.add_argument('--compact', action='store_true', help="JSON en una sola línea")
+    alerts_parser.add_argument('--cryptos', default='', help="Criptomonedas adicionales")
+    alerts_parser.add_argument('--stocks', default='', help="Acciones adicionales")
+    alerts_parser.add_argument('--watch', action='store_true', help="Vigilar continuamente (una línea JSON por alerta)")
+    alerts_parser.add_argument('--interval', type=int, default=60, help="Segundos entre sondeos con --watch")
+    alerts_parser.add_argument('--confirmations', type=int, default=2, help="Sondeos seguidos antes de avisar")
+    alerts_parser.add_argument('--cooldown', type=int, default=900, help="Segundos mínimos entre avisos repetidos")
+    alerts_parser.set_defaults(func=cmd_alerts)
+    
+    add_alert_parser = subparsers.add_parser('add-alert', help="Añadir una alerta de precio (se guarda en watchlist_config.json)")
+    add_alert_parser.add_argument('--compact', action='store_true', help="JSON en una sola línea")
+    add_alert_parser.add_argument('symbol', help="Símbolo (BTC, AAPL)")
+    add_alert_parser.add_argument('type', type=str.upper, choices=['BUY', 'SELL'],
+                                  help="BUY: avisar si el precio baja al objetivo; SELL: si lo alcanza o supera")
+    add_alert_parser.add_argument('price', type=float, help="Precio objetivo")
+    add_alert_parser.add_argument('--name', default=None, help="Nombre personalizado")
+    add_alert_parser.add_argument('--asset-type', choices=['crypto', 'stock'], default=None,
+                                  help="Tipo de activo (por defecto se deduce del símbolo)")
+    add_alert_parser.set_defaults(func=cmd_add_alert)
+    
+    compact_parser = subparsers.add_parser('compact', help="Compactar las instantáneas JSON de data/")
+    compact_parser.add_argument('--compact', action='store_true', help="JSON en una sola línea")
+    compact_parser.add_argument('--keep-all-days', type=int, help="Días en los que se conservan todas las instantáneas")
+    compact_parser.add_argument('--downsample-days', type=int, help="Días en los que se conserva una por intervalo")
+    compact_parser.add_argument('--downsample-hours', type=int, help="Horas por intervalo de submuestreo")
+    compact_parser.set_defaults(func=cmd_compact)
+    
+    import_parser = subparsers.add_parser('import', help="Importar las instantáneas JSON de data/ a la base de datos")
+    import_parser.add_argument('--compact', action='store_true', help="JSON en una sola línea")
+    import_parser.add_argument('--workers', type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    import_parser.add_argument('--full', action='store_true', help="Reimportar también los archivos ya importados")
+    import_parser.set_defaults(func=cmd_import)
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.output = sys.stdout
+    try:
+        # Los mensajes de progreso y error de los módulos van a stderr: stdout sólo lleva JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            payload = args.func(args)
+    except Exception as e:
+        print_json({'error': str(e)}, compact=True)
+        return 1
+    finally:
+        from src import registry
+        registry.close_components()
+    
+    if payload is not None:
+        print_json(payload, compact=args.compact)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,65 @@
 import numpy as np
-import pandas as pd
 import random
+import threading
 from datetime import datetime
 
+try:
+    from .data_version import compute_data_version
+    from . import registry
+except ImportError:
+    from data_version import compute_data_version
+    import registry
+
 class AdvancedAIAnalyzer:
     """Analizador IA con datos de 1 año + 1 mes y análisis dual"""
     
-    def __init__(self):
+    def __init__(self, data_collector=None):
         self.models_dir = 'models'
         
-    def analyze_market(self):
-        """Analizar el mercado usando 1 año + 1 mes de datos históricos"""
-        # Cargar datos reales más recientes
-        try:
-            from .real_data_collector import RealDataCollector
-            collector = RealDataCollector()
-            latest_data = collector.load_latest_data()
-        except:
-            latest_data = {}
+        # Colector inyectado; si no se pasa se usa el compartido del registro
+        self.data_collector = data_collector
+        
+        # Resultados por activo: {key: (versión de los datos, análisis)}
+        self._analysis_cache = {}
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+    def invalidate_cache(self, keys=None):
+        """Descartar análisis cacheados (de los activos indicados o todos)"""
+        with self._cache_lock:
+            if keys is None:
+                self._analysis_cache.clear()
+            else:
+                for key in keys:
+                    self._analysis_cache.pop(key, None)
+    
+    def analyze_market(self, latest_data=None):
+        """Analizar el mercado usando 1 año + 1 mes de datos históricos.
+        
+        `latest_data` es la salida en memoria del colector; si no se pasa se carga el último resumen guardado.
+        """
+        if latest_data is None:
+            try:
+                collector = self.data_collector if self.data_collector is not None else registry.get_data_collector()
+                # Sólo precios e indicadores: el historial de velas no hace falta aquí
+                latest_data = collector.load_latest_summary()
+            except:
+                latest_data = {}
         
         results = {}
         
         for key, data in latest_data.items():
+            # Mismos precios e indicadores que la última vez: reutilizar el análisis
+            version = data.get('data_version') or compute_data_version(data)
+            with self._cache_lock:
+                cached = self._analysis_cache.get(key)
+            if cached is not None and cached[0] == version:
+                self.cache_hits += 1
+                results[key] = dict(cached[1])
+                continue
+            self.cache_misses += 1
+            
             try:
                 # Obtener indicadores de 1 año y 1 mes
                 annual_indicators = data.get('indicators', {})
@@ -94,6 +132,9 @@ class AdvancedAIAnalyzer:
                     'price_change_pct': 0.0,
                     'analysis_depth': 'LIMITED'
                 }
+            
+            with self._cache_lock:
+                self._analysis_cache[key] = (version, dict(results[key]))
                 
         return results
     
@@ -0,0 +1,118 @@
+from bisect import bisect_left, bisect_right
+
+try:
+    from .symbols import infer_asset_type
+except ImportError:
+    from symbols import infer_asset_type
+
+# Sufijos de las claves de datos y tipo de activo que indican
+KEY_SUFFIXES = (('_CRYPTO', 'crypto'), ('_STOCK', 'stock'), ('-USD', 'crypto'))
+
+def canonical_key(value, asset_type=None):
+    """Clave canónica (símbolo, tipo) de una clave de datos o de la watchlist.
+    
+    'BTC_crypto' -> ('BTC', 'crypto'), 'BTC-USD' -> ('BTC', 'crypto'), ('btc', 'stock') -> ('BTC', 'stock').
+    El tipo explícito manda; si no, el del sufijo y, sin sufijo, el que se deduce del símbolo.
+    """
+    symbol = str(value).strip().upper()
+    for suffix, suffix_type in KEY_SUFFIXES:
+        if symbol.endswith(suffix):
+            symbol = symbol[:-len(suffix)]
+            asset_type = asset_type or suffix_type
+    return symbol, asset_type or infer_asset_type(symbol)
+
+
+class SymbolAlerts:
+    """Umbrales de compra y venta de un símbolo, ordenados por precio"""
+    
+    def __init__(self):
+        self.buy_prices = []
+        self.buy_alerts = []
+        self.sell_prices = []
+        self.sell_alerts = []
+    
+    def add(self, alert):
+        if alert['type'] == 'BUY':
+            prices, alerts = self.buy_prices, self.buy_alerts
+        else:
+            prices, alerts = self.sell_prices, self.sell_alerts
+        
+        # Misma posición en ambas listas para mantenerlas alineadas
+        position = bisect_right(prices, alert['target_price'])
+        prices.insert(position, alert['target_price'])
+        alerts.insert(position, alert)
+    
+    def triggered(self, current_price):
+        """Compras con objetivo >= precio y ventas con objetivo <= precio (búsqueda binaria)"""
+        buys = self.buy_alerts[bisect_left(self.buy_prices, current_price):]
+        sells = self.sell_alerts[:bisect_right(self.sell_prices, current_price)]
+        return buys, sells
+
+
+class AlertIndex:
+    """Índice de alertas de precio por (símbolo, tipo): BTC_crypto y BTC_stock son activos distintos.
+    
+    Evaluar un precio cuesta O(log n) en el número de alertas del símbolo más las que se activan.
+    """
+    
+    def __init__(self):
+        self.symbols = {}
+        self._sequence = 0
+    
+    def __len__(self):
+        return sum(len(alerts.buy_prices) + len(alerts.sell_prices) for alerts in self.symbols.values())
+    
+    def add_alert(self, symbol, alert_type, target_price, custom_name=None, asset_type=None):
+        """Registrar una alerta BUY (precio <= objetivo) o SELL (precio >= objetivo)"""
+        if not target_price:
+            return
+        key = canonical_key(symbol, asset_type)
+        alert = {
+            'symbol': key[0],
+            'asset_type': key[1],
+            'custom_name': custom_name or key[0],
+            'type': alert_type,
+            'target_price': target_price,
+            'order': self._sequence
+        }
+        self._sequence += 1
+        self.symbols.setdefault(key, SymbolAlerts()).add(alert)
+    
+    def evaluate(self, symbol, current_price, asset_type=None):
+        """Alertas activadas de un activo con el precio actual"""
+        alerts = self.symbols.get(canonical_key(symbol, asset_type))
+        if alerts is None or current_price is None:
+            return [], []
+        return alerts.triggered(current_price)
+    
+    def evaluate_data(self, current_data):
+        """Evaluar todos los activos de `current_data`; devuelve las alertas activadas en el orden de la watchlist"""
+        triggered = []
+        seen = set()
+        for data_key, data in current_data.items():
+            key = canonical_key(data_key, data.get('type'))
+            if key in seen or key not in self.symbols:
+                continue
+            seen.add(key)
+            
+            current_price = data.get('current_price')
+            buys, sells = self.evaluate(key[0], current_price, key[1])
+            for alert in buys + sells:
+                triggered.append((alert, current_price, data_key))
+        
+        triggered.sort(key=lambda item: item[0]['order'])
+        return triggered
+
+
+def build_alert_index(watchlist_config):
+    """Construir el índice desde la watchlist (compra/venta por activo) y las alertas adicionales"""
+    index = AlertIndex()
+    for asset in watchlist_config.get('watchlist', {}).values():
+        index.add_alert(asset['symbol'], 'BUY', asset.get('buy_alert_price'), asset.get('custom_name'), asset.get('asset_type'))
+        index.add_alert(asset['symbol'], 'SELL', asset.get('sell_alert_price'), asset.get('custom_name'), asset.get('asset_type'))
+    
+    for alert in watchlist_config.get('alerts', {}).values():
+        index.add_alert(alert['symbol'], alert['type'], alert.get('target_price'), alert.get('custom_name'),
+                        alert.get('asset_type'))
+    
+    return index
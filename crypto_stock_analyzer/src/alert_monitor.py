@@ -0,0 +1,167 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+class AlertMonitor:
+    """Servicio en segundo plano que vigila las alertas de precio.
+    
+    Cada `interval` segundos pide sólo cotizaciones (en lotes) de la watchlist y de las alertas
+    de `watchlist_config.json`, las evalúa con `check_price_alerts` y entrega cada alerta nueva
+    a `callback` o, si no hay callback, a una cola acotada que la interfaz puede vaciar.
+    
+    - Debounce: una alerta sólo se entrega tras `confirmations` sondeos seguidos activada.
+    - Deduplicación: mientras siga activada no se repite; se rearma cuando el precio sale del
+      rango y no vuelve a entregarse antes de `cooldown` segundos.
+    """
+    
+    def __init__(self, data_collector, cryptos=(), stocks=(), interval=60, callback=None,
+                 confirmations=2, cooldown=900, max_pending=200, max_interval=900):
+        self.data_collector = data_collector
+        self.cryptos = list(cryptos)
+        self.stocks = list(stocks)
+        self.interval = interval
+        self.max_interval = max_interval
+        self.callback = callback
+        self.confirmations = max(1, confirmations)
+        self.cooldown = cooldown
+        
+        # Cola acotada: si nadie la vacía se descartan las alertas más antiguas
+        self.events = queue.Queue(maxsize=max_pending)
+        
+        # Estado por alerta: {clave: {'streak': n, 'fired': bool, 'last_fired': ts}}
+        self.alert_states = {}
+        self.stats = {'polls': 0, 'errors': 0, 'delivered': 0, 'dropped': 0,
+                      'symbols': 0, 'last_poll': None, 'last_poll_time': 0}
+        
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Arrancar el hilo de vigilancia (no hace nada si ya está en marcha)"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='AlertMonitor', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout=5):
+        """Detener el hilo; espera como mucho `timeout` segundos"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _run(self):
+        wait = self.interval
+        while not self._stop_event.is_set():
+            try:
+                self.poll_once()
+                wait = self.interval
+            except Exception as e:
+                # Backoff exponencial mientras fallen las peticiones
+                self.stats['errors'] += 1
+                wait = min(wait * 2, self.max_interval)
+                print(f"Error in alert monitor: {e}")
+            
+            # Esperar sin consumir CPU; stop() despierta el hilo al instante
+            self._stop_event.wait(wait)
+    
+    def poll_once(self):
+        """Un ciclo de vigilancia: cotizaciones → evaluación → entrega. Devuelve las alertas entregadas"""
+        started = time.perf_counter()
+        watchlist_cryptos, watchlist_stocks = self.data_collector.get_watchlist_symbols(self.cryptos, self.stocks)
+        cryptos = self.cryptos + watchlist_cryptos
+        stocks = self.stocks + watchlist_stocks
+        
+        delivered = []
+        if cryptos or stocks:
+            quotes = self.data_collector.get_quotes(cryptos, stocks)
+            alerts = self.data_collector.check_price_alerts(quotes)
+            delivered = self.process_alerts(alerts)
+        
+        self.stats['polls'] += 1
+        self.stats['symbols'] = len(cryptos) + len(stocks)
+        self.stats['last_poll'] = datetime.now().isoformat()
+        self.stats['last_poll_time'] = round(time.perf_counter() - started, 3)
+        return delivered
+    
+    def get_alert_key(self, alert):
+        return f"{alert['symbol']}:{alert['type']}:{alert['target_price']}"
+    
+    def process_alerts(self, alerts):
+        """Aplicar debounce y deduplicación a las alertas activadas en este sondeo"""
+        now = time.time()
+        active_keys = set()
+        delivered = []
+        
+        for alert in alerts:
+            key = self.get_alert_key(alert)
+            if key in active_keys:
+                continue
+            active_keys.add(key)
+            
+            state = self.alert_states.setdefault(key, {'streak': 0, 'fired': False, 'last_fired': None})
+            state['streak'] += 1
+            if state['fired'] or state['streak'] < self.confirmations:
+                continue
+            if state['last_fired'] is not None and now - state['last_fired'] < self.cooldown:
+                continue
+            
+            state['fired'] = True
+            state['last_fired'] = now
+            event = dict(alert, triggered_at=datetime.now().isoformat())
+            self.deliver(event)
+            delivered.append(event)
+        
+        # Rearmar las que ya no están activadas; olvidar las que ya cumplieron el cooldown
+        for key in list(self.alert_states):
+            if key in active_keys:
+                continue
+            state = self.alert_states[key]
+            if state['last_fired'] is None or now - state['last_fired'] >= self.cooldown:
+                del self.alert_states[key]
+            else:
+                state['streak'] = 0
+                state['fired'] = False
+        
+        return delivered
+    
+    def deliver(self, event):
+        """Entregar una alerta al callback o a la cola"""
+        self.stats['delivered'] += 1
+        if self.callback is not None:
+            try:
+                self.callback(event)
+            except Exception as e:
+                print(f"Error delivering alert {event['symbol']}: {e}")
+            return
+        
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                    self.stats['dropped'] += 1
+                except queue.Empty:
+                    pass
+    
+    def get_events(self, max_items=50):
+        """Vaciar (sin bloquear) hasta `max_items` alertas pendientes de la cola"""
+        events = []
+        while len(events) < max_items:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+    
+    def get_stats(self):
+        return dict(self.stats, running=self.is_running(), tracked_alerts=len(self.alert_states),
+                    pending=self.events.qsize())
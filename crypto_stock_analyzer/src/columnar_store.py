@@ -0,0 +1,114 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+# Columnas de cada serie: nombre, tipo y extensión del archivo binario
+COLUMNS = (
+    ('ts', np.int64, 'i8'),
+    ('price', np.float64, 'f8'),
+    ('volume', np.float64, 'f8')
+)
+
+class ColumnarSeries:
+    """Serie de velas de un símbolo en arrays tipados (int64/float64), sólo de anexado.
+    
+    Cada columna es un archivo binario plano que se puede mapear en memoria; `meta.json`
+    guarda el número de filas confirmadas, de modo que una escritura interrumpida nunca
+    deja filas a medias visibles.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.meta_file = os.path.join(self.directory, 'meta.json')
+        self.meta = {'count': 0, 'last_ts': None, 'live': None, 'updated_at': None}
+        self._columns = None
+        
+        try:
+            if os.path.exists(self.meta_file):
+                with open(self.meta_file, 'r') as f:
+                    self.meta.update(json.load(f))
+        except Exception as e:
+            print(f"Error loading series metadata in {self.directory}: {e}")
+        
+        self._discard_uncommitted()
+    
+    def get_column_file(self, name, extension):
+        return os.path.join(self.directory, f"{name}.{extension}")
+    
+    def _discard_uncommitted(self):
+        """Recortar bytes de un anexado que no llegó a confirmarse en meta.json"""
+        for name, dtype, extension in COLUMNS:
+            column_file = self.get_column_file(name, extension)
+            committed_size = self.meta['count'] * np.dtype(dtype).itemsize
+            if os.path.exists(column_file) and os.path.getsize(column_file) > committed_size:
+                os.truncate(column_file, committed_size)
+    
+    def __len__(self):
+        return self.meta['count']
+    
+    @property
+    def last_timestamp(self):
+        return self.meta['last_ts']
+    
+    @property
+    def live(self):
+        return self.meta.get('live')
+    
+    def columns(self):
+        """Columnas mapeadas en memoria (sólo lectura): {'ts': ..., 'price': ..., 'volume': ...}"""
+        if self._columns is None:
+            count = self.meta['count']
+            columns = {}
+            for name, dtype, extension in COLUMNS:
+                if count:
+                    columns[name] = np.memmap(self.get_column_file(name, extension), dtype=dtype, mode='r', shape=(count,))
+                else:
+                    columns[name] = np.empty(0, dtype=dtype)
+            self._columns = columns
+        return self._columns
+    
+    def append(self, points, live=None):
+        """Anexar velas [ts_ms, precio, volumen] posteriores a la última guardada.
+        
+        Devuelve la lista de velas añadidas (las repetidas o antiguas se descartan).
+        """
+        last_ts = self.meta['last_ts']
+        added = []
+        for point in points:
+            ts = int(point[0])
+            if last_ts is None or ts > last_ts:
+                added.append([ts, point[1], point[2]])
+                last_ts = ts
+        
+        if added:
+            # Soltar los mapas actuales antes de ampliar los archivos
+            self._columns = None
+            for index, (name, dtype, extension) in enumerate(COLUMNS):
+                values = np.array([point[index] for point in added], dtype=dtype)
+                with open(self.get_column_file(name, extension), 'ab') as f:
+                    f.write(values.tobytes())
+            self.meta['count'] += len(added)
+            self.meta['last_ts'] = last_ts
+        
+        self.meta['live'] = list(live) if live is not None else None
+        self.save_meta()
+        return added
+    
+    def save_meta(self):
+        """Confirmar el número de filas y el punto provisional de forma atómica"""
+        self.meta['updated_at'] = datetime.now().isoformat()
+        temp_file = self.meta_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self.meta, f, separators=(',', ':'))
+        os.replace(temp_file, self.meta_file)
+    
+    def slice_since(self, cutoff_ms=None):
+        """Columnas desde `cutoff_ms` (búsqueda binaria sobre los timestamps ordenados)"""
+        columns = self.columns()
+        start = 0
+        if cutoff_ms is not None:
+            start = int(np.searchsorted(columns['ts'], cutoff_ms, side='left'))
+        return {name: column[start:] for name, column in columns.items()}
@@ -0,0 +1,11 @@
+import hashlib
+import json
+
+# Campos de un activo de los que depende el análisis (el timestamp y el historial no cuentan)
+VERSION_FIELDS = ('current_price', 'change_24h', 'volume_24h', 'indicators', 'monthly_indicators')
+
+def compute_data_version(asset):
+    """Huella del contenido analizable de un activo: cambia sólo si cambian precio o indicadores"""
+    content = {field: asset.get(field) for field in VERSION_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
@@ -1,22 +1,130 @@
 import sqlite3
 import json
 import os
+import threading
 from datetime import datetime, timedelta
+from itertools import islice
+
+# Sentencias fijas: sqlite3 las compila una vez y las reutiliza desde su caché de sentencias
+INSERT_MARKET_DATA = '''
+    INSERT INTO market_data 
+    (symbol, asset_type, timestamp, current_price, volume_24h, change_24h, 
+     high_24h, low_24h, indicators, raw_data)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_AI_ANALYSIS = '''
+    INSERT INTO ai_analysis 
+    (symbol, timestamp, trend, confidence, volatility, indicators,
+     predicted_price, current_price, price_change_pct)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_RECOMMENDATION = '''
+    INSERT INTO recommendations 
+    (symbol, timestamp, action, reason, risk_level, confidence,
+     target_price, stop_loss, predicted_change)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_CANDLE = '''
+    INSERT OR REPLACE INTO candles (symbol, interval, ts, open, high, low, close, volume)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_CANDLE_IF_MISSING = '''
+    INSERT OR IGNORE INTO candles (symbol, interval, ts, open, high, low, close, volume)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_INDICATOR = '''
+    INSERT OR REPLACE INTO indicator_values (symbol, timeframe, ts, name, value, text_value)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Campo del activo con los indicadores → marco temporal en indicator_values
+INDICATOR_TIMEFRAMES = (('indicators', 'annual'), ('monthly_indicators', 'monthly'))
+
+# Límite superior para rangos de timestamps abiertos (ms)
+MAX_TS = 2 ** 62
+
+# Columnas que se pueden proyectar en las consultas por páginas
+CANDLE_COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+MARKET_DATA_COLUMNS = ('id', 'symbol', 'asset_type', 'timestamp', 'current_price', 'volume_24h', 'change_24h',
+                       'high_24h', 'low_24h', 'indicators', 'raw_data', 'created_at')
+
+def now_timestamp():
+    """Marca de tiempo con el mismo formato que guardaba el adaptador de datetime de sqlite3"""
+    return datetime.now().isoformat(' ')
 
 class Database:
-    def __init__(self):
+    """Almacén SQLite en modo WAL con una conexión de larga duración por hilo"""
+    
+    def __init__(self, db_path=None):
         self.db_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
         os.makedirs(self.db_dir, exist_ok=True)
         
-        self.db_path = os.path.join(self.db_dir, 'trading_data.db')
+        self.db_path = db_path or os.path.join(self.db_dir, 'trading_data.db')
+        
+        # Una conexión por hilo (sqlite3 no comparte conexiones entre hilos): {hilo: conexión}
+        self._local = threading.local()
+        self._connections = {}
+        self._connections_lock = threading.Lock()
         
         # Inicializar base de datos
         self.init_database()
+    
+    def get_connection(self):
+        """Conexión del hilo actual (se abre y configura la primera vez)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # La app lanza un hilo por acción: cerrar antes las conexiones de los hilos que ya terminaron
+            self.close_finished_connections()
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, cached_statements=256)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections[threading.current_thread()] = conn
+        return conn
+    
+    def close_finished_connections(self):
+        """Cerrar las conexiones de hilos que ya no están vivos; devuelve cuántas se cerraron"""
+        with self._connections_lock:
+            finished = [thread for thread in self._connections if not thread.is_alive()]
+            for thread in finished:
+                self._close_connection(self._connections.pop(thread))
+        return len(finished)
+    
+    def release_connection(self):
+        """Cerrar la conexión del hilo actual (para hilos que terminan su trabajo con la base de datos)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._connections_lock:
+            self._connections.pop(threading.current_thread(), None)
+        self._close_connection(conn)
+    
+    def _close_connection(self, conn):
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"Error closing database connection: {e}")
+    
+    def close(self):
+        """Cerrar todas las conexiones abiertas"""
+        with self._connections_lock:
+            for conn in self._connections.values():
+                self._close_connection(conn)
+            self._connections = {}
+        self._local = threading.local()
         
     def init_database(self):
         """Inicializar tablas de la base de datos"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.get_connection()
             cursor = conn.cursor()
             
             # Tabla de datos de mercado
@@ -108,147 +216,389 @@ class Database:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_ai_analysis_symbol ON ai_analysis(symbol)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_recommendations_symbol ON recommendations(symbol)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades(symbol)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_market_data_symbol_timestamp ON market_data(symbol, timestamp, id)')
+            
+            # Velas normalizadas: la clave primaria agrupa físicamente las filas por símbolo y
+            # tiempo (WITHOUT ROWID), así que un rango de un símbolo es una búsqueda en el índice
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS candles (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL NOT NULL,
+                    volume REAL,
+                    PRIMARY KEY (symbol, interval, ts)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Indicadores tipados: un valor numérico (o texto, p. ej. volume_trend) por fila
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS indicator_values (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    value REAL,
+                    text_value TEXT,
+                    PRIMARY KEY (symbol, timeframe, ts, name)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Instantánea JSON más reciente cuyas velas se guardaron en `candles` (por símbolo)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS snapshot_marks (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    last_snapshot TEXT NOT NULL,
+                    PRIMARY KEY (symbol, interval)
+                ) WITHOUT ROWID
+            ''')
             
             conn.commit()
-            conn.close()
             
         except Exception as e:
             print(f"Error initializing database: {e}")
             
     def save_market_data(self, symbol, asset_type, data):
         """Guardar datos de mercado"""
+        self.save_market_data_batch([(symbol, asset_type, data)])
+    
+    def save_market_data_batch(self, rows, candle_params=(), indicator_params=()):
+        """Guardar datos de mercado de varios activos en una transacción (`rows`: [(símbolo, tipo, datos)]).
+        
+        Las velas y los indicadores van a sus tablas tipadas; market_data conserva además la columna
+        `indicators` (la que devuelve get_latest_market_data), pero ya no el blob `raw_data`.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO market_data 
-                (symbol, asset_type, timestamp, current_price, volume_24h, change_24h, 
-                 high_24h, low_24h, indicators, raw_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                symbol,
-                asset_type,
-                datetime.now(),
-                data.get('current_price'),
-                data.get('volume_24h'),
-                data.get('change_24h'),
-                data.get('high_24h'),
-                data.get('low_24h'),
-                json.dumps(data.get('indicators', {})),
-                json.dumps(data)
-            ))
-            
-            conn.commit()
-            conn.close()
+            timestamp = now_timestamp()
+            params = []
+            for symbol, asset_type, data in rows:
+                params.append((
+                    symbol,
+                    asset_type,
+                    timestamp,
+                    data.get('current_price'),
+                    data.get('volume_24h'),
+                    data.get('change_24h'),
+                    data.get('high_24h'),
+                    data.get('low_24h'),
+                    json.dumps(data.get('indicators', {})),
+                    None
+                ))
+            
+            conn = self.get_connection()
+            with conn:
+                if params:
+                    conn.executemany(INSERT_MARKET_DATA, params)
+                if candle_params:
+                    conn.executemany(INSERT_CANDLE, candle_params)
+                if indicator_params:
+                    conn.executemany(INSERT_INDICATOR, indicator_params)
             
         except Exception as e:
             print(f"Error saving market data: {e}")
+    
+    def get_indicator_params(self, key, data, ts):
+        """Filas de indicator_values de un activo"""
+        params = []
+        for field, timeframe in INDICATOR_TIMEFRAMES:
+            for name, value in (data.get(field) or {}).items():
+                if value is None:
+                    continue
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    params.append((key, timeframe, ts, name, float(value), None))
+                else:
+                    params.append((key, timeframe, ts, name, None, str(value)))
+        return params
+    
+    def save_refresh(self, results, candles=None, interval='1d'):
+        """Guardar un refresco del colector en una sola transacción.
+        
+        `results` es {'BTC_crypto': {...}}; `candles` es {'BTC_crypto': [[ts_ms, precio, volumen], ...]}
+        con las velas cerradas que aún no están en la tabla. Las velas e indicadores se guardan
+        con la clave del activo como símbolo.
+        """
+        ts = int(datetime.now().timestamp() * 1000)
+        rows = []
+        indicator_params = []
+        for key, data in results.items():
+            rows.append((data.get('symbol', key), data.get('type', 'unknown'), data))
+            indicator_params.extend(self.get_indicator_params(key, data, ts))
+        
+        candle_params = [
+            (key, interval, int(point[0]), None, None, None, point[1], point[2])
+            for key, points in (candles or {}).items()
+            for point in points
+        ]
+        if rows or candle_params:
+            self.save_market_data_batch(rows, candle_params, indicator_params)
+    
+    def insert_snapshot_candles(self, symbol, snapshots, interval='1d'):
+        """Guardar las velas de varias instantáneas JSON de un símbolo en una transacción.
+        
+        `snapshots` es una lista de (marca ISO de la instantánea, [[ts_ms, precio, volumen], ...]).
+        Gana siempre la instantánea más reciente, también entre ejecuciones: las posteriores a la
+        última guardada sustituyen velas repetidas y las anteriores sólo rellenan huecos. Devuelve
+        cuántas velas se escribieron, o None si falla (y entonces no se guarda nada).
+        """
+        def rows(group):
+            # Dentro del grupo, la instantánea más reciente pisa a las anteriores
+            candles = {}
+            for stamp, points in sorted(group, key=lambda item: item[0]):
+                for point in points:
+                    candles[int(point[0])] = (symbol, interval, int(point[0]), None, None, None, point[1], point[2])
+            return [candles[ts] for ts in sorted(candles)]
+        
+        try:
+            conn = self.get_connection()
+            with conn:
+                row = conn.execute('SELECT last_snapshot FROM snapshot_marks WHERE symbol = ? AND interval = ?',
+                                   (symbol, interval)).fetchone()
+                last_snapshot = row[0] if row else ''
+                older = [item for item in snapshots if item[0] <= last_snapshot]
+                newer = [item for item in snapshots if item[0] > last_snapshot]
+                
+                changes = conn.total_changes
+                conn.executemany(INSERT_CANDLE_IF_MISSING, rows(older))
+                conn.executemany(INSERT_CANDLE, rows(newer))
+                written = conn.total_changes - changes
+                
+                if newer:
+                    conn.execute('INSERT OR REPLACE INTO snapshot_marks (symbol, interval, last_snapshot) VALUES (?, ?, ?)',
+                                 (symbol, interval, max(item[0] for item in newer)))
+            return written
+        except Exception as e:
+            print(f"Error saving candles for {symbol}: {e}")
+            return None
+    
+    def get_last_candle_ts(self, symbol, interval='1d'):
+        """Timestamp (ms) de la última vela guardada de un símbolo, o None"""
+        try:
+            row = self.get_connection().execute(
+                'SELECT MAX(ts) FROM candles WHERE symbol = ? AND interval = ?', (symbol, interval)
+            ).fetchone()
+            return row[0]
+        except Exception as e:
+            print(f"Error getting last candle: {e}")
+            return None
+    
+    def get_candles(self, symbol, start_ts=None, end_ts=None, interval='1d'):
+        """Velas de un símbolo entre dos timestamps (ms), por búsqueda en la clave primaria"""
+        return list(self.iter_candles(symbol, start_ts, end_ts, interval))
+    
+    def get_latest_indicators(self, symbol, timeframe='annual'):
+        """Últimos indicadores guardados de un símbolo ({nombre: valor})"""
+        try:
+            cursor = self.get_connection().execute('''
+                SELECT name, value, text_value FROM indicator_values
+                WHERE symbol = ? AND timeframe = ? AND ts = (
+                    SELECT MAX(ts) FROM indicator_values WHERE symbol = ? AND timeframe = ?
+                )
+            ''', (symbol, timeframe, symbol, timeframe))
+            return {name: value if value is not None else text_value for name, value, text_value in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error getting indicators: {e}")
+            return {}
             
     def save_ai_analysis(self, symbol, analysis):
         """Guardar análisis de IA"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO ai_analysis 
-                (symbol, timestamp, trend, confidence, volatility, indicators,
-                 predicted_price, current_price, price_change_pct)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                symbol,
-                datetime.now(),
-                analysis.get('trend'),
-                analysis.get('confidence'),
-                analysis.get('volatility'),
-                analysis.get('indicators'),
-                analysis.get('predicted_price'),
-                analysis.get('current_price'),
-                analysis.get('price_change_pct')
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            print(f"Error saving AI analysis: {e}")
+        self.save_ai_analysis_batch({symbol: analysis})
+    
+    def get_analysis_params(self, symbol, analysis, timestamp):
+        return (
+            symbol,
+            timestamp,
+            analysis.get('trend'),
+            analysis.get('confidence'),
+            analysis.get('volatility'),
+            analysis.get('indicators'),
+            analysis.get('predicted_price'),
+            analysis.get('current_price'),
+            analysis.get('price_change_pct')
+        )
+    
+    def get_recommendation_params(self, symbol, recommendation, timestamp):
+        return (
+            symbol,
+            timestamp,
+            recommendation.get('action'),
+            recommendation.get('reason'),
+            recommendation.get('risk_level'),
+            recommendation.get('confidence'),
+            recommendation.get('target_price'),
+            recommendation.get('stop_loss'),
+            recommendation.get('predicted_change')
+        )
+    
+    def save_ai_analysis_batch(self, analysis_results):
+        """Guardar los análisis de varios activos ({símbolo: análisis}) en una transacción"""
+        self.save_pipeline_results(analysis_results, {})
             
     def save_recommendation(self, symbol, recommendation):
         """Guardar recomendación"""
+        self.save_recommendations_batch({symbol: recommendation})
+    
+    def save_recommendations_batch(self, recommendations):
+        """Guardar recomendaciones de varios activos ({símbolo: recomendación}) en una transacción"""
+        self.save_pipeline_results({}, recommendations)
+    
+    def save_pipeline_results(self, analysis_results, recommendations):
+        """Guardar análisis y recomendaciones de una pasada del pipeline en una sola transacción"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO recommendations 
-                (symbol, timestamp, action, reason, risk_level, confidence,
-                 target_price, stop_loss, predicted_change)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                symbol,
-                datetime.now(),
-                recommendation.get('action'),
-                recommendation.get('reason'),
-                recommendation.get('risk_level'),
-                recommendation.get('confidence'),
-                recommendation.get('target_price'),
-                recommendation.get('stop_loss'),
-                recommendation.get('predicted_change')
-            ))
-            
-            conn.commit()
-            conn.close()
+            timestamp = now_timestamp()
+            analysis_params = [self.get_analysis_params(symbol, analysis, timestamp)
+                               for symbol, analysis in (analysis_results or {}).items()]
+            recommendation_params = [self.get_recommendation_params(symbol, recommendation, timestamp)
+                                     for symbol, recommendation in (recommendations or {}).items()]
+            if not analysis_params and not recommendation_params:
+                return
+            
+            conn = self.get_connection()
+            with conn:
+                if analysis_params:
+                    conn.executemany(INSERT_AI_ANALYSIS, analysis_params)
+                if recommendation_params:
+                    conn.executemany(INSERT_RECOMMENDATION, recommendation_params)
             
         except Exception as e:
-            print(f"Error saving recommendation: {e}")
+            print(f"Error saving pipeline results: {e}")
             
     def get_latest_market_data(self, symbol=None, limit=100):
         """Obtener datos de mercado más recientes"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if symbol:
-                cursor.execute('''
-                    SELECT * FROM market_data 
-                    WHERE symbol = ? 
-                    ORDER BY timestamp DESC 
-                    LIMIT ?
-                ''', (symbol, limit))
-            else:
-                cursor.execute('''
-                    SELECT * FROM market_data 
-                    ORDER BY timestamp DESC 
-                    LIMIT ?
-                ''', (limit,))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            # Convertir a diccionarios
-            columns = [desc[0] for desc in cursor.description]
-            results = []
-            
+        if limit is None or limit <= 0:
+            return []
+        return list(islice(self.iter_market_data(symbol, page_size=min(limit, 500)), limit))
+    
+    def iter_market_data(self, symbol=None, columns=None, page_size=500):
+        """Recorrer market_data del más reciente al más antiguo, página a página.
+        
+        Paginación por clave (timestamp, id): cada página es una búsqueda en el índice y en memoria
+        sólo hay una página. `columns` limita las columnas leídas (y los JSON que se decodifican).
+        """
+        columns = self.check_columns(columns or MARKET_DATA_COLUMNS, MARKET_DATA_COLUMNS)
+        self.check_page_size(page_size)
+        select = list(columns) + [name for name in ('timestamp', 'id') if name not in columns]
+        where = 'WHERE symbol = ?' if symbol else 'WHERE 1 = 1'
+        base_params = (symbol,) if symbol else ()
+        
+        cursor_key = None
+        while True:
+            try:
+                if cursor_key is None:
+                    sql = f"SELECT {', '.join(select)} FROM market_data {where} ORDER BY timestamp DESC, id DESC LIMIT ?"
+                    params = base_params + (page_size,)
+                else:
+                    sql = (f"SELECT {', '.join(select)} FROM market_data {where} "
+                           f"AND (timestamp < ? OR (timestamp = ? AND id < ?)) ORDER BY timestamp DESC, id DESC LIMIT ?")
+                    params = base_params + (cursor_key[0], cursor_key[0], cursor_key[1], page_size)
+                rows = self.get_connection().execute(sql, params).fetchall()
+            except Exception as e:
+                print(f"Error getting market data: {e}")
+                return
+            
+            if not rows:
+                return
             for row in rows:
-                data_dict = dict(zip(columns, row))
-                # Parsear JSON
+                data_dict = dict(zip(select, row))
+                cursor_key = (data_dict['timestamp'], data_dict['id'])
+                # Parsear JSON (raw_data sólo existe en filas antiguas)
                 if data_dict.get('indicators'):
                     data_dict['indicators'] = json.loads(data_dict['indicators'])
                 if data_dict.get('raw_data'):
                     data_dict['raw_data'] = json.loads(data_dict['raw_data'])
-                results.append(data_dict)
-                
-            return results
-            
+                yield {name: data_dict[name] for name in columns}
+            
+            if len(rows) < page_size:
+                return
+    
+    def check_columns(self, columns, allowed):
+        """Validar una proyección de columnas (los nombres se insertan en el SQL)"""
+        columns = tuple(columns)
+        unknown = [name for name in columns if name not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        return columns
+    
+    def check_page_size(self, page_size):
+        """Un tamaño de página no positivo haría que la paginación no avanzara nunca"""
+        if not isinstance(page_size, int) or page_size <= 0:
+            raise ValueError(f"page_size must be a positive integer, got {page_size!r}")
+    
+    def iter_candle_pages(self, symbol, start_ts=None, end_ts=None, interval='1d', columns=CANDLE_COLUMNS,
+                          page_size=5000, as_arrays=False):
+        """Páginas de velas de un símbolo en orden de tiempo.
+        
+        Paginación por clave (ts > último leído) sobre la clave primaria: la memoria no depende de la
+        longitud del historial. Cada página es una lista de tuplas con `columns`, o un dict de arrays
+        de NumPy si `as_arrays` es True.
+        """
+        columns = self.check_columns(columns, CANDLE_COLUMNS)
+        self.check_page_size(page_size)
+        select = list(columns) if 'ts' in columns else list(columns) + ['ts']
+        ts_index = select.index('ts')
+        sql = (f"SELECT {', '.join(select)} FROM candles "
+               f"WHERE symbol = ? AND interval = ? AND ts > ? AND ts <= ? ORDER BY ts LIMIT ?")
+        
+        if as_arrays:
+            import numpy as np
+        
+        last_ts = start_ts - 1 if start_ts is not None else -1
+        end_ts = end_ts if end_ts is not None else MAX_TS
+        while True:
+            try:
+                rows = self.get_connection().execute(sql, (symbol, interval, last_ts, end_ts, page_size)).fetchall()
+            except Exception as e:
+                print(f"Error getting candles: {e}")
+                return
+            if not rows:
+                return
+            
+            last_ts = rows[-1][ts_index]
+            if as_arrays:
+                values = list(zip(*rows))
+                yield {name: np.array(values[index], dtype=np.int64 if name == 'ts' else np.float64)
+                       for index, name in enumerate(select) if name in columns}
+            elif len(select) != len(columns):
+                yield [row[:len(columns)] for row in rows]
+            else:
+                yield rows
+            
+            if len(rows) < page_size:
+                return
+    
+    def iter_candles(self, symbol, start_ts=None, end_ts=None, interval='1d', columns=CANDLE_COLUMNS, page_size=5000):
+        """Velas de un símbolo una a una ({columna: valor}), leídas por páginas"""
+        for page in self.iter_candle_pages(symbol, start_ts, end_ts, interval, columns, page_size):
+            for row in page:
+                yield dict(zip(columns, row))
+    
+    def get_candle_arrays(self, symbol, start_ts=None, end_ts=None, interval='1d', columns=('ts', 'close', 'volume')):
+        """Historial completo de un símbolo como arrays de NumPy (uno por columna)"""
+        import numpy as np
+        
+        pages = list(self.iter_candle_pages(symbol, start_ts, end_ts, interval, columns, as_arrays=True))
+        if not pages:
+            return {name: np.empty(0, dtype=np.int64 if name == 'ts' else np.float64) for name in columns}
+        return {name: np.concatenate([page[name] for page in pages]) for name in columns}
+    
+    def get_candle_symbols(self, interval='1d'):
+        """Símbolos con velas guardadas"""
+        try:
+            rows = self.get_connection().execute(
+                'SELECT DISTINCT symbol FROM candles WHERE interval = ? ORDER BY symbol', (interval,)
+            ).fetchall()
+            return [row[0] for row in rows]
         except Exception as e:
-            print(f"Error getting market data: {e}")
+            print(f"Error getting candle symbols: {e}")
             return []
             
     def get_portfolio_summary(self):
         """Obtener resumen del portfolio"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -259,7 +609,6 @@ class Database:
             ''')
             
             rows = cursor.fetchall()
-            conn.close()
             
             columns = [desc[0] for desc in cursor.description]
             portfolio = [dict(zip(columns, row)) for row in rows]
@@ -281,8 +630,8 @@ class Database:
             
     def update_portfolio(self, symbol, quantity, price, action):
         """Actualizar portfolio después de un trade"""
+        conn = self.get_connection()
         try:
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
             if action == 'BUY':
@@ -302,7 +651,7 @@ class Database:
                             total_value = quantity * current_price,
                             last_updated = ?
                         WHERE symbol = ?
-                    ''', (new_quantity, new_avg_price, price, datetime.now(), symbol))
+                    ''', (new_quantity, new_avg_price, price, now_timestamp(), symbol))
                 else:
                     # Nueva posición
                     cursor.execute('''
@@ -329,22 +678,23 @@ class Database:
                             UPDATE portfolio 
                             SET quantity = ?, last_updated = ?
                             WHERE symbol = ?
-                        ''', (new_quantity, datetime.now(), symbol))
+                        ''', (new_quantity, now_timestamp(), symbol))
                         
             conn.commit()
-            conn.close()
             
         except Exception as e:
+            # La conexión es de larga duración: no dejar la transacción abierta
+            conn.rollback()
             print(f"Error updating portfolio: {e}")
             
     def get_performance_metrics(self, days=30):
         """Obtener métricas de rendimiento"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.get_connection()
             cursor = conn.cursor()
             
             # Obtener trades del período
-            since_date = datetime.now() - timedelta(days=days)
+            since_date = (datetime.now() - timedelta(days=days)).isoformat(' ')
             
             cursor.execute('''
                 SELECT COUNT(*) as total_trades,
@@ -369,8 +719,6 @@ class Database:
             
             rec_metrics = cursor.fetchone()
             
-            conn.close()
-            
             return {
                 'period_days': days,
                 'trades': {
@@ -2,25 +2,29 @@ import numpy as np
 from datetime import datetime, timedelta
 import json
 
+try:
+    from . import registry
+except ImportError:
+    import registry
+
 class DecisionEngine:
-    def __init__(self):
+    def __init__(self, position_manager=None, ai_analyzer=None):
         self.risk_tolerance = 0.5  # 0-1, donde 1 es alto riesgo
         self.min_confidence = 60  # Confianza mínima para tomar decisiones
         self.max_position_size = 0.1  # Máximo 10% del portfolio en un solo activo
         
-        # Importar PositionManager
-        try:
-            from .position_manager import PositionManager
-        except ImportError:
-            from position_manager import PositionManager
-        self.position_manager = PositionManager()
+        # PositionManager compartido (positions.json se carga una sola vez por proceso)
+        self.position_manager = position_manager if position_manager is not None else registry.get_position_manager()
+        self.ai_analyzer = ai_analyzer
         
-    def get_recommendations(self):
-        """Generar recomendaciones de trading basadas en análisis de IA"""
-        from .advanced_ai_analyzer import AdvancedAIAnalyzer
+    def get_recommendations(self, analysis_results=None):
+        """Generar recomendaciones de trading basadas en análisis de IA.
         
-        analyzer = AdvancedAIAnalyzer()
-        analysis_results = analyzer.analyze_market()
+        Si ya se tiene el resultado de `analyze_market` se reutiliza en lugar de repetir el análisis.
+        """
+        if analysis_results is None:
+            analyzer = self.ai_analyzer if self.ai_analyzer is not None else registry.get_ai_analyzer()
+            analysis_results = analyzer.analyze_market()
         
         recommendations = {}
         
@@ -89,7 +93,7 @@ class DecisionEngine:
                 'stop_loss': current_price * 0.95,
                 'signal_color': signal_color
             }
-
+        
         elif rsi_14 > 80 and distance_to_sma200 > 30:
             recommendation = "DANGER: OVEREXTENDED (Wait for Pullback)"
             signal_color = "ORANGE"
@@ -102,7 +106,7 @@ class DecisionEngine:
                 'stop_loss': current_price * 0.95,
                 'signal_color': signal_color
             }
-
+        
         elif rsi_14 < 25 and distance_to_sma200 < -20:
             recommendation = "STRONG BUY (Oversold Bounce)"
             signal_color = "GREEN"
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+try:
+    from .columnar_store import ColumnarSeries
+except ImportError:
+    from columnar_store import ColumnarSeries
+
+class HistoryStore:
+    """Historial local por símbolo: velas cerradas en columnas tipadas más el último punto provisional"""
+    
+    def __init__(self, data_dir=None):
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+        self.history_dir = os.path.join(data_dir, 'history')
+        os.makedirs(self.history_dir, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._series = {}
+    
+    def get_history_file(self, key):
+        """Ruta del historial JSON antiguo de un símbolo (se migra al formato columnar)"""
+        return os.path.join(self.history_dir, f"{key}.json")
+    
+    def get_series_dir(self, key):
+        """Directorio con las columnas tipadas de un símbolo"""
+        return os.path.join(self.history_dir, key)
+    
+    def open_series(self, key):
+        """Serie columnar de un símbolo (con caché en memoria)"""
+        with self._lock:
+            return self._open_unlocked(key)
+    
+    def _open_unlocked(self, key):
+        if key in self._series:
+            return self._series[key]
+        
+        series = ColumnarSeries(self.get_series_dir(key))
+        self._migrate_legacy(key, series)
+        self._series[key] = series
+        return series
+    
+    def _migrate_legacy(self, key, series):
+        """Pasar un historial JSON antiguo a columnas tipadas"""
+        history_file = self.get_history_file(key)
+        if len(series) or not os.path.exists(history_file):
+            return
+        
+        try:
+            with open(history_file, 'r') as f:
+                history = json.load(f)
+            series.append(history.get('points', []), history.get('live'))
+            os.remove(history_file)
+        except Exception as e:
+            print(f"Error migrating history for {key}: {e}")
+    
+    def get_state_file(self, key):
+        """Ruta del estado incremental de indicadores de un símbolo"""
+        return os.path.join(self.history_dir, f"{key}.state.json")
+    
+    def load_state(self, key):
+        """Cargar el estado de indicadores guardado (o None)"""
+        state_file = self.get_state_file(key)
+        try:
+            if os.path.exists(state_file):
+                with open(state_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading indicator state for {key}: {e}")
+        return None
+    
+    def save_state(self, key, state):
+        """Guardar el estado de indicadores de forma atómica"""
+        state_file = self.get_state_file(key)
+        temp_file = state_file + '.tmp'
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(state, f, separators=(',', ':'))
+            os.replace(temp_file, state_file)
+        except Exception as e:
+            print(f"Error saving indicator state for {key}: {e}")
+    
+    def get_live(self, key):
+        """Último punto provisional [ts_ms, precio, volumen], o None"""
+        return self.open_series(key).live
+    
+    def get_last_timestamp(self, key):
+        """Timestamp (ms) de la última vela cerrada guardada, o None si no hay historial"""
+        return self.open_series(key).last_timestamp
+    
+    def merge(self, key, points):
+        """Incorporar puntos [ts_ms, precio, volumen] de un proveedor.
+        
+        El último punto de cada respuesta se considera provisional (vela en curso)
+        y sólo se guardan como cerradas las velas posteriores a la última conocida.
+        Devuelve la lista de velas cerradas añadidas.
+        """
+        if not points:
+            return []
+        
+        # Timestamps enteros en ms, como se guardan en la columna int64
+        points = sorted(([int(p[0]), p[1], p[2]] for p in points), key=lambda p: p[0])
+        new_closed, live = points[:-1], points[-1]
+        
+        with self._lock:
+            series = self._open_unlocked(key)
+            try:
+                last_ts = series.last_timestamp
+                added = [point for point in new_closed if last_ts is None or point[0] > last_ts]
+                last_ts = added[-1][0] if added else last_ts
+                return series.append(added, live if last_ts is None or live[0] > last_ts else None)
+            except Exception as e:
+                print(f"Error saving history for {key}: {e}")
+                return []
+    
+    def get_arrays(self, key, days=None):
+        """Columnas (ts, price, volume) de los últimos `days` días como arrays de numpy, sin copiar"""
+        cutoff = (time.time() - days * 86400) * 1000 if days is not None else None
+        return self.open_series(key).slice_since(cutoff)
+    
+    def get_closed_points(self, key, days=None):
+        """Velas cerradas [ts_ms, precio, volumen] de los últimos `days` días (todas si es None)"""
+        columns = self.get_arrays(key, days)
+        return [
+            [ts, price, int(volume) if volume.is_integer() else volume]
+            for ts, price, volume in zip(columns['ts'].tolist(), columns['price'].tolist(), columns['volume'].tolist())
+        ]
+    
+    def get_points(self, key, days=365):
+        """Puntos [ts_ms, precio, volumen] de los últimos `days` días, incluyendo el provisional"""
+        points = self.get_closed_points(key, days)
+        live = self.get_live(key)
+        if live:
+            points.append(live)
+        return points
+    
+    def get_series(self, key, days=365):
+        """Serie histórica en el formato de `historical_data` (timestamp ISO, price, volume)"""
+        return [
+            {
+                'timestamp': datetime.fromtimestamp(ts / 1000).isoformat(),
+                'price': price,
+                'volume': volume
+            }
+            for ts, price, volume in self.get_points(key, days)
+        ]
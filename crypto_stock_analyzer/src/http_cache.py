@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# TTL por tipo de endpoint: cotizaciones cortas, historial largo
+DEFAULT_TTL_RULES = [
+    {'name': 'coingecko_history', 'pattern': r'api\.coingecko\.com/api/v3/coins/[^/?]+/market_chart', 'ttl': 3600},
+    {'name': 'coingecko_quote', 'pattern': r'api\.coingecko\.com/api/v3/(coins/[^/?]+$|simple/price)', 'ttl': 60},
+    # El gráfico de Yahoo trae cotización y velas: TTL corto; period2 (= ahora) no forma parte de la clave
+    {'name': 'yahoo_chart', 'pattern': r'finance\.yahoo\.com/v8/finance/chart/', 'ttl': 60, 'ignore_params': ('period2',)},
+    {'name': 'yahoo_quote', 'pattern': r'finance\.yahoo\.com/v7/finance/', 'ttl': 30}
+]
+
+# Cabeceras que se guardan con la respuesta
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+class ResponseCache:
+    """Caché en disco de respuestas HTTP con TTL por endpoint, revalidación condicional
+    (ETag / Last-Modified) y respuestas caducadas como respaldo si falla la red"""
+    
+    def __init__(self, cache_dir, ttl_rules=None, max_age=7 * 86400):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.rules = [dict(rule, regex=re.compile(rule['pattern'])) for rule in (ttl_rules or DEFAULT_TTL_RULES)]
+        self.max_age = max_age
+        
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stale': 0, 'stores': 0}
+        
+        self.prune()
+    
+    def get_rule(self, url):
+        """Regla de TTL que aplica a la URL (o None si no se cachea)"""
+        for rule in self.rules:
+            if rule['regex'].search(url):
+                return rule
+        return None
+    
+    def make_key(self, url, params, rule):
+        ignored = rule.get('ignore_params', ())
+        params = sorted((k, str(v)) for k, v in (params or {}).items() if k not in ignored)
+        return hashlib.sha1(json.dumps([url, params]).encode('utf-8')).hexdigest()
+    
+    def get_entry_file(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def lookup(self, url, params=None):
+        """Buscar la entrada de una petición: devuelve (clave, entrada o None, fresca) o None si no se cachea"""
+        rule = self.get_rule(url)
+        if rule is None:
+            return None
+        
+        key = self.make_key(url, params, rule)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load_entry(key)
+        
+        fresh = entry is not None and time.time() - entry['stored_at'] < rule['ttl']
+        return key, entry, fresh
+    
+    def _load_entry(self, key):
+        entry_file = self.get_entry_file(key)
+        try:
+            if os.path.exists(entry_file):
+                with open(entry_file, 'r') as f:
+                    entry = json.load(f)
+                with self._lock:
+                    self._entries[key] = entry
+                return entry
+        except Exception as e:
+            print(f"Error loading cached response {key}: {e}")
+        return None
+    
+    def conditional_headers(self, entry):
+        """Cabeceras If-None-Match / If-Modified-Since para revalidar una entrada caducada"""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry['headers'].get('ETag'):
+            headers['If-None-Match'] = entry['headers']['ETag']
+        if entry['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+    
+    def store(self, key, url, response):
+        """Guardar una respuesta 200"""
+        entry = {
+            'url': url,
+            'status_code': response.status_code,
+            'headers': {name: response.headers[name] for name in STORED_HEADERS if name in response.headers},
+            'body': response.text,
+            'stored_at': time.time()
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self.stats['stores'] += 1
+        self._write_entry(key, entry)
+    
+    def touch(self, key, entry):
+        """Marcar como fresca una entrada revalidada con 304"""
+        entry['stored_at'] = time.time()
+        self._write_entry(key, entry)
+    
+    def _write_entry(self, key, entry):
+        entry_file = self.get_entry_file(key)
+        temp_file = entry_file + '.tmp'
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(temp_file, entry_file)
+        except Exception as e:
+            print(f"Error saving cached response {key}: {e}")
+    
+    def record(self, outcome):
+        """Contar un acierto, fallo, revalidación o respuesta caducada servida"""
+        with self._lock:
+            self.stats[outcome] += 1
+    
+    def to_response(self, entry, cache_status):
+        """Reconstruir un `requests.Response` desde una entrada"""
+        response = requests.Response()
+        response.status_code = entry['status_code']
+        response._content = entry['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = entry['url']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.headers['X-Cache'] = cache_status
+        return response
+    
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+    
+    def prune(self):
+        """Borrar entradas que llevan más de `max_age` segundos sin actualizarse"""
+        cutoff = time.time() - self.max_age
+        try:
+            for filename in os.listdir(self.cache_dir):
+                entry_file = os.path.join(self.cache_dir, filename)
+                if os.path.getmtime(entry_file) < cutoff:
+                    os.remove(entry_file)
+        except Exception as e:
+            print(f"Error pruning response cache: {e}")
@@ -0,0 +1,240 @@
+import numpy as np
+
+def rsi_from_averages(avg_gain, avg_loss):
+    """RSI a partir de la ganancia y pérdida medias"""
+    if avg_loss > 0:
+        rs = avg_gain / avg_loss
+        return float(100 - (100 / (1 + rs)))
+    return 100.0
+
+
+def invalidation_from_recent(recent, volatility):
+    """Nivel de invalidación a partir de los últimos 20 precios y la volatilidad de referencia"""
+    recent = np.asarray(recent, dtype=np.float64)
+    current_price = float(recent[-1])
+    
+    # Mínimos locales: menores o iguales que los dos vecinos de cada lado
+    middle = recent[2:-2]
+    is_support = (
+        (middle <= recent[1:-3]) & (middle <= recent[:-4]) &
+        (middle <= recent[3:-1]) & (middle <= recent[4:])
+    )
+    support_levels = middle[is_support]
+    
+    if not len(support_levels):
+        recent_lows = np.sort(recent)[:len(recent) // 3]
+        mean_low = recent_lows.mean()
+        std_dev = np.sqrt(((recent_lows - mean_low) ** 2).mean())
+        invalidation_level = max(float(mean_low - 2 * std_dev), current_price * 0.9)
+    else:
+        valid_supports = support_levels[support_levels < current_price]
+        if len(valid_supports):
+            invalidation_level = float(valid_supports.max())
+        else:
+            invalidation_level = min(float(support_levels.mean()), current_price * 0.95)
+    
+    invalidation_level -= current_price * min(0.05, volatility * 2)
+    
+    # No dejar el stop loss demasiado lejos (máximo 15% below current)
+    return round(max(invalidation_level, current_price * 0.85), 4)
+
+
+class PriceSeries:
+    """Serie de precios con diferencias, retornos y ganancias/pérdidas calculadas una sola vez"""
+    
+    def __init__(self, prices, volumes=None):
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.volumes = np.asarray(volumes if volumes is not None else [], dtype=np.float64)
+        self.diffs = np.diff(self.prices)
+        self.abs_diffs = np.abs(self.diffs)
+        self.gains = np.where(self.diffs > 0, self.diffs, 0.0)
+        self.losses = np.where(self.diffs > 0, 0.0, -self.diffs)
+        self.returns = self.diffs / self.prices[:-1]
+    
+    def __len__(self):
+        return len(self.prices)
+    
+    @property
+    def last(self):
+        return float(self.prices[-1])
+    
+    def sma(self, period):
+        """Media simple de los últimos `period` precios"""
+        return float(self.prices[-period:].mean())
+    
+    def rsi(self, period):
+        """RSI con medias simples de ganancias/pérdidas de los últimos `period` cambios"""
+        if len(self.prices) < period + 1:
+            return 50.0
+        
+        return rsi_from_averages(self.gains[-period:].mean(), self.losses[-period:].mean())
+    
+    def ema(self, period):
+        """EMA sembrada con la SMA de los primeros `period` precios (forma cerrada de la recursión)"""
+        prices = self.prices
+        if len(prices) < period:
+            return float(prices[-1]) if len(prices) else 0
+        
+        multiplier = 2 / (period + 1)
+        decay = 1 - multiplier
+        rest = prices[period:]
+        seed = prices[:period].mean()
+        
+        # ema_n = seed * decay^m + multiplier * sum(decay^(m-1-j) * p_j)
+        weights = decay ** np.arange(len(rest) - 1, -1, -1, dtype=np.float64)
+        return float(seed * decay ** len(rest) + multiplier * np.dot(weights, rest))
+    
+    def bollinger(self, period=20):
+        """Bandas de Bollinger (SMA ± 2 desviaciones poblacionales)"""
+        window = self.prices[-period:]
+        sma = window.mean()
+        std_dev = float(np.sqrt(((window - sma) ** 2).mean()))
+        upper = float(sma + 2 * std_dev)
+        lower = float(sma - 2 * std_dev)
+        return upper, lower, (upper - lower) / float(sma)
+    
+    def leading_volatility(self, count):
+        """Desviación estándar muestral de los primeros `count` retornos de la serie"""
+        returns = self.returns[:count]
+        return float(returns.std(ddof=1)) if len(returns) > 1 else 0
+    
+    def atr(self, period=14):
+        """ATR usando el cierre como máximo/mínimo (True Range = |cambio|)"""
+        prices = self.prices
+        if len(prices) < period + 1:
+            return float(prices[-1]) * 0.02
+        
+        true_ranges = self.abs_diffs
+        if len(true_ranges) >= period:
+            atr = true_ranges[-period:].mean()
+        else:
+            atr = true_ranges.mean()
+        return round(float(atr), 6)
+    
+    def invalidation_level(self):
+        """Nivel de invalidación (stop loss sugerido) basado en soportes de los últimos 20 días"""
+        prices = self.prices
+        if len(prices) < 20:
+            return float(prices[-1]) * 0.95
+        
+        # Ajuste por volatilidad de los primeros 10 retornos
+        returns = self.returns[:10]
+        volatility = float(returns.std(ddof=1)) if len(returns) > 1 else 0.02
+        return invalidation_from_recent(prices[-20:], volatility)
+    
+    def volume_trend(self):
+        """Tendencia de volumen para validar movimientos de precio"""
+        prices = self.prices
+        volumes = self.volumes
+        if len(prices) < 10 or len(volumes) < 10:
+            return 'INSUFFICIENT_DATA'
+        
+        price_change = (prices[-1] - prices[-10]) / prices[-10]
+        recent_volume_avg = volumes[-5:].sum() / 5
+        historical_volume_avg = volumes[-10:-5].sum() / 5
+        volume_ratio = recent_volume_avg / historical_volume_avg if historical_volume_avg > 0 else 1
+        
+        if price_change > 0.02:
+            if volume_ratio > 1.2:
+                return 'BULLISH_CONFIRMED'
+            elif volume_ratio < 0.8:
+                return 'BULLISH_WEAK'
+            return 'BULLISH_NEUTRAL'
+        elif price_change < -0.02:
+            if volume_ratio > 1.2:
+                return 'BEARISH_CONFIRMED'
+            elif volume_ratio < 0.8:
+                return 'BEARISH_WEAK'
+            return 'BEARISH_NEUTRAL'
+        if volume_ratio > 1.5:
+            return 'ACCUMULATION'
+        return 'NEUTRAL'
+    
+    def momentum(self, lookback):
+        """Variación porcentual respecto al precio de hace `lookback` posiciones"""
+        base = float(self.prices[-lookback])
+        return (self.last - base) / base * 100
+
+
+def calculate_indicators(prices, volumes):
+    """Indicadores anuales (mismas claves y valores que RealDataCollector.calculate_crypto_indicators)"""
+    if len(prices) < 50:
+        return {}
+    
+    series = PriceSeries(prices, volumes)
+    n = len(series)
+    current_price = series.last
+    indicators = {}
+    
+    indicators['rsi_14'] = series.rsi(14)
+    indicators['rsi_30'] = series.rsi(30)
+    
+    indicators['sma_20'] = series.sma(20)
+    indicators['sma_50'] = series.sma(50)
+    if n >= 100:
+        indicators['sma_100'] = series.sma(100)
+    if n >= 200:
+        indicators['sma_200'] = series.sma(200)
+    
+    if 'sma_200' in indicators and indicators['sma_200'] > 0:
+        indicators['distance_to_sma200_pct'] = ((current_price - indicators['sma_200']) / indicators['sma_200']) * 100
+    
+    indicators['bb_upper'], indicators['bb_lower'], indicators['bb_width'] = series.bollinger(20)
+    
+    if n >= 26:
+        indicators['macd'] = series.ema(12) - series.ema(26)
+        # La señal se calcula sobre un único valor de MACD, por lo que coincide con él
+        indicators['macd_signal'] = indicators['macd']
+        indicators['macd_histogram'] = indicators['macd'] - indicators['macd_signal']
+    
+    if n >= 30:
+        indicators['volatility_30d'] = series.leading_volatility(30)
+    if n >= 252:
+        indicators['volatility_annual'] = series.leading_volatility(252)
+    
+    indicators['year_high'] = float(series.prices.max())
+    indicators['year_low'] = float(series.prices.min())
+    indicators['year_range'] = indicators['year_high'] - indicators['year_low']
+    indicators['current_position'] = (current_price - indicators['year_low']) / indicators['year_range']
+    
+    indicators['invalidation_level'] = series.invalidation_level()
+    indicators['atr'] = series.atr(14)
+    
+    if n >= 90:
+        indicators['momentum_3m'] = series.momentum(90)
+    if n >= 180:
+        indicators['momentum_6m'] = series.momentum(180)
+    
+    indicators['volume_trend'] = series.volume_trend()
+    
+    return indicators
+
+
+def calculate_monthly_indicators(prices, volumes):
+    """Indicadores mensuales (mismas claves y valores que RealDataCollector.calculate_monthly_indicators)"""
+    if len(prices) < 20:
+        return {}
+    
+    series = PriceSeries(prices, volumes)
+    indicators = {}
+    
+    indicators['rsi_14'] = series.rsi(14)
+    indicators['sma_20'] = series.sma(20)
+    indicators['bb_upper'], indicators['bb_lower'], indicators['bb_width'] = series.bollinger(20)
+    
+    if len(series) >= 10:
+        indicators['volatility_10d'] = series.leading_volatility(10)
+    
+    indicators['month_high'] = float(series.prices.max())
+    indicators['month_low'] = float(series.prices.min())
+    indicators['month_range'] = indicators['month_high'] - indicators['month_low']
+    indicators['current_month_position'] = (series.last - indicators['month_low']) / indicators['month_range']
+    
+    if len(series) >= 7:
+        indicators['momentum_1w'] = series.momentum(7)
+    
+    indicators['volume_trend'] = series.volume_trend()
+    indicators['atr'] = series.atr(14)
+    
+    return indicators
+
@@ -0,0 +1,37 @@
+class AnalysisPipeline:
+    """Recolección → análisis → decisiones en una sola pasada, pasando los datos en memoria"""
+    
+    def __init__(self, data_collector, ai_analyzer, decision_engine=None, database=None):
+        self.data_collector = data_collector
+        self.ai_analyzer = ai_analyzer
+        self.decision_engine = decision_engine
+        self.database = database
+        
+        # Los análisis cacheados de un activo dejan de valer en cuanto el colector trae datos nuevos
+        self.data_collector.add_ingest_listener(self.ai_analyzer.invalidate_cache)
+    
+    def run(self, cryptos, stocks, include_recommendations=False):
+        """Actualizar datos y analizarlos una única vez.
+        
+        Devuelve {'data': ..., 'analysis': ..., 'recommendations': ...} sin volver a leer disco.
+        """
+        data = self.data_collector.update_all_data(cryptos, stocks)
+        return self.process(data, include_recommendations)
+    
+    def process(self, data, include_recommendations=False):
+        """Analizar datos ya recolectados (y generar recomendaciones si se piden)"""
+        analysis = self.ai_analyzer.analyze_market(data) if data else {}
+        
+        recommendations = {}
+        if include_recommendations and self.decision_engine is not None:
+            recommendations = self.decision_engine.get_recommendations(analysis)
+        
+        # Análisis y recomendaciones de la pasada en una sola transacción
+        if self.database is not None:
+            self.database.save_pipeline_results(analysis, recommendations)
+        
+        return {
+            'data': data,
+            'analysis': analysis,
+            'recommendations': recommendations
+        }
@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+
+
+class PositionJournal:
+    """Persistencia de posiciones: instantánea (`positions.json`) + diario de cambios sólo de anexado.
+    
+    Cada cambio añade una línea JSON al diario (coste constante, sin reescribir todo el archivo).
+    Cada `compact_every` entradas el estado completo se vuelca a la instantánea de forma atómica
+    (archivo temporal + os.replace) y el diario se vacía. Las entradas son idempotentes, así que
+    volver a aplicarlas tras una compactación interrumpida no cambia el resultado.
+    """
+    
+    def __init__(self, snapshot_file, journal_file=None, compact_every=500):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file or os.path.splitext(snapshot_file)[0] + '.journal'
+        self.compact_every = compact_every
+        self.pending_entries = 0
+        self._lock = threading.Lock()
+    
+    def load(self):
+        """Instantánea + diario reaplicado. Una última línea a medias (escritura interrumpida) se descarta"""
+        positions = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r') as f:
+                positions = json.load(f)
+        
+        self.pending_entries = 0
+        if not os.path.exists(self.journal_file):
+            return positions
+        
+        valid_size = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                self.apply(positions, entry)
+                self.pending_entries += 1
+                valid_size += len(line)
+        
+        if os.path.getsize(self.journal_file) > valid_size:
+            os.truncate(self.journal_file, valid_size)
+        return positions
+    
+    def apply(self, positions, entry):
+        """Aplicar una entrada del diario sobre el diccionario de posiciones"""
+        symbol = entry['symbol']
+        if entry['op'] == 'add':
+            symbol_positions = positions.setdefault(symbol, [])
+            for index, position in enumerate(symbol_positions):
+                if position['id'] == entry['position']['id']:
+                    symbol_positions[index] = entry['position']
+                    break
+            else:
+                symbol_positions.append(entry['position'])
+        elif entry['op'] == 'update':
+            for position in positions.get(symbol, []):
+                if position['id'] == entry['id']:
+                    position.update(entry['fields'])
+        elif entry['op'] == 'delete':
+            remaining = [p for p in positions.get(symbol, []) if p['id'] != entry['id']]
+            if remaining:
+                positions[symbol] = remaining
+            else:
+                positions.pop(symbol, None)
+    
+    def append(self, entries):
+        """Anexar entradas al diario (una escritura + fsync). Devuelve True si toca compactar"""
+        if not entries:
+            return False
+        data = ''.join(json.dumps(entry, default=str, separators=(',', ':')) + '\n' for entry in entries)
+        with self._lock:
+            with open(self.journal_file, 'a') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending_entries += len(entries)
+            return self.pending_entries >= self.compact_every
+    
+    def compact(self, positions):
+        """Volcar el estado completo a la instantánea de forma atómica y vaciar el diario"""
+        with self._lock:
+            temp_file = self.snapshot_file + '.tmp'
+            with open(temp_file, 'w') as f:
+                json.dump(positions, f, indent=2, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.snapshot_file)
+            
+            # Si se interrumpe aquí el diario se reaplica sobre la nueva instantánea sin efecto
+            temp_journal = self.journal_file + '.tmp'
+            open(temp_journal, 'w').close()
+            os.replace(temp_journal, self.journal_file)
+            self.pending_entries = 0
@@ -1,7 +1,11 @@
-import json
 import os
 from datetime import datetime
 
+try:
+    from .position_journal import PositionJournal
+except ImportError:
+    from position_journal import PositionJournal
+
 class PositionManager:
     """Gestor de posiciones con sistema de señales avanzado"""
     
@@ -9,25 +13,31 @@ class PositionManager:
         self.data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
         os.makedirs(self.data_dir, exist_ok=True)
         self.positions_file = os.path.join(self.data_dir, 'positions.json')
+        
+        # Cada cambio se anexa a positions.journal; positions.json se reescribe sólo al compactar
+        self.journal = PositionJournal(self.positions_file)
         self.load_positions()
     
     def load_positions(self):
         """Cargar posiciones guardadas"""
         try:
-            if os.path.exists(self.positions_file):
-                with open(self.positions_file, 'r') as f:
-                    self.positions = json.load(f)
-            else:
-                self.positions = {}
+            self.positions = self.journal.load()
         except Exception as e:
             print(f"Error loading positions: {e}")
             self.positions = {}
     
     def save_positions(self):
-        """Guardar posiciones en archivo"""
+        """Guardar todas las posiciones en archivo (compactación atómica del diario)"""
+        try:
+            self.journal.compact(self.positions)
+        except Exception as e:
+            print(f"Error saving positions: {e}")
+    
+    def record_changes(self, entries):
+        """Anexar cambios al diario y compactar cuando se acumulan demasiados"""
         try:
-            with open(self.positions_file, 'w') as f:
-                json.dump(self.positions, f, indent=2, default=str)
+            if self.journal.append(entries):
+                self.save_positions()
         except Exception as e:
             print(f"Error saving positions: {e}")
     
@@ -37,8 +47,9 @@ class PositionManager:
         if symbol not in self.positions:
             self.positions[symbol] = []
         
+        # Siguiente id libre (len + 1 repetía ids después de borrar posiciones)
         position = {
-            'id': len(self.positions[symbol]) + 1,
+            'id': max((p['id'] for p in self.positions[symbol]), default=0) + 1,
             'symbol': symbol.upper(),
             'entry_price': entry_price,
             'position_type': position_type.upper(),  # LONG or SHORT
@@ -57,7 +68,7 @@ class PositionManager:
         }
         
         self.positions[symbol].append(position)
-        self.save_positions()
+        self.record_changes([{'op': 'add', 'symbol': symbol, 'position': position}])
         return position
     
     def update_position_signals(self, symbol, current_price, analysis_data):
@@ -66,6 +77,7 @@ class PositionManager:
             return
         
         symbol_positions = self.positions[symbol]
+        changes = []
         
         for position in symbol_positions:
             if position['status'] != 'ACTIVE':
@@ -113,8 +125,13 @@ class PositionManager:
                 elif current_price >= atr_stop_loss:
                     position['status'] = 'CLOSED_SL'
                     position['close_reason'] = 'ATR_STOP_LOSS_HIT'
+            
+            fields = {name: position.get(name) for name in (
+                'current_price', 'current_signal', 'atr_stop_loss', 'pnl', 'pnl_pct',
+                'last_updated', 'status', 'close_reason') if name in position}
+            changes.append({'op': 'update', 'symbol': symbol, 'id': position['id'], 'fields': fields})
         
-        self.save_positions()
+        self.record_changes(changes)
     
     def calculate_trading_signal(self, current_price, entry_price, position_type='LONG'):
         """Calcular señal de trading basada en precio actual vs entrada"""
@@ -239,7 +256,9 @@ class PositionManager:
                 position['final_pnl'] = pnl
                 position['final_pnl_pct'] = pnl_pct
                 
-                self.save_positions()
+                fields = {name: position[name] for name in (
+                    'status', 'close_price', 'close_date', 'close_reason', 'final_pnl', 'final_pnl_pct')}
+                self.record_changes([{'op': 'update', 'symbol': symbol, 'id': position_id, 'fields': fields}])
                 return True
         
         return False
@@ -255,7 +274,7 @@ class PositionManager:
         if not self.positions[symbol]:
             del self.positions[symbol]
         
-        self.save_positions()
+        self.record_changes([{'op': 'delete', 'symbol': symbol, 'id': position_id}])
         return True
     
     def get_signals_interpretation(self, signal):
@@ -424,7 +424,7 @@ class PositionManagerWindow:
                 
                 # Obtener datos y análisis
                 current_data = self.data_collector.update_all_data(cryptos, stocks)
-                analysis_results = self.ai_analyzer.analyze_market()
+                analysis_results = self.ai_analyzer.analyze_market(current_data)
                 
                 # Actualizar señales para cada posición activa
                 active_positions = self.position_manager.get_active_positions()
@@ -0,0 +1,140 @@
+import heapq
+import itertools
+import threading
+import time
+
+# Prioridades: menor número = se atiende antes
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Límites por defecto de cada proveedor (peticiones por segundo y ráfaga máxima)
+DEFAULT_PROVIDER_LIMITS = {
+    'coingecko': {'rate': 0.5, 'capacity': 5, 'min_rate': 0.1, 'max_rate': 1.0},
+    'yahoo': {'rate': 4.0, 'capacity': 8, 'min_rate': 0.5, 'max_rate': 8.0}
+}
+
+class TokenBucket:
+    """Cubeta de tokens con ritmo de recarga ajustable"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+    
+    def refill(self, now):
+        """Recargar tokens según el tiempo transcurrido"""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+    
+    def try_consume(self, now):
+        """Consumir un token; devuelve 0 si se pudo o los segundos hasta el siguiente token"""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ProviderState:
+    """Estado de planificación de un proveedor: cubeta, cola de espera y backoff"""
+    
+    def __init__(self, limits):
+        self.bucket = TokenBucket(limits['rate'], limits['capacity'])
+        self.min_rate = limits.get('min_rate', limits['rate'])
+        self.max_rate = limits.get('max_rate', limits['rate'])
+        self.condition = threading.Condition()
+        self.waiting = []
+        self.blocked_until = 0.0
+        self.consecutive_429 = 0
+        self.stats = {'granted': 0, 'throttled': 0, 'wait_time': 0.0}
+
+
+class RequestScheduler:
+    """Planificador de peticiones con presupuesto por proveedor, prioridades y backoff ante HTTP 429"""
+    
+    def __init__(self, limits=None, backoff_base=2.0, backoff_max=60.0):
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sequence = itertools.count()
+        self._providers = {}
+        for provider, provider_limits in (limits or DEFAULT_PROVIDER_LIMITS).items():
+            self._providers[provider] = ProviderState(provider_limits)
+    
+    def acquire(self, provider, priority=PRIORITY_INTERACTIVE):
+        """Bloquear hasta que el proveedor tenga presupuesto; devuelve los segundos esperados"""
+        state = self._providers.get(provider)
+        if state is None:
+            return 0.0
+        
+        started = time.monotonic()
+        entry = (priority, next(self._sequence))
+        
+        with state.condition:
+            heapq.heappush(state.waiting, entry)
+            try:
+                while True:
+                    timeout = None
+                    if state.waiting[0] == entry:
+                        now = time.monotonic()
+                        if now < state.blocked_until:
+                            timeout = state.blocked_until - now
+                        else:
+                            timeout = state.bucket.try_consume(now)
+                            if timeout == 0:
+                                break
+                    state.condition.wait(timeout)
+            finally:
+                state.waiting.remove(entry)
+                heapq.heapify(state.waiting)
+                state.condition.notify_all()
+            
+            waited = time.monotonic() - started
+            state.stats['granted'] += 1
+            state.stats['wait_time'] += waited
+        
+        return waited
+    
+    def report_response(self, provider, status_code, retry_after=None):
+        """Ajustar el ritmo según la respuesta: backoff ante 429, subida gradual si va bien"""
+        state = self._providers.get(provider)
+        if state is None:
+            return 0.0
+        
+        with state.condition:
+            bucket = state.bucket
+            if status_code == 429:
+                state.consecutive_429 += 1
+                state.stats['throttled'] += 1
+                
+                # Reducir el ritmo a la mitad y pausar el proveedor (Retry-After si viene)
+                bucket.rate = max(state.min_rate, bucket.rate / 2)
+                bucket.tokens = 0.0
+                delay = retry_after
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base ** state.consecutive_429)
+                state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+                state.condition.notify_all()
+                return delay
+            
+            if status_code < 500:
+                # Aumento aditivo para volver a acercarse al límite real
+                state.consecutive_429 = 0
+                bucket.rate = min(state.max_rate, bucket.rate + (state.max_rate - state.min_rate) / 20)
+            return 0.0
+    
+    def get_stats(self):
+        """Obtener estadísticas por proveedor"""
+        stats = {}
+        for provider, state in self._providers.items():
+            with state.condition:
+                stats[provider] = {
+                    'rate': round(state.bucket.rate, 4),
+                    'granted': state.stats['granted'],
+                    'throttled': state.stats['throttled'],
+                    'wait_time': round(state.stats['wait_time'], 3),
+                    'queued': len(state.waiting)
+                }
+        return stats
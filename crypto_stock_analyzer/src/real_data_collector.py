@@ -1,19 +1,71 @@
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 import time
 import json
 import os
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from datetime import datetime
 import warnings
+
+try:
+    from .rate_limiter import RequestScheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+    from .data_version import compute_data_version
+    from .http_cache import ResponseCache
+    from .alert_index import build_alert_index
+    from .symbols import COINGECKO_IDS, yahoo_crypto_ticker, infer_asset_type
+except ImportError:
+    from rate_limiter import RequestScheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+    from data_version import compute_data_version
+    from http_cache import ResponseCache
+    from alert_index import build_alert_index
+    from symbols import COINGECKO_IDS, yahoo_crypto_ticker, infer_asset_type
 warnings.filterwarnings('ignore')
 
+# Conexiones abiertas por cada hilo: urllib3 abre la conexión en el hilo que hace la petición,
+# así que la diferencia antes/después es exacta aunque varios hilos compartan el pool
+_opened_connections = threading.local()
+
+def count_opened_connections():
+    return getattr(_opened_connections, 'count', 0)
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    """Pool de urllib3 que anota cada conexión nueva en el hilo que la abre"""
+    
+    def _new_conn(self):
+        _opened_connections.count = count_opened_connections() + 1
+        return super()._new_conn()
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    """Pool de urllib3 que anota cada conexión nueva en el hilo que la abre"""
+    
+    def _new_conn(self):
+        _opened_connections.count = count_opened_connections() + 1
+        return super()._new_conn()
+
+COUNTING_POOL_CLASSES = {'http': CountingHTTPConnectionPool, 'https': CountingHTTPSConnectionPool}
+
+def load_indicator_engine():
+    """Módulo de indicadores (NumPy); se importa la primera vez que se calcula un indicador"""
+    try:
+        from . import indicators
+    except ImportError:
+        import indicators
+    return indicators
+
 class RealDataCollector:
     """Colector de datos que usa APIs REST directamente sin dependencias problemáticas"""
     
-    def __init__(self):
+    def __init__(self, database=None):
         self.data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
         os.makedirs(self.data_dir, exist_ok=True)
         
+        # Base de datos SQLite opcional: cada refresco se guarda con un único executemany
+        self.database = database
+        
         # Headers para simular un navegador real
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -23,12 +75,70 @@ class RealDataCollector:
             'Connection': 'keep-alive',
         }
         
+        # Descarga concurrente: hilos para activos y para las sub-peticiones de cada activo
+        self.max_workers = 8
+        self.max_subrequest_workers = 6
+        
+        # Presupuesto de peticiones por proveedor (token bucket con backoff ante HTTP 429)
+        self.scheduler = RequestScheduler()
+        self.max_throttle_retries = 2
+        
+        # Caché en disco de respuestas (TTL por endpoint, revalidación y respaldo sin red)
+        self.response_cache = ResponseCache(os.path.join(self.data_dir, 'http_cache'))
+        
+        # Sesiones HTTP por host con pool de conexiones keep-alive y reintentos ante errores 5xx
+        self.pool_size = 10
+        self.http_retries = 2
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+        
+        # Historial local por símbolo para descargar sólo velas nuevas
+        self.history_days = 365
+        self.monthly_days = 30
+        self._history_store = None  # se abre al usarlo (ver history_store): las cotizaciones no lo necesitan
+        self._history_lock = threading.Lock()
+        
+        # Estado incremental de indicadores por símbolo (se avanza sólo con velas nuevas)
+        self.indicator_states = {}
+        self._indicator_lock = threading.Lock()
+        
+        # Estadísticas de tiempo por proveedor del último refresco
+        self._stats_lock = threading.Lock()
+        self._provider_stats = {}
+        self.last_refresh_stats = {}
+        self._cache_stats_start = {}
+        self.last_quote_stats = {}
+        
+        # Resumen de los últimos datos en memoria (se invalida por fecha de modificación)
+        self._summary_cache = None
+        
+        # Avisos de ingesta: versión de datos por activo y funciones a llamar si cambia
+        self.data_versions = {}
+        self.ingest_listeners = []
+        
+        # Índice de alertas (se construye al evaluar y se descarta al cambiar la configuración)
+        self._alert_index = None
+        
         # Cargar configuración guardada
         self.config_file = os.path.join(self.data_dir, 'watchlist_config.json')
         self.load_watchlist_config()
     
+    @property
+    def history_store(self):
+        """Historial local por símbolo (columnas de NumPy), abierto la primera vez que se usa"""
+        if self._history_store is None:
+            with self._history_lock:
+                if self._history_store is None:
+                    try:
+                        from .history_store import HistoryStore
+                    except ImportError:
+                        from history_store import HistoryStore
+                    self._history_store = HistoryStore(self.data_dir)
+        return self._history_store
+    
     def load_watchlist_config(self):
         """Cargar configuración de watchlist guardada"""
+        self._alert_index = None
         try:
             if os.path.exists(self.config_file):
                 with open(self.config_file, 'r') as f:
@@ -50,6 +160,7 @@ class RealDataCollector:
     
     def save_watchlist_config(self):
         """Guardar configuración de watchlist"""
+        self._alert_index = None
         try:
             self.watchlist_config['updated_at'] = datetime.now().isoformat()
             with open(self.config_file, 'w') as f:
@@ -57,8 +168,8 @@ class RealDataCollector:
         except Exception as e:
             print(f"Error saving config: {e}")
     
-    def add_to_watchlist(self, symbol, custom_name=None, buy_price=None, sell_price=None):
-        """Agregar activo a watchlist con nombres personalizados y precios de alerta"""
+    def add_to_watchlist(self, symbol, custom_name=None, buy_price=None, sell_price=None, asset_type=None):
+        """Agregar activo a watchlist con nombres personalizados y precios de alerta (`asset_type`: 'crypto' o 'stock')"""
         if 'watchlist' not in self.watchlist_config:
             self.watchlist_config['watchlist'] = {}
         
@@ -69,6 +180,7 @@ class RealDataCollector:
             'custom_name': custom_name or symbol.upper(),
             'buy_alert_price': buy_price,
             'sell_alert_price': sell_price,
+            'asset_type': asset_type or infer_asset_type(symbol),
             'added_date': datetime.now().isoformat(),
             'last_updated': datetime.now().isoformat()
         }
@@ -76,160 +188,560 @@ class RealDataCollector:
         self.save_watchlist_config()
         return True
     
+    def get_watchlist_symbols(self, cryptos=(), stocks=()):
+        """Símbolos de la watchlist y de las alertas que no están ya en `cryptos`/`stocks`, separados por tipo"""
+        # (símbolo, tipo): BTC como criptomoneda y BTC como acción son activos distintos
+        known = {(s.strip().upper(), 'crypto') for s in cryptos if s and s.strip()}
+        known |= {(s.strip().upper(), 'stock') for s in stocks if s and s.strip()}
+        watchlist_cryptos, watchlist_stocks = [], []
+        assets = list(self.get_watchlist().values()) + list(self.watchlist_config.get('alerts', {}).values())
+        for asset in assets:
+            symbol = asset['symbol'].upper()
+            # Tipo declarado en la entrada; las entradas antiguas sin tipo se clasifican por CoinGecko
+            asset_type = asset.get('asset_type') or infer_asset_type(symbol)
+            if (symbol, asset_type) in known:
+                continue
+            known.add((symbol, asset_type))
+            if asset_type == 'crypto':
+                watchlist_cryptos.append(symbol)
+            else:
+                watchlist_stocks.append(symbol)
+        return watchlist_cryptos, watchlist_stocks
+    
+    def get_alert_index(self):
+        """Índice de alertas por símbolo (se reconstruye cuando cambia la configuración)"""
+        if self._alert_index is None:
+            self._alert_index = build_alert_index(self.watchlist_config)
+        return self._alert_index
+    
+    def add_price_alert(self, symbol, alert_type, target_price, custom_name=None, asset_type=None):
+        """Agregar una alerta adicional (BUY: precio <= objetivo, SELL: precio >= objetivo)"""
+        alerts = self.watchlist_config.setdefault('alerts', {})
+        asset_type = asset_type or infer_asset_type(symbol)
+        alert_id = f"{symbol.upper()}_{asset_type}_{alert_type.upper()}_{target_price}"
+        alerts[alert_id] = {
+            'symbol': symbol.upper(),
+            'type': alert_type.upper(),
+            'target_price': target_price,
+            'custom_name': custom_name or symbol.upper(),
+            'asset_type': asset_type,
+            'added_date': datetime.now().isoformat()
+        }
+        self.save_watchlist_config()
+        return alert_id
+    
     def check_price_alerts(self, current_data):
         """Verificar si se activan alertas de precios"""
         alerts_triggered = []
-        watchlist = self.get_watchlist()
         
-        for key, asset in watchlist.items():
-            symbol = asset['symbol'].upper()
-            buy_price = asset.get('buy_alert_price')
-            sell_price = asset.get('sell_alert_price')
-            
-            # Buscar el símbolo en los datos actuales (puede ser BTC, BTC_crypto, etc.)
-            current_price = None
-            found_data_key = None
-            
-            for dk in current_data.keys():
-                if symbol.lower() in dk.lower():
-                    current_price = current_data[dk]['current_price']
-                    found_data_key = dk
-                    break
-            
-            # Si no encontramos el símbolo en datos actuales, continuar
-            if current_price is None:
-                continue
-            
-            # Verificar alerta de compra
-            if buy_price and current_price <= buy_price:
-                alerts_triggered.append({
-                    'symbol': symbol,
-                    'custom_name': asset['custom_name'],
-                    'type': 'BUY',
-                    'current_price': current_price,
-                    'target_price': buy_price,
-                    'message': f"¡ALERTA DE COMPRA! {asset['custom_name']} ha alcanzado ${buy_price:.4f}",
-                    'data_source': found_data_key
-                })
+        # Coincidencia exacta por símbolo canónico y umbrales ordenados (búsqueda binaria)
+        for alert, current_price, data_key in self.get_alert_index().evaluate_data(current_data):
+            if alert['type'] == 'BUY':
+                message = f"¡ALERTA DE COMPRA! {alert['custom_name']} ha alcanzado ${alert['target_price']:.4f}"
+            else:
+                message = f"¡ALERTA DE VENTA! {alert['custom_name']} ha alcanzado ${alert['target_price']:.4f}"
             
-            # Verificar alerta de venta
-            if sell_price and current_price >= sell_price:
-                alerts_triggered.append({
-                    'symbol': symbol,
-                    'custom_name': asset['custom_name'],
-                    'type': 'SELL',
-                    'current_price': current_price,
-                    'target_price': sell_price,
-                    'message': f"¡ALERTA DE VENTA! {asset['custom_name']} ha alcanzado ${sell_price:.4f}",
-                    'data_source': found_data_key
-                })
+            alerts_triggered.append({
+                'symbol': alert['symbol'],
+                'custom_name': alert['custom_name'],
+                'type': alert['type'],
+                'current_price': current_price,
+                'target_price': alert['target_price'],
+                'message': message,
+                'data_source': data_key
+            })
         
         return alerts_triggered
     
-    def update_all_data(self, cryptos, stocks):
+    def update_all_data(self, cryptos, stocks, concurrent=True):
         """Actualizar datos para todas las criptomonedas y acciones"""
         results = {}
+        started = time.perf_counter()
+        self.reset_refresh_stats()
+        
+        # Tareas en orden: primero criptomonedas, luego acciones
+        tasks = [(f'{crypto.upper()}_crypto', crypto, self.get_crypto_data) for crypto in cryptos if crypto]
+        tasks += [(f'{stock.upper()}_stock', stock, self.get_stock_data) for stock in stocks if stock]
+        
+        if concurrent and len(tasks) > 1:
+            # Descargar todos los activos en paralelo; el planificador por proveedor evita el rate limiting
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+                futures = [(key, symbol, executor.submit(fetch, symbol)) for key, symbol, fetch in tasks]
+                for key, symbol, future in futures:
+                    try:
+                        data = future.result()
+                        if data:
+                            results[key] = data
+                    except Exception as e:
+                        print(f"Error getting {symbol} data: {e}")
+        else:
+            for key, symbol, fetch in tasks:
+                try:
+                    data = fetch(symbol)
+                    if data:
+                        results[key] = data
+                except Exception as e:
+                    print(f"Error getting {symbol} data: {e}")
         
-        # Actualizar datos de criptomonedas
-        for crypto in cryptos:
+        for asset in results.values():
+            asset['data_version'] = compute_data_version(asset)
+        
+        self.last_refresh_stats = self.build_refresh_stats(started, len(tasks), concurrent)
+        
+        # Guardar datos
+        self.save_data(results)
+        if self.database is not None:
+            self.database.save_refresh(results, self.get_unsaved_candles(results))
+        self.notify_ingest(results)
+        return results
+    
+    def add_ingest_listener(self, callback):
+        """Registrar una función que recibe las claves de los activos cuyos datos cambiaron"""
+        if callback not in self.ingest_listeners:
+            self.ingest_listeners.append(callback)
+    
+    def notify_ingest(self, results):
+        """Avisar a los oyentes de los activos con versión de datos nueva"""
+        changed = [key for key, asset in results.items() if self.data_versions.get(key) != asset.get('data_version')]
+        for key in changed:
+            self.data_versions[key] = results[key].get('data_version')
+        
+        if not changed:
+            return
+        for callback in self.ingest_listeners:
             try:
-                data = self.get_crypto_data(crypto)
-                if data:
-                    results[f'{crypto.upper()}_crypto'] = data
-                time.sleep(1)  # Evitar rate limiting
+                callback(changed)
             except Exception as e:
-                print(f"Error getting {crypto} data: {e}")
-                
-        # Actualizar datos de acciones
-        for stock in stocks:
+                print(f"Error notifying data ingest: {e}")
+    
+    def get_unsaved_candles(self, results):
+        """Velas cerradas de cada activo posteriores a la última que tiene la base de datos"""
+        candles = {}
+        for key, asset in results.items():
+            history_key = asset.get('history_key')
+            if not history_key:
+                continue
             try:
-                data = self.get_stock_data(stock)
-                if data:
-                    results[f'{stock.upper()}_stock'] = data
-                time.sleep(1)  # Evitar rate limiting
+                last_ts = self.database.get_last_candle_ts(key)
+                columns = self.history_store.open_series(history_key).slice_since(last_ts + 1 if last_ts is not None else None)
+                candles[key] = list(zip(columns['ts'].tolist(), columns['price'].tolist(), columns['volume'].tolist()))
             except Exception as e:
-                print(f"Error getting {stock} data: {e}")
+                print(f"Error reading candles for {key}: {e}")
+        return candles
+    
+    def build_indicators(self, history_key, added, historical_data, monthly_data):
+        """Indicadores del activo desde el estado incremental; si no está disponible, cálculo completo"""
+        streamed = self.get_streaming_indicators(history_key, added)
+        if streamed is not None:
+            return streamed
+        return self.calculate_crypto_indicators(historical_data), self.calculate_monthly_indicators(monthly_data)
+    
+    def get_streaming_indicators(self, history_key, added):
+        """Avanzar el estado de indicadores con las velas cerradas nuevas y combinarlo
+        con el punto provisional. Coste constante por vela en lugar de recalcular el año"""
+        try:
+            # Todo bajo el bloqueo: los hilos de actualización comparten `indicator_states`
+            with self._indicator_lock:
+                closed_points = None
+                state = self.indicator_states.get(history_key)
+                if state is None:
+                    try:
+                        from .streaming_indicators import StreamingIndicators
+                    except ImportError:
+                        from streaming_indicators import StreamingIndicators
+                    state = StreamingIndicators(self.history_days, self.monthly_days)
+                    saved = self.history_store.load_state(history_key)
+                    if saved:
+                        closed_points = self.history_store.get_closed_points(history_key)
+                        state.load_dict(saved, closed_points)
+                    self.indicator_states[history_key] = state
                 
-        # Guardar datos
-        self.save_data(results)
-        return results
+                rebuilt = False
+                if state.last_ts is not None and all(point[0] > state.last_ts for point in added):
+                    for point in added:
+                        state.push(point)
+                
+                if state.last_ts != self.history_store.get_last_timestamp(history_key):
+                    # Estado ausente o desfasado respecto al historial: reconstruir una vez
+                    if closed_points is None:
+                        closed_points = self.history_store.get_closed_points(history_key)
+                    state.rebuild(closed_points)
+                    rebuilt = True
+                
+                state.expire()
+                if added or rebuilt:
+                    self.history_store.save_state(history_key, state.to_dict())
+                
+                return state.get_indicators(self.history_store.get_live(history_key))
+            
+        except Exception as e:
+            print(f"Error updating streaming indicators for {history_key}: {e}")
+            return None
+    
+    def reset_refresh_stats(self):
+        """Reiniciar estadísticas de tiempo por proveedor"""
+        self._cache_stats_start = self.response_cache.get_stats()
+        with self._stats_lock:
+            self._provider_stats = {}
+    
+    def build_refresh_stats(self, started, asset_count, concurrent):
+        """Construir resumen de tiempos del refresco (wall-clock total y por proveedor)"""
+        with self._stats_lock:
+            providers = {}
+            for provider, stats in self._provider_stats.items():
+                providers[provider] = {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'throttled': stats['throttled'],
+                    'request_time': round(stats['request_time'], 3),
+                    'queue_wait': round(stats['queue_wait'], 3),
+                    'wall_time': round(stats['last_end'] - stats['first_start'], 3),
+                    'new_connections': stats['new_connections'],
+                    'reused_connections': stats['reused_connections'],
+                    'connection_setup_saved': round(self.estimate_setup_saved(stats), 3)
+                }
+        
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'mode': 'concurrent' if concurrent else 'sequential',
+            'assets': asset_count,
+            'total_time': round(time.perf_counter() - started, 3),
+            'providers': providers,
+            'cache': self.get_cache_stats_since(self._cache_stats_start)
+        }
+    
+    def get_cache_stats_since(self, start_stats):
+        """Aciertos/fallos de la caché de respuestas desde un punto de referencia"""
+        stats = self.response_cache.get_stats()
+        return {name: value - start_stats.get(name, 0) for name, value in stats.items()}
+    
+    def estimate_setup_saved(self, stats):
+        """Estimar el tiempo ahorrado al reutilizar conexiones (TCP+TLS) del pool"""
+        if not stats['new_connections'] or not stats['reused_connections']:
+            return 0.0
+        
+        avg_new = stats['new_connection_time'] / stats['new_connections']
+        avg_reused = stats['reused_connection_time'] / stats['reused_connections']
+        return max(0.0, avg_new - avg_reused) * stats['reused_connections']
+    
+    def http_get(self, provider, url, params=None, timeout=10, priority=PRIORITY_INTERACTIVE):
+        """Petición GET planificada por proveedor, con caché, backoff y reintento ante HTTP 429"""
+        cached = self.response_cache.lookup(url, params)
+        if cached is None:
+            return self.scheduled_get(provider, url, params, timeout, priority)
+        
+        key, entry, fresh = cached
+        if fresh:
+            self.response_cache.record('hits')
+            return self.response_cache.to_response(entry, 'HIT')
+        
+        # Caducada o ausente: pedir al proveedor revalidando con ETag / Last-Modified si los hay
+        headers = self.response_cache.conditional_headers(entry)
+        try:
+            response = self.scheduled_get(provider, url, params, timeout, priority, headers)
+        except requests.RequestException:
+            if entry is None:
+                raise
+            self.response_cache.record('stale')
+            return self.response_cache.to_response(entry, 'STALE')
+        
+        if response.status_code == 304 and entry is not None:
+            self.response_cache.record('revalidated')
+            self.response_cache.touch(key, entry)
+            return self.response_cache.to_response(entry, 'REVALIDATED')
+        
+        if response.status_code == 200:
+            self.response_cache.record('misses')
+            self.response_cache.store(key, url, response)
+        elif entry is not None and (response.status_code == 429 or response.status_code >= 500):
+            # Proveedor caído o limitando: servir la última respuesta buena
+            self.response_cache.record('stale')
+            return self.response_cache.to_response(entry, 'STALE')
+        else:
+            self.response_cache.record('misses')
+        return response
+    
+    def scheduled_get(self, provider, url, params=None, timeout=10, priority=PRIORITY_INTERACTIVE, headers=None):
+        """Petición GET planificada por proveedor, con backoff y reintento ante HTTP 429"""
+        for attempt in range(self.max_throttle_retries + 1):
+            waited = self.scheduler.acquire(provider, priority)
+            response = self.timed_get(provider, url, params, timeout, waited, headers)
+            
+            retry_after = self.parse_retry_after(response)
+            self.scheduler.report_response(provider, response.status_code, retry_after)
+            if response.status_code != 429:
+                break
+        
+        return response
+    
+    def get_session(self, url):
+        """Obtener la sesión HTTP con pool de conexiones keep-alive del host"""
+        host = urlparse(url).netloc
+        with self._sessions_lock:
+            session = self.sessions.get(host)
+            if session is None:
+                retries = Retry(
+                    total=self.http_retries,
+                    backoff_factor=0.5,
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=frozenset(['GET'])
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retries)
+                adapter.poolmanager.pool_classes_by_scheme = COUNTING_POOL_CLASSES
+                session = requests.Session()
+                session.headers.update(self.headers)
+                session.mount(f'https://{host}', adapter)
+                session.mount(f'http://{host}', adapter)
+                self.sessions[host] = session
+        return session
+    
+    def close_sessions(self):
+        """Cerrar todas las sesiones HTTP y sus conexiones"""
+        with self._sessions_lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+    
+    def timed_get(self, provider, url, params, timeout, waited=0.0, headers=None):
+        """Ejecutar la petición registrando tiempos y reutilización de conexiones por proveedor"""
+        session = self.get_session(url)
+        connections_before = count_opened_connections()
+        
+        start = time.perf_counter()
+        status_code = None
+        try:
+            response = session.get(url, params=params, timeout=timeout, headers=headers)
+            status_code = response.status_code
+            return response
+        finally:
+            end = time.perf_counter()
+            new_connection = count_opened_connections() > connections_before
+            with self._stats_lock:
+                stats = self._provider_stats.setdefault(provider, {
+                    'requests': 0,
+                    'errors': 0,
+                    'throttled': 0,
+                    'request_time': 0.0,
+                    'queue_wait': 0.0,
+                    'new_connections': 0,
+                    'new_connection_time': 0.0,
+                    'reused_connections': 0,
+                    'reused_connection_time': 0.0,
+                    'first_start': start - waited,
+                    'last_end': end
+                })
+                stats['requests'] += 1
+                stats['errors'] += 1 if status_code is None else 0
+                stats['throttled'] += 1 if status_code == 429 else 0
+                stats['request_time'] += end - start
+                stats['queue_wait'] += waited
+                if new_connection:
+                    stats['new_connections'] += 1
+                    stats['new_connection_time'] += end - start
+                else:
+                    stats['reused_connections'] += 1
+                    stats['reused_connection_time'] += end - start
+                stats['first_start'] = min(stats['first_start'], start - waited)
+                stats['last_end'] = max(stats['last_end'], end)
+    
+    def parse_retry_after(self, response):
+        """Leer la cabecera Retry-After (segundos) si el proveedor la envía"""
+        value = response.headers.get('Retry-After') if response is not None else None
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+    
+    def http_get_many(self, provider, requests_list):
+        """Ejecutar varias peticiones GET en paralelo; devuelve respuestas (o None si fallan) en orden"""
+        def fetch(request):
+            url, params, priority = request
+            try:
+                return self.http_get(provider, url, params=params, priority=priority)
+            except Exception as e:
+                print(f"Error requesting {url}: {e}")
+                return None
+        
+        if len(requests_list) <= 1:
+            return [fetch(request) for request in requests_list]
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_subrequest_workers, len(requests_list))) as executor:
+            return list(executor.map(fetch, requests_list))
+    
+    def get_history_delta_days(self, history_key):
+        """Días a descargar para completar el historial local, o None si hace falta el año completo"""
+        last_timestamp = self.history_store.get_last_timestamp(history_key)
+        if last_timestamp is None:
+            return None
+        
+        days_since = (time.time() * 1000 - last_timestamp) / 86400000
+        if days_since >= self.history_days - 1:
+            return None
+        
+        # Un día extra para solapar con la última vela cerrada
+        return int(days_since) + 2
+    
+    def get_quotes(self, cryptos, stocks):
+        """Sólo precios actuales (sin historial ni indicadores), en lotes por proveedor.
+        
+        Devuelve {KEY: {...}} con las mismas claves que `update_all_data` ('BTC_crypto', 'AAPL_stock').
+        """
+        started = time.perf_counter()
+        cryptos = list(dict.fromkeys(c.strip().upper() for c in cryptos if c and c.strip()))
+        stocks = list(dict.fromkeys(s.strip().upper() for s in stocks if s and s.strip()))
+        quotes = {}
+        
+        # Criptomonedas: una sola petición a CoinGecko simple/price con todos los ids
+        if cryptos:
+            quotes.update(self.get_coingecko_quotes(cryptos))
+        
+        # Acciones y criptomonedas que CoinGecko no devolvió: Yahoo en lotes
+        yahoo_symbols = {yahoo_crypto_ticker(symbol): f"{symbol}_crypto" for symbol in cryptos if f"{symbol}_crypto" not in quotes}
+        yahoo_symbols.update({symbol: f"{symbol}_stock" for symbol in stocks})
+        if yahoo_symbols:
+            quotes.update(self.get_yahoo_quotes(yahoo_symbols))
+        
+        self.last_quote_stats = {
+            'timestamp': datetime.now().isoformat(),
+            'requested': len(cryptos) + len(stocks),
+            'received': len(quotes),
+            'total_time': round(time.perf_counter() - started, 3)
+        }
+        return quotes
+    
+    def get_coingecko_quotes(self, cryptos):
+        """Cotizaciones de varias criptomonedas con una petición a /simple/price"""
+        coin_ids = {symbol: COINGECKO_IDS.get(symbol.lower(), symbol.lower()) for symbol in cryptos}
+        quotes = {}
+        try:
+            response = self.http_get('coingecko', 'https://api.coingecko.com/api/v3/simple/price', params={
+                'ids': ','.join(sorted(set(coin_ids.values()))),
+                'vs_currencies': 'usd',
+                'include_24hr_change': 'true',
+                'include_24hr_vol': 'true'
+            })
+            if response.status_code != 200:
+                return quotes
+            
+            prices = response.json()
+            for symbol, coin_id in coin_ids.items():
+                price_data = prices.get(coin_id, {})
+                if price_data.get('usd') is None:
+                    continue
+                quotes[f"{symbol}_crypto"] = {
+                    'symbol': symbol,
+                    'type': 'crypto',
+                    'current_price': price_data['usd'],
+                    'change_24h': price_data.get('usd_24h_change') or 0,
+                    'volume_24h': price_data.get('usd_24h_vol') or 0,
+                    'timestamp': datetime.now().isoformat(),
+                    'source': 'CoinGecko simple/price'
+                }
+        except Exception as e:
+            print(f"Error fetching quotes from CoinGecko: {e}")
+        return quotes
+    
+    def get_yahoo_quotes(self, yahoo_symbols, batch_size=20):
+        """Cotizaciones de Yahoo Finance con el endpoint spark (hasta `batch_size` símbolos por petición).
+        
+        `yahoo_symbols` mapea símbolo de Yahoo -> clave del resultado ('BTC-USD' -> 'BTC_crypto').
+        """
+        symbols = list(yahoo_symbols)
+        batches = [symbols[i:i + batch_size] for i in range(0, len(symbols), batch_size)]
+        responses = self.http_get_many('yahoo', [
+            ('https://query1.finance.yahoo.com/v7/finance/spark', {'symbols': ','.join(batch), 'range': '1d', 'interval': '1d'}, PRIORITY_INTERACTIVE)
+            for batch in batches
+        ])
+        
+        metas = {}
+        for response in responses:
+            try:
+                if response is not None and response.status_code == 200:
+                    metas.update(self.parse_spark_response(response.json()))
+            except Exception as e:
+                print(f"Error parsing Yahoo spark quotes: {e}")
+        
+        # Los símbolos que spark no devolvió se piden por separado (gráfico de 1 día)
+        missing = [symbol for symbol in symbols if symbol not in metas]
+        if missing:
+            chart_responses = self.http_get_many('yahoo', [
+                (f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}", {'range': '1d', 'interval': '1d'}, PRIORITY_INTERACTIVE)
+                for symbol in missing
+            ])
+            for symbol, response in zip(missing, chart_responses):
+                try:
+                    if response is not None and response.status_code == 200:
+                        result = response.json().get('chart', {}).get('result') or []
+                        if result:
+                            metas[symbol] = result[0].get('meta', {})
+                except Exception as e:
+                    print(f"Error parsing Yahoo quote for {symbol}: {e}")
+        
+        quotes = {}
+        for symbol, meta in metas.items():
+            key = yahoo_symbols.get(symbol)
+            current_price = meta.get('regularMarketPrice')
+            if key is None or current_price is None:
+                continue
+            previous_close = meta.get('previousClose') or meta.get('chartPreviousClose') or current_price
+            quotes[key] = {
+                'symbol': key.rsplit('_', 1)[0],
+                'type': key.rsplit('_', 1)[1],
+                'current_price': current_price,
+                'change_24h': ((current_price - previous_close) / previous_close) * 100 if previous_close else 0,
+                'volume_24h': meta.get('regularMarketVolume', 0),
+                'timestamp': datetime.now().isoformat(),
+                'source': 'Yahoo Finance API'
+            }
+        return quotes
+    
+    def parse_spark_response(self, data):
+        """Extraer el bloque `meta` por símbolo de una respuesta spark"""
+        metas = {}
+        for result in (data.get('spark') or {}).get('result') or []:
+            responses = result.get('response') or []
+            if responses and responses[0].get('meta'):
+                metas[result['symbol']] = responses[0]['meta']
+        return metas
     
     def get_crypto_data(self, symbol):
         """Obtener datos de criptomonedas desde CoinGecko API"""
         try:
-            # Mapeo de símbolos comunes a nombres completos de CoinGecko
-            symbol_mapping = {
-                'btc': 'bitcoin',
-                'eth': 'ethereum', 
-                'ada': 'cardano',
-                'sol': 'solana',
-                'dot': 'polkadot',
-                'avax': 'avalanche-2',
-                'matic': 'matic-network',
-                'link': 'chainlink',
-                'uni': 'uniswap',
-                'atom': 'cosmos',
-                'near': 'near-protocol',
-                'ftm': 'fantom',
-                'sand': 'the-sandbox',
-                'mana': 'decentraland',
-                'axs': 'axie-infinity',
-                'enj': 'enjincoin',
-                'chz': 'chiliz',
-                'shib': 'shiba-inu',
-                'doge': 'dogecoin',
-                'ltc': 'litecoin',
-                'bch': 'bitcoin-cash',
-                'xrp': 'ripple',
-                'xlm': 'stellar',
-                'vet': 'vechain',
-                'theta': 'theta-token',
-                'bnb': 'binancecoin',
-                'usdt': 'tether',
-                'usdc': 'usd-coin'
-            }
-            
             # Usar el mapeo si existe, sino usar el símbolo original
-            coin_id = symbol_mapping.get(symbol.lower(), symbol.lower())
+            coin_id = COINGECKO_IDS.get(symbol.lower(), symbol.lower())
             
             # CoinGecko API - gratuita y no requiere API key
             url = f"https://api.coingecko.com/api/v3/coins/{coin_id}"
-            response = requests.get(url, headers=self.headers, timeout=10)
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Obtener datos históricos de 1 año
+            # Historial: sólo los días que faltan respecto al historial local (o el año completo)
+            history_key = f"{symbol.upper()}_crypto_coingecko"
+            delta_days = self.get_history_delta_days(history_key)
+            if delta_days:
+                history_url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart?vs_currency=usd&days={delta_days}&interval=daily"
+            else:
                 history_url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart?vs_currency=usd&days=365"
-                history_response = requests.get(history_url, headers=self.headers, timeout=10)
-                
-                historical_data = []
-                monthly_data = []
-                if history_response.status_code == 200:
-                    history_data = history_response.json()
-                    historical_data = [
-                        {
-                            'timestamp': datetime.fromtimestamp(item[0] / 1000).isoformat(),
-                            'price': item[1],
-                            'volume': 0  # CoinGecko no proporciona volumen en este endpoint
-                        }
-                        for item in history_data.get('prices', [])
-                    ]
+            
+            # Datos actuales e historial en paralelo (el mes se deriva del historial)
+            response, history_response = self.http_get_many('coingecko', [
+                (url, None, PRIORITY_INTERACTIVE),
+                (history_url, None, PRIORITY_BACKGROUND)
+            ])
+            
+            if response is not None and response.status_code == 200:
+                data = response.json()
                 
-                # Obtener datos del último mes para análisis detallado
-                monthly_url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart?vs_currency=usd&days=30"
-                monthly_response = requests.get(monthly_url, headers=self.headers, timeout=10)
+                added = []
+                if history_response is not None and history_response.status_code == 200:
+                    # CoinGecko no proporciona volumen en este endpoint
+                    points = [[item[0], item[1], 0] for item in history_response.json().get('prices', [])]
+                    added = self.history_store.merge(history_key, points)
+                historical_data = self.history_store.get_series(history_key, self.history_days)
                 
-                if monthly_response.status_code == 200:
-                    monthly_history = monthly_response.json()
-                    monthly_data = [
-                        {
-                            'timestamp': datetime.fromtimestamp(item[0] / 1000).isoformat(),
-                            'price': item[1],
-                            'volume': 0
-                        }
-                        for item in monthly_history.get('prices', [])
-                    ]
+                # Datos del último mes para análisis detallado: ventana del historial ya descargado
+                monthly_data = self.history_store.get_series(history_key, self.monthly_days)
+                indicators, monthly_indicators = self.build_indicators(
+                    history_key, added, historical_data, monthly_data
+                )
                 
                 current_price = data['market_data']['current_price']['usd']
                 change_24h = data['market_data']['price_change_percentage_24h']
@@ -243,10 +755,12 @@ class RealDataCollector:
                     'high_24h': data['market_data'].get('high_24h', {}).get('usd', current_price),
                     'low_24h': data['market_data'].get('low_24h', {}).get('usd', current_price),
                     'market_cap': data['market_data'].get('market_cap', {}).get('usd', 0),
+                    'history_key': history_key,
+                    'new_points': added,
                     'historical_data': historical_data,
                     'monthly_data': monthly_data,
-                    'indicators': self.calculate_crypto_indicators(historical_data),
-                    'monthly_indicators': self.calculate_monthly_indicators(monthly_data),
+                    'indicators': indicators,
+                    'monthly_indicators': monthly_indicators,
                     'timestamp': datetime.now().isoformat(),
                     'source': 'CoinGecko API'
                 }
@@ -267,45 +781,7 @@ class RealDataCollector:
         try:
             prices = [item['price'] for item in monthly_data]
             volumes = [item['volume'] for item in monthly_data]
-            indicators = {}
-            
-            # Indicadores de corto plazo (1 mes)
-            indicators['rsi_14'] = self.calculate_rsi(prices, 14)
-            indicators['sma_20'] = sum(prices[-20:]) / 20 if len(prices) >= 20 else prices[-1]
-            
-            # Bandas de Bollinger mensuales
-            if len(prices) >= 20:
-                sma_20 = indicators['sma_20']
-                variance = sum((p - sma_20) ** 2 for p in prices[-20:]) / 20
-                std_dev = variance ** 0.5
-                indicators['bb_upper'] = sma_20 + (2 * std_dev)
-                indicators['bb_lower'] = sma_20 - (2 * std_dev)
-                indicators['bb_width'] = (indicators['bb_upper'] - indicators['bb_lower']) / sma_20
-            
-            # Volatilidad mensual
-            import statistics
-            if len(prices) >= 10:
-                returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, min(11, len(prices)))]
-                indicators['volatility_10d'] = statistics.stdev(returns) if len(returns) > 1 else 0
-            
-            # Máximos y mínimos mensuales
-            indicators['month_high'] = max(prices)
-            indicators['month_low'] = min(prices)
-            indicators['month_range'] = indicators['month_high'] - indicators['month_low']
-            indicators['current_month_position'] = (prices[-1] - indicators['month_low']) / indicators['month_range']
-            
-            # Momentum semanal
-            if len(prices) >= 7:
-                momentum_1w = (prices[-1] - prices[-7]) / prices[-7] * 100
-                indicators['momentum_1w'] = momentum_1w
-            
-            # NUEVO: Volume Trend mensual
-            indicators['volume_trend'] = self.calculate_volume_trend(prices, volumes)
-            
-            # NUEVO: ATR mensual para stops dinámicos
-            indicators['atr'] = self.calculate_atr(prices, volumes, 14)
-            
-            return indicators
+            return load_indicator_engine().calculate_monthly_indicators(prices, volumes)
             
         except Exception as e:
             print(f"Error calculating monthly indicators: {e}")
@@ -314,31 +790,26 @@ class RealDataCollector:
     def get_crypto_yahoo_fallback(self, symbol):
         """Fallback a Yahoo Finance para criptomonedas"""
         try:
-            # Mapeo de nombres a símbolos para Yahoo Finance
-            name_to_symbol = {
-                'bitcoin': 'BTC',
-                'ethereum': 'ETH', 
-                'cardano': 'ADA',
-                'solana': 'SOL',
-                'polkadot': 'DOT',
-                'avalanche': 'AVAX',
-                'polygon': 'MATIC',
-                'chainlink': 'LINK',
-                'uniswap': 'UNI',
-                'cosmos': 'ATOM'
-            }
-            
-            symbol_for_yahoo = name_to_symbol.get(symbol.lower(), symbol[:4].upper())
-            
             # Usar requests directamente con Yahoo Finance - datos de 1 año
-            yahoo_url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol_for_yahoo}-USD"
+            yahoo_url = f"https://query1.finance.yahoo.com/v8/finance/chart/{yahoo_crypto_ticker(symbol)}"
             params = {
                 'range': '1y',  # 1 año de datos
                 'interval': '1d',
                 'includePrePost': 'true'
             }
             
-            response = requests.get(yahoo_url, params=params, headers=self.headers, timeout=10)
+            # Si ya hay historial local, pedir sólo las velas desde la última guardada
+            history_key = f"{symbol.upper()}_crypto_yahoo"
+            last_timestamp = self.history_store.get_last_timestamp(history_key)
+            if self.get_history_delta_days(history_key):
+                params = {
+                    'period1': int(last_timestamp / 1000),
+                    'period2': int(time.time()),
+                    'interval': '1d',
+                    'includePrePost': 'true'
+                }
+            
+            response = self.http_get('yahoo', yahoo_url, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -355,44 +826,24 @@ class RealDataCollector:
                         closes = quotes.get('close', [])
                         volumes = quotes.get('volume', [])
                         
-                        historical_data = []
+                        points = []
                         for i, ts in enumerate(timestamps):
                             if i < len(closes) and closes[i] is not None:
-                                historical_data.append({
-                                    'timestamp': datetime.fromtimestamp(ts).isoformat(),
-                                    'price': closes[i],
-                                    'volume': volumes[i] if i < len(volumes) and volumes[i] else 0
-                                })
+                                points.append([
+                                    ts * 1000,
+                                    closes[i],
+                                    volumes[i] if i < len(volumes) and volumes[i] else 0
+                                ])
                         
-                        # Obtener datos del último mes adicionalmente
-                        monthly_url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol_for_yahoo}-USD"
-                        monthly_params = {
-                            'range': '1mo',  # 1 mes de datos
-                            'interval': '1d',
-                            'includePrePost': 'true'
-                        }
+                        added = self.history_store.merge(history_key, points)
+                        historical_data = self.history_store.get_series(history_key, self.history_days)
                         
-                        monthly_response = requests.get(yahoo_url, params=monthly_params, headers=self.headers, timeout=10)
-                        monthly_data = []
+                        # Datos del último mes: ventana del historial ya descargado
+                        monthly_data = self.history_store.get_series(history_key, self.monthly_days)
+                        indicators, monthly_indicators = self.build_indicators(
+                            history_key, added, historical_data, monthly_data
+                        )
                         
-                        if monthly_response.status_code == 200:
-                            monthly_data_response = monthly_response.json()
-                            if 'chart' in monthly_data_response and monthly_data_response['chart']['result']:
-                                monthly_chart = monthly_data_response['chart']['result'][0]
-                                monthly_timestamps = monthly_chart.get('timestamp', [])
-                                monthly_indicators = monthly_chart.get('indicators', {})
-                                monthly_quotes = monthly_indicators.get('quote', [{}])[0]
-                                monthly_closes = monthly_quotes.get('close', [])
-                                monthly_volumes = monthly_quotes.get('volume', [])
-                                
-                                for i, ts in enumerate(monthly_timestamps):
-                                    if i < len(monthly_closes) and monthly_closes[i] is not None:
-                                        monthly_data.append({
-                                            'timestamp': datetime.fromtimestamp(ts).isoformat(),
-                                            'price': monthly_closes[i],
-                                            'volume': monthly_volumes[i] if i < len(monthly_volumes) and monthly_volumes[i] else 0
-                                        })
-
                         current_price = meta.get('regularMarketPrice', 0)
                         previous_close = meta.get('previousClose', current_price)
                         change_24h = ((current_price - previous_close) / previous_close) * 100 if previous_close and previous_close > 0 else 0
@@ -405,10 +856,12 @@ class RealDataCollector:
                             'change_24h': change_24h,
                             'high_24h': meta.get('regularMarketDayHigh', current_price),
                             'low_24h': meta.get('regularMarketDayLow', current_price),
+                            'history_key': history_key,
+                            'new_points': added,
                             'historical_data': historical_data,
                             'monthly_data': monthly_data,
-                            'indicators': self.calculate_crypto_indicators(historical_data),
-                            'monthly_indicators': self.calculate_monthly_indicators(monthly_data),
+                            'indicators': indicators,
+                            'monthly_indicators': monthly_indicators,
                             'timestamp': datetime.now().isoformat(),
                             'source': 'Yahoo Finance API'
                         }
@@ -431,7 +884,18 @@ class RealDataCollector:
                 'includePrePost': 'true'
             }
             
-            response = requests.get(yahoo_url, params=params, headers=self.headers, timeout=10)
+            # Si ya hay historial local, pedir sólo las velas desde la última guardada
+            history_key = f"{symbol.upper()}_stock_yahoo"
+            last_timestamp = self.history_store.get_last_timestamp(history_key)
+            if self.get_history_delta_days(history_key):
+                params = {
+                    'period1': int(last_timestamp / 1000),
+                    'period2': int(time.time()),
+                    'interval': '1d',
+                    'includePrePost': 'true'
+                }
+            
+            response = self.http_get('yahoo', yahoo_url, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -448,43 +912,23 @@ class RealDataCollector:
                         closes = quotes.get('close', [])
                         volumes = quotes.get('volume', [])
                         
-                        historical_data = []
+                        points = []
                         for i, ts in enumerate(timestamps):
                             if i < len(closes) and closes[i] is not None:
-                                historical_data.append({
-                                    'timestamp': datetime.fromtimestamp(ts).isoformat(),
-                                    'price': closes[i],
-                                    'volume': volumes[i] if i < len(volumes) and volumes[i] else 0
-                                })
-                        
-                        # Obtener datos del último mes
-                        monthly_url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
-                        monthly_params = {
-                            'range': '1mo',  # 1 mes de datos
-                            'interval': '1d',
-                            'includePrePost': 'true'
-                        }
+                                points.append([
+                                    ts * 1000,
+                                    closes[i],
+                                    volumes[i] if i < len(volumes) and volumes[i] else 0
+                                ])
                         
-                        monthly_response = requests.get(yahoo_url, params=monthly_params, headers=self.headers, timeout=10)
-                        monthly_data = []
+                        added = self.history_store.merge(history_key, points)
+                        historical_data = self.history_store.get_series(history_key, self.history_days)
                         
-                        if monthly_response.status_code == 200:
-                            monthly_data_response = monthly_response.json()
-                            if 'chart' in monthly_data_response and monthly_data_response['chart']['result']:
-                                monthly_chart = monthly_data_response['chart']['result'][0]
-                                monthly_timestamps = monthly_chart.get('timestamp', [])
-                                monthly_indicators = monthly_chart.get('indicators', {})
-                                monthly_quotes = monthly_indicators.get('quote', [{}])[0]
-                                monthly_closes = monthly_quotes.get('close', [])
-                                monthly_volumes = monthly_quotes.get('volume', [])
-                                
-                                for i, ts in enumerate(monthly_timestamps):
-                                    if i < len(monthly_closes) and monthly_closes[i] is not None:
-                                        monthly_data.append({
-                                            'timestamp': datetime.fromtimestamp(ts).isoformat(),
-                                            'price': monthly_closes[i],
-                                            'volume': monthly_volumes[i] if i < len(monthly_volumes) and monthly_volumes[i] else 0
-                                        })
+                        # Datos del último mes: ventana del historial ya descargado
+                        monthly_data = self.history_store.get_series(history_key, self.monthly_days)
+                        indicators, monthly_indicators = self.build_indicators(
+                            history_key, added, historical_data, monthly_data
+                        )
                         
                         current_price = meta.get('regularMarketPrice', 0)
                         previous_close = meta.get('previousClose', current_price)
@@ -501,10 +945,12 @@ class RealDataCollector:
                             'market_cap': meta.get('marketCap', 0),
                             'pe_ratio': meta.get('trailingPE', 0),
                             'dividend_yield': meta.get('dividendYield', 0) * 100 if meta.get('dividendYield') else 0,
+                            'history_key': history_key,
+                            'new_points': added,
                             'historical_data': historical_data,
                             'monthly_data': monthly_data,
-                            'indicators': self.calculate_crypto_indicators(historical_data),
-                            'monthly_indicators': self.calculate_monthly_indicators(monthly_data),
+                            'indicators': indicators,
+                            'monthly_indicators': monthly_indicators,
                             'timestamp': datetime.now().isoformat(),
                             'source': 'Yahoo Finance API'
                         }
@@ -524,78 +970,7 @@ class RealDataCollector:
         try:
             prices = [item['price'] for item in historical_data]
             volumes = [item['volume'] for item in historical_data]
-            indicators = {}
-            
-            # --- INDICADORES AVANZADOS DE LARGO PLAZO ---
-            
-            # RSI con períodos múltiples
-            indicators['rsi_14'] = self.calculate_rsi(prices, 14)
-            indicators['rsi_30'] = self.calculate_rsi(prices, 30)
-            
-            # Medias móviles múltiples (para identificar tendencias de largo plazo)
-            indicators['sma_20'] = sum(prices[-20:]) / 20
-            indicators['sma_50'] = sum(prices[-50:]) / 50
-            if len(prices) >= 100:
-                indicators['sma_100'] = sum(prices[-100:]) / 100
-            if len(prices) >= 200:
-                indicators['sma_200'] = sum(prices[-200:]) / 200
-            
-            # NUEVO: % Distancia a SMA_200
-            if 'sma_200' in indicators and indicators['sma_200'] > 0:
-                indicators['distance_to_sma200_pct'] = ((prices[-1] - indicators['sma_200']) / indicators['sma_200']) * 100
-            
-            # Bandas de Bollinger anuales
-            if len(prices) >= 20:
-                sma_20 = sum(prices[-20:]) / 20
-                variance = sum((p - sma_20) ** 2 for p in prices[-20:]) / 20
-                std_dev = variance ** 0.5
-                indicators['bb_upper'] = sma_20 + (2 * std_dev)
-                indicators['bb_lower'] = sma_20 - (2 * std_dev)
-                indicators['bb_width'] = (indicators['bb_upper'] - indicators['bb_lower']) / sma_20
-            
-            # MACD con señal de tendencia
-            if len(prices) >= 26:
-                ema_12 = self.calculate_ema(prices, 12)
-                ema_26 = self.calculate_ema(prices, 26)
-                indicators['macd'] = ema_12 - ema_26
-                ema_diff = [ema_12 - ema_26]
-                indicators['macd_signal'] = self.calculate_ema(ema_diff, 9)
-                indicators['macd_histogram'] = indicators['macd'] - indicators['macd_signal']
-            
-            # Volatilidad anual (muy importante para riesgo)
-            import statistics
-            if len(prices) >= 30:
-                returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, min(31, len(prices)))]
-                indicators['volatility_30d'] = statistics.stdev(returns) if len(returns) > 1 else 0
-            
-            if len(prices) >= 252:  # Aprox 1 año de días de trading
-                annual_returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, min(253, len(prices)))]
-                indicators['volatility_annual'] = statistics.stdev(annual_returns) if len(annual_returns) > 1 else 0
-            
-            # --- INDICADORES DE SOPORTE Y RESISTENCIA ---
-            indicators['year_high'] = max(prices)
-            indicators['year_low'] = min(prices)
-            indicators['year_range'] = indicators['year_high'] - indicators['year_low']
-            indicators['current_position'] = (prices[-1] - indicators['year_low']) / indicators['year_range']
-            
-            # NUEVO: Invalidation Level (Stop Loss sugerido)
-            indicators['invalidation_level'] = self.calculate_invalidation_level(prices, volumes)
-            
-            # NUEVO: ATR (Average True Range) para stops dinámicos
-            indicators['atr'] = self.calculate_atr(prices, volumes, 14)  # ATR de 14 períodos
-            
-            # Momentum de 3 meses y 6 meses
-            if len(prices) >= 90:
-                momentum_3m = (prices[-1] - prices[-90]) / prices[-90] * 100
-                indicators['momentum_3m'] = momentum_3m
-            if len(prices) >= 180:
-                momentum_6m = (prices[-1] - prices[-180]) / prices[-180] * 100
-                indicators['momentum_6m'] = momentum_6m
-            
-            # NUEVO: Volume Trend
-            indicators['volume_trend'] = self.calculate_volume_trend(prices, volumes)
-            
-            return indicators
+            return load_indicator_engine().calculate_indicators(prices, volumes)
             
         except Exception as e:
             print(f"Error calculating advanced indicators: {e}")
@@ -603,180 +978,35 @@ class RealDataCollector:
     
     def calculate_rsi(self, prices, period):
         """Calcular RSI con período específico"""
-        if len(prices) < period + 1:
-            return 50.0
-        
-        gains = []
-        losses = []
-        
-        for i in range(1, len(prices)):
-            change = prices[i] - prices[i-1]
-            if change > 0:
-                gains.append(change)
-                losses.append(0)
-            else:
-                gains.append(0)
-                losses.append(abs(change))
-        
-        if len(gains) >= period:
-            avg_gain = sum(gains[-period:]) / period
-            avg_loss = sum(losses[-period:]) / period
-            if avg_loss > 0:
-                rs = avg_gain / avg_loss
-                return 100 - (100 / (1 + rs))
-            else:
-                return 100.0
-        
-        return 50.0
+        return load_indicator_engine().PriceSeries(prices).rsi(period)
     
     def calculate_volume_trend(self, prices, volumes):
         """Calcular tendencia de volumen para validar movimientos de precios"""
-        if len(prices) < 10 or len(volumes) < 10:
-            return 'INSUFFICIENT_DATA'
-        
         try:
-            # Calcular cambio de precio en los últimos 10 días
-            price_change = (prices[-1] - prices[-10]) / prices[-10]
-            
-            # Calcular promedio de volumen
-            recent_volume_avg = sum(volumes[-5:]) / 5  # Últimos 5 días
-            historical_volume_avg = sum(volumes[-10:-5]) / 5  # 5 días anteriores
-            
-            # Determinar tendencia del volumen
-            volume_ratio = recent_volume_avg / historical_volume_avg if historical_volume_avg > 0 else 1
-            
-            # Lógica de Volume Trend
-            if price_change > 0.02:  # Precio sube > 2%
-                if volume_ratio > 1.2:  # Volumen > 20% above average
-                    return 'BULLISH_CONFIRMED'  # Subida con volumen real
-                elif volume_ratio < 0.8:
-                    return 'BULLISH_WEAK'  # Subida sin volumen (trampa)
-                else:
-                    return 'BULLISH_NEUTRAL'
-            elif price_change < -0.02:  # Precio baja > 2%
-                if volume_ratio > 1.2:
-                    return 'BEARISH_CONFIRMED'  # Bajada con volumen real
-                elif volume_ratio < 0.8:
-                    return 'BEARISH_WEAK'  # Bajada sin volumen
-                else:
-                    return 'BEARISH_NEUTRAL'
-            else:  # Precio estable
-                if volume_ratio > 1.5:
-                    return 'ACCUMULATION'  # Alto volumen sin movimiento
-                else:
-                    return 'NEUTRAL'
-                    
+            return load_indicator_engine().PriceSeries(prices, volumes).volume_trend()
         except Exception as e:
             print(f"Error calculating volume trend: {e}")
             return 'ERROR'
     
     def calculate_atr(self, prices, volumes, period=14):
         """Calcular Average True Range (ATR) para stops dinámicos"""
-        if len(prices) < period + 1:
-            return prices[-1] * 0.02  # Default 2% if insufficient data
-        
         try:
-            true_ranges = []
-            
-            # Calcular True Range para cada período
-            for i in range(1, len(prices)):
-                high = prices[i]  # Usamos close como high si no hay high/low
-                low = prices[i]   # Usamos close como low si no hay high/low
-                prev_close = prices[i-1]
-                
-                # True Range = max(high - low, abs(high - prev_close), abs(low - prev_close))
-                tr1 = high - low
-                tr2 = abs(high - prev_close)
-                tr3 = abs(low - prev_close)
-                
-                true_range = max(tr1, tr2, tr3)
-                true_ranges.append(true_range)
-            
-            # ATR es el promedio de los True Ranges del período
-            if len(true_ranges) >= period:
-                atr = sum(true_ranges[-period:]) / period
-            else:
-                atr = sum(true_ranges) / len(true_ranges)
-            
-            return round(atr, 6)
-            
+            return load_indicator_engine().PriceSeries(prices, volumes).atr(period)
         except Exception as e:
             print(f"Error calculating ATR: {e}")
             return prices[-1] * 0.02  # Default 2% if error
     
     def calculate_invalidation_level(self, prices, volumes):
         """Calcular nivel de invalidación (stop loss sugerido) basado en estructura"""
-        if len(prices) < 20:
-            return prices[-1] * 0.95  # Default 5% below current
-        
         try:
-            current_price = prices[-1]
-            
-            # Encontrar soportes recientes
-            recent_prices = prices[-20:]  # Últimos 20 días
-            support_levels = []
-            
-            # Identificar mínimos locales como soportes
-            for i in range(2, len(recent_prices) - 2):
-                if (recent_prices[i] <= recent_prices[i-1] and 
-                    recent_prices[i] <= recent_prices[i-2] and
-                    recent_prices[i] <= recent_prices[i+1] and 
-                    recent_prices[i] <= recent_prices[i+2]):
-                    support_levels.append(recent_prices[i])
-            
-            # Si no hay soportes claros, usar método estadístico
-            if not support_levels:
-                import statistics
-                # Usar 2 desviaciones estándar below the mean of recent lows
-                recent_lows = sorted(recent_prices)[:len(recent_prices)//3]  # Bottom 33%
-                if recent_lows:
-                    mean_low = sum(recent_lows) / len(recent_lows)
-                    std_dev = (sum((x - mean_low) ** 2 for x in recent_lows) / len(recent_lows)) ** 0.5
-                    invalidation_level = max(mean_low - (2 * std_dev), current_price * 0.9)
-                else:
-                    invalidation_level = current_price * 0.92
-            else:
-                # Usar el soporte más cercano debajo del precio actual
-                valid_supports = [s for s in support_levels if s < current_price]
-                if valid_supports:
-                    invalidation_level = max(valid_supports)  # Soporte más cercano
-                else:
-                    # Si todos los soportes están arriba, usar estadístico
-                    import statistics
-                    mean_support = sum(support_levels) / len(support_levels)
-                    invalidation_level = min(mean_support, current_price * 0.95)
-            
-            # Ajuste por volatilidad
-            if len(prices) >= 10:
-                returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, min(11, len(prices)))]
-                import statistics
-                volatility = statistics.stdev(returns) if len(returns) > 1 else 0.02
-                
-                # Mayor volatilidad = mayor distancia al stop loss
-                volatility_adjustment = min(0.05, volatility * 2)  # Máximo 5% extra
-                invalidation_level -= (current_price * volatility_adjustment)
-            
-            # No dejar el stop loss demasiado lejos (máximo 15% below current)
-            invalidation_level = max(invalidation_level, current_price * 0.85)
-            
-            return round(invalidation_level, 4)
-            
+            return load_indicator_engine().PriceSeries(prices, volumes).invalidation_level()
         except Exception as e:
             print(f"Error calculating invalidation level: {e}")
             return prices[-1] * 0.95
     
     def calculate_ema(self, prices, period):
         """Calcular EMA (Exponential Moving Average)"""
-        if len(prices) < period:
-            return prices[-1] if prices else 0
-        
-        multiplier = 2 / (period + 1)
-        ema = sum(prices[:period]) / period  # Start with SMA
-        
-        for price in prices[period:]:
-            ema = (price * multiplier) + (ema * (1 - multiplier))
-        
-        return ema
+        return load_indicator_engine().PriceSeries(prices).ema(period)
     
     def save_data(self, data):
         """Guardar datos en archivos JSON"""
@@ -786,16 +1016,71 @@ class RealDataCollector:
             filename = f"{key}_{timestamp}.json"
             filepath = os.path.join(self.data_dir, filename)
             
+            # Las velas ya están en el historial columnar: el snapshot sólo guarda las nuevas
+            snapshot = {k: v for k, v in value.items() if k not in ('historical_data', 'monthly_data')}
+            snapshot['history_points'] = len(value.get('historical_data', []))
+            
             with open(filepath, 'w') as f:
-                json.dump(value, f, indent=2, default=str)
+                json.dump(snapshot, f, indent=2, default=str)
+        
+        # Resumen de lo último por símbolo (precio, variación, indicadores); el historial se carga aparte
+        summary = {key: self.summarize_asset(value) for key, value in data.items()}
+        summary_file = os.path.join(self.data_dir, 'latest_summary.json')
+        temp_file = summary_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(summary, f, indent=2, default=str)
+        os.replace(temp_file, summary_file)
+        self._summary_cache = None
+    
+    def summarize_asset(self, asset):
+        """Registro resumido de un activo: todo salvo las series de velas"""
+        return {k: v for k, v in asset.items() if k not in ('historical_data', 'monthly_data', 'new_points')}
+    
+    def load_latest_summary(self):
+        """Cargar el resumen más reciente por símbolo sin deserializar historiales"""
+        summary_file = os.path.join(self.data_dir, 'latest_summary.json')
+        try:
+            if os.path.exists(summary_file):
+                mtime = os.stat(summary_file).st_mtime_ns
+                if self._summary_cache is not None and self._summary_cache[0] == mtime:
+                    return self._summary_cache[1]
                 
-        # También guardar el último archivo como "latest"
-        latest_file = os.path.join(self.data_dir, 'latest_data.json')
-        with open(latest_file, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+                with open(summary_file, 'r') as f:
+                    summary = json.load(f)
+                self._summary_cache = (mtime, summary)
+                return summary
             
+            # Instalaciones anteriores: derivar el resumen del latest_data.json completo
+            legacy_data = self.load_legacy_latest_data()
+            return {key: self.summarize_asset(value) for key, value in legacy_data.items()}
+        except Exception as e:
+            print(f"Error loading latest summary: {e}")
+        return {}
+    
+    def load_asset_history(self, asset):
+        """Cargar bajo demanda el historial anual y mensual de un registro del resumen"""
+        history_key = asset.get('history_key')
+        if not history_key:
+            return [], []
+        return (
+            self.history_store.get_series(history_key, self.history_days),
+            self.history_store.get_series(history_key, self.monthly_days)
+        )
+    
     def load_latest_data(self):
-        """Cargar los datos más recientes"""
+        """Cargar los datos más recientes (resumen más historial completo de cada activo)"""
+        if not os.path.exists(os.path.join(self.data_dir, 'latest_summary.json')):
+            return self.load_legacy_latest_data()
+        
+        latest_data = {}
+        for key, asset in self.load_latest_summary().items():
+            asset = dict(asset)
+            asset['historical_data'], asset['monthly_data'] = self.load_asset_history(asset)
+            latest_data[key] = asset
+        return latest_data
+    
+    def load_legacy_latest_data(self):
+        """Cargar el latest_data.json con historiales embebidos del formato anterior"""
         try:
             latest_file = os.path.join(self.data_dir, 'latest_data.json')
             if os.path.exists(latest_file):
@@ -803,4 +1088,4 @@ class RealDataCollector:
                     return json.load(f)
         except Exception as e:
             print(f"Error loading latest data: {e}")
-        return {}
\ No newline at end of file
+        return {}
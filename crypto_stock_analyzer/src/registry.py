@@ -0,0 +1,101 @@
+import threading
+
+# Una instancia compartida por componente: cada archivo (positions.json, watchlist_config.json...)
+# se carga una sola vez por proceso y todas las partes de la app escriben sobre el mismo estado
+_components = {}
+_lock = threading.RLock()
+
+
+def get_component(name, factory):
+    """Instancia compartida de `name`; se construye con `factory()` la primera vez"""
+    component = _components.get(name)
+    if component is None:
+        with _lock:
+            component = _components.get(name)
+            if component is None:
+                component = factory()
+                _components[name] = component
+    return component
+
+
+def register_component(name, component):
+    """Inyectar una instancia ya construida (sustituye a la existente)"""
+    with _lock:
+        _components[name] = component
+
+
+def close_components():
+    """Liberar los recursos de los componentes ya construidos (sesiones HTTP) sin construir ninguno"""
+    collector = _components.get('data_collector')
+    if collector is not None:
+        collector.close_sessions()
+
+
+def get_database():
+    def create():
+        try:
+            from .database import Database
+        except ImportError:
+            from database import Database
+        return Database()
+    return get_component('database', create)
+
+
+def get_data_collector():
+    def create():
+        try:
+            from .real_data_collector import RealDataCollector
+        except ImportError:
+            from real_data_collector import RealDataCollector
+        return RealDataCollector(database=get_database())
+    return get_component('data_collector', create)
+
+
+def get_position_manager():
+    def create():
+        try:
+            from .position_manager import PositionManager
+        except ImportError:
+            from position_manager import PositionManager
+        return PositionManager()
+    return get_component('position_manager', create)
+
+
+def get_ai_analyzer():
+    def create():
+        try:
+            from .advanced_ai_analyzer import AdvancedAIAnalyzer
+        except ImportError:
+            from advanced_ai_analyzer import AdvancedAIAnalyzer
+        return AdvancedAIAnalyzer()
+    return get_component('ai_analyzer', create)
+
+
+def get_decision_engine():
+    def create():
+        try:
+            from .decision_engine import DecisionEngine
+        except ImportError:
+            from decision_engine import DecisionEngine
+        return DecisionEngine(position_manager=get_position_manager())
+    return get_component('decision_engine', create)
+
+
+def get_snapshot_compactor():
+    def create():
+        try:
+            from .snapshot_compactor import SnapshotCompactor
+        except ImportError:
+            from snapshot_compactor import SnapshotCompactor
+        return SnapshotCompactor(database=get_database())
+    return get_component('snapshot_compactor', create)
+
+
+def get_pipeline():
+    def create():
+        try:
+            from .pipeline import AnalysisPipeline
+        except ImportError:
+            from pipeline import AnalysisPipeline
+        return AnalysisPipeline(get_data_collector(), get_ai_analyzer(), get_decision_engine(), get_database())
+    return get_component('pipeline', create)
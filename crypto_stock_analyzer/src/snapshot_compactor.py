@@ -0,0 +1,320 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+try:
+    from .symbols import COINGECKO_IDS
+except ImportError:
+    from symbols import COINGECKO_IDS
+
+# Instantáneas de save_data: {SÍMBOLO}_{crypto|stock}_{AAAAMMDD_HHMMSS}.json
+SNAPSHOT_PATTERN = re.compile(r'^(?P<symbol>[^_]+)_(?P<type>crypto|stock)_(?P<stamp>\d{8}_\d{6})\.json$')
+
+# Política de retención por defecto
+DEFAULT_RETENTION_POLICY = {
+    'keep_all_days': 2,        # instantáneas de los últimos 2 días: se conservan todas, tal cual
+    'downsample_days': 30,     # hasta 30 días: una por símbolo cada `downsample_hours`, sin velas
+    'downsample_hours': 24,
+    'max_files_per_run': 200   # trabajo máximo por pasada (el resto en la siguiente)
+}
+
+# Nombre de CoinGecko → símbolo ('bitcoin' → 'BTC') para instantáneas antiguas
+COINGECKO_SYMBOLS = {coin_id: symbol for symbol, coin_id in COINGECKO_IDS.items()}
+
+def canonical_key(symbol, asset_type):
+    """Clave del activo como la usa el colector ('btc', 'crypto' → 'BTC_crypto')"""
+    symbol = symbol.strip()
+    if asset_type == 'crypto':
+        symbol = COINGECKO_SYMBOLS.get(symbol.lower(), symbol)
+    return f"{symbol.upper()}_{asset_type}"
+
+def check_retention_policy(policy):
+    """Validar la política de retención (ValueError si no tiene sentido)"""
+    for name in ('keep_all_days', 'downsample_days'):
+        if not isinstance(policy[name], (int, float)) or policy[name] < 0:
+            raise ValueError(f"{name} must be a non-negative number, got {policy[name]!r}")
+    for name in ('downsample_hours', 'max_files_per_run'):
+        if not isinstance(policy[name], (int, float)) or policy[name] <= 0:
+            raise ValueError(f"{name} must be a positive number, got {policy[name]!r}")
+    if policy['downsample_days'] < policy['keep_all_days']:
+        raise ValueError("downsample_days must be >= keep_all_days")
+    return policy
+
+def parse_snapshot_name(filename):
+    """Clave y fecha de una instantánea, o None si el archivo no es una instantánea válida"""
+    match = SNAPSHOT_PATTERN.match(filename)
+    if not match:
+        return None
+    return {
+        'filename': filename,
+        'key': canonical_key(match.group('symbol'), match.group('type')),
+        'stamp': datetime.strptime(match.group('stamp'), '%Y%m%d_%H%M%S')
+    }
+
+def snapshot_points(snapshot):
+    """Velas cerradas [ts_ms, precio, volumen] de `historical_data` (el último punto es provisional)"""
+    points = []
+    for point in (snapshot.get('historical_data') or [])[:-1]:
+        try:
+            ts = int(datetime.fromisoformat(point['timestamp']).timestamp() * 1000)
+            points.append([ts, float(point['price']), float(point.get('volume') or 0)])
+        except Exception:
+            continue
+    return points
+
+def snapshot_summary(snapshot, entry):
+    """Línea del índice de instantáneas: lo que se conserva de un archivo plegado"""
+    return {
+        'file': entry['filename'],
+        'stamp': entry['stamp'].isoformat(),
+        'current_price': snapshot.get('current_price'),
+        'change_24h': snapshot.get('change_24h'),
+        'volume_24h': snapshot.get('volume_24h'),
+        'source': snapshot.get('source'),
+        'history_points': len(snapshot.get('historical_data') or []) or snapshot.get('history_points', 0)
+    }
+
+
+class SnapshotCompactor:
+    """Compactación y retención de las instantáneas JSON de `data/`.
+    
+    Cada instantánea se pliega una vez: sus velas cerradas van a la tabla `candles` (deduplicadas por
+    la clave primaria) y su resumen a `snapshot_index/{CLAVE}.jsonl`. Después, según la política, el
+    archivo se conserva (recientes), se reescribe sin velas (una por intervalo) o se borra (antiguos).
+    Trabaja por tandas, así que puede ejecutarse en segundo plano sin bloquear la app.
+    """
+    
+    def __init__(self, data_dir=None, database=None, policy=None):
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+        self.data_dir = data_dir
+        self.database = database
+        self.policy = check_retention_policy(dict(DEFAULT_RETENTION_POLICY, **(policy or {})))
+        
+        self.index_dir = os.path.join(self.data_dir, 'snapshot_index')
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._indexed = {}
+        self._settled = set()  # ya aligeradas: no hace falta volver a abrirlas
+        
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.last_stats = {}
+    
+    def set_policy(self, policy):
+        """Cambiar parte de la política de retención (se valida antes de aplicarla)"""
+        with self._lock:
+            self.policy = check_retention_policy(dict(self.policy, **policy))
+    
+    def get_index_file(self, key):
+        return os.path.join(self.index_dir, f"{key}.jsonl")
+    
+    def get_indexed_files(self, key):
+        """Archivos ya plegados de un activo (según su índice)"""
+        if key not in self._indexed:
+            indexed = set()
+            index_file = self.get_index_file(key)
+            try:
+                if os.path.exists(index_file):
+                    with open(index_file, 'r') as f:
+                        for line in f:
+                            try:
+                                indexed.add(json.loads(line)['file'])
+                            except ValueError:
+                                continue
+            except Exception as e:
+                print(f"Error loading snapshot index {key}: {e}")
+            self._indexed[key] = indexed
+        return self._indexed[key]
+    
+    def scan(self):
+        """Instantáneas de `data/`, de la más antigua a la más reciente"""
+        snapshots = []
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    parsed = parse_snapshot_name(entry.name)
+                    if parsed is not None:
+                        parsed['size'] = entry.stat().st_size
+                        snapshots.append(parsed)
+        snapshots.sort(key=lambda item: item['stamp'])
+        return snapshots
+    
+    def plan(self, snapshots, now=None):
+        """Acción por archivo: 'keep' (reciente), 'thin' (representante de su intervalo) o 'delete'"""
+        now = now or datetime.now()
+        keep_all_since = now - timedelta(days=self.policy['keep_all_days'])
+        downsample_since = now - timedelta(days=self.policy['downsample_days'])
+        bucket_seconds = self.policy['downsample_hours'] * 3600
+        
+        # En cada intervalo se conserva la última instantánea de cada activo
+        representatives = {}
+        for snapshot in snapshots:
+            if downsample_since <= snapshot['stamp'] < keep_all_since:
+                bucket = (snapshot['key'], int(snapshot['stamp'].timestamp()) // bucket_seconds)
+                representatives[bucket] = snapshot['filename']
+        keepers = set(representatives.values())
+        
+        actions = {}
+        for snapshot in snapshots:
+            if snapshot['stamp'] >= keep_all_since:
+                actions[snapshot['filename']] = 'keep'
+            elif snapshot['filename'] in keepers:
+                actions[snapshot['filename']] = 'thin'
+            else:
+                actions[snapshot['filename']] = 'delete'
+        return actions
+    
+    def run_once(self, now=None):
+        """Una tanda de compactación; devuelve estadísticas (pending > 0 si queda trabajo)"""
+        if self.database is None:
+            # Sin base de datos las velas no tienen adónde ir: nunca borrar ni aligerar archivos
+            raise ValueError("SnapshotCompactor needs a database to fold snapshots into")
+        
+        with self._lock:
+            snapshots = self.scan()
+            actions = self.plan(snapshots, now)
+            stats = {'scanned': len(snapshots), 'folded': 0, 'thinned': 0, 'deleted': 0,
+                     'candles': 0, 'bytes_freed': 0, 'pending': 0, 'failed': 0}
+            
+            # Pendiente: sin plegar, o plegado pero aún por borrar / aligerar
+            work = []
+            for snapshot in snapshots:
+                action = actions[snapshot['filename']]
+                folded = snapshot['filename'] in self.get_indexed_files(snapshot['key'])
+                if not folded or action == 'delete' or (action == 'thin' and snapshot['filename'] not in self._settled):
+                    work.append((snapshot, action, folded))
+            
+            batch = work[:self.policy['max_files_per_run']]
+            stats['pending'] = len(work) - len(batch)
+            
+            # Plegar primero (velas + índice por activo) y sólo después tocar los archivos
+            loaded = {}
+            points_by_key = {}
+            index_lines = {}
+            for snapshot, action, folded in batch:
+                path = os.path.join(self.data_dir, snapshot['filename'])
+                try:
+                    with open(path, 'r') as f:
+                        data = json.load(f)
+                except Exception as e:
+                    print(f"Error reading snapshot {snapshot['filename']}: {e}")
+                    stats['failed'] += 1
+                    continue
+                loaded[snapshot['filename']] = data
+                if not folded:
+                    points_by_key.setdefault(snapshot['key'], []).append(
+                        (snapshot['stamp'].isoformat(), snapshot_points(data)))
+                    index_lines.setdefault(snapshot['key'], []).append(snapshot_summary(data, snapshot))
+            
+            # Un activo sólo se da por plegado si sus velas se guardaron; si no, sus archivos no se tocan
+            failed_keys = set()
+            for key, lines in index_lines.items():
+                try:
+                    written = self.database.insert_snapshot_candles(key, points_by_key[key])
+                    if written is None:
+                        failed_keys.add(key)
+                        continue
+                    self.append_index(key, lines)
+                except Exception as e:
+                    print(f"Error folding snapshots of {key}: {e}")
+                    failed_keys.add(key)
+                    continue
+                stats['candles'] += written
+                stats['folded'] += len(lines)
+            
+            for snapshot, action, folded in batch:
+                data = loaded.get(snapshot['filename'])
+                if data is None:
+                    continue
+                if snapshot['key'] in failed_keys:
+                    stats['failed'] += 1
+                    continue
+                path = os.path.join(self.data_dir, snapshot['filename'])
+                try:
+                    if action == 'delete':
+                        os.remove(path)
+                        stats['deleted'] += 1
+                        stats['bytes_freed'] += snapshot['size']
+                    elif action == 'thin' and ('historical_data' in data or 'monthly_data' in data):
+                        stats['bytes_freed'] += snapshot['size'] - self.thin_snapshot(path, data)
+                        stats['thinned'] += 1
+                    if action == 'thin':
+                        self._settled.add(snapshot['filename'])
+                except Exception as e:
+                    print(f"Error compacting snapshot {snapshot['filename']}: {e}")
+            
+            self.last_stats = stats
+            return stats
+    
+    def run_until_done(self, now=None):
+        """Repetir tandas hasta que no quede trabajo; devuelve las estadísticas acumuladas"""
+        totals = {}
+        while True:
+            stats = self.run_once(now)
+            for name, value in stats.items():
+                if name == 'scanned':
+                    # Cada tanda vuelve a escanear data/ (ya sin los borrados): el total es el de la primera
+                    totals.setdefault(name, value)
+                elif name == 'pending':
+                    totals[name] = value
+                else:
+                    totals[name] = totals.get(name, 0) + value
+            # Si algo falló (p. ej. base de datos bloqueada) se reintenta en la siguiente ejecución
+            if not stats['pending'] or stats['failed'] or self._stop_event.is_set():
+                return totals
+    
+    def append_index(self, key, lines):
+        """Anexar resúmenes al índice del activo"""
+        with open(self.get_index_file(key), 'a') as f:
+            f.write(''.join(json.dumps(line, default=str, separators=(',', ':')) + '\n' for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+        self.get_indexed_files(key).update(line['file'] for line in lines)
+    
+    def thin_snapshot(self, path, data):
+        """Reescribir una instantánea sin velas (como las que genera save_data); devuelve el tamaño nuevo"""
+        snapshot = {k: v for k, v in data.items() if k not in ('historical_data', 'monthly_data')}
+        snapshot['history_points'] = len(data.get('historical_data') or []) or data.get('history_points', 0)
+        temp_file = path + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(snapshot, f, indent=2, default=str)
+        os.replace(temp_file, path)
+        return os.path.getsize(path)
+    
+    def load_index(self, key):
+        """Resúmenes de todas las instantáneas plegadas de un activo"""
+        entries = []
+        index_file = self.get_index_file(key)
+        if os.path.exists(index_file):
+            with open(index_file, 'r') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        return entries
+    
+    def start(self, interval=3600):
+        """Compactar en un hilo de fondo ahora y después cada `interval` segundos"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name='SnapshotCompactor', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _run(self, interval):
+        while not self._stop_event.is_set():
+            try:
+                self.run_until_done()
+            except Exception as e:
+                print(f"Error compacting snapshots: {e}")
+            self._stop_event.wait(interval)
@@ -0,0 +1,146 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from .snapshot_compactor import parse_snapshot_name, snapshot_points
+except ImportError:
+    from snapshot_compactor import parse_snapshot_name, snapshot_points
+
+
+def load_json(path):
+    """Leer un JSON con orjson si está instalado (varias veces más rápido) o con json"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def parse_snapshot_file(task):
+    """Trabajo de cada proceso: (ruta, entrada del nombre) → velas cerradas de la instantánea"""
+    path, entry = task
+    try:
+        points = snapshot_points(load_json(path))
+        return dict(entry, points=points)
+    except Exception as e:
+        return dict(entry, points=None, error=str(e))
+
+
+class SnapshotImporter:
+    """Importación masiva de las instantáneas JSON de `data/` a la tabla `candles`.
+    
+    Los archivos se leen en paralelo (un proceso por núcleo), los puntos que se repiten entre
+    instantáneas se deduplican por timestamp (gana la instantánea más reciente, también frente a lo
+    que ya está en la base de datos) y cada símbolo se guarda en una sola transacción. El estado (`snapshot_index/import_state.json`) guarda qué archivos
+    ya se importaron con su fecha de modificación y tamaño, así que una importación interrumpida
+    continúa donde se quedó y las siguientes sólo leen archivos nuevos o modificados.
+    """
+    
+    def __init__(self, data_dir=None, database=None, workers=None):
+        if database is None:
+            raise ValueError("SnapshotImporter needs a database to import into")
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+        self.data_dir = data_dir
+        self.database = database
+        self.workers = workers or os.cpu_count() or 1
+        
+        self.state_file = os.path.join(self.data_dir, 'snapshot_index', 'import_state.json')
+        self.state = self.load_state()
+    
+    def load_state(self):
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading import state: {e}")
+        return {}
+    
+    def save_state(self):
+        """Guardar el estado de forma atómica (archivo temporal + os.replace)"""
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self.state, f, separators=(',', ':'))
+        os.replace(temp_file, self.state_file)
+    
+    def scan(self, full=False):
+        """Instantáneas pendientes de importar (todas con `full`), de la más antigua a la más reciente"""
+        pending = []
+        present = set()
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                parsed = parse_snapshot_name(entry.name)
+                if parsed is None or not entry.is_file():
+                    continue
+                present.add(entry.name)
+                stat = entry.stat()
+                signature = [int(stat.st_mtime), stat.st_size]
+                if not full and self.state.get(entry.name) == signature:
+                    continue
+                parsed['signature'] = signature
+                pending.append(parsed)
+        
+        # Olvidar los archivos que ya no existen (p. ej. borrados por la compactación)
+        removed = [filename for filename in self.state if filename not in present]
+        for filename in removed:
+            del self.state[filename]
+        if removed:
+            self.save_state()
+        
+        pending.sort(key=lambda item: item['stamp'])
+        return pending
+    
+    def parse_all(self, snapshots):
+        """Leer las instantáneas en paralelo; el orden del resultado es el de `snapshots`"""
+        tasks = [(os.path.join(self.data_dir, snapshot['filename']), snapshot) for snapshot in snapshots]
+        if self.workers <= 1 or len(tasks) < 2:
+            return [parse_snapshot_file(task) for task in tasks]
+        
+        chunksize = max(1, len(tasks) // (self.workers * 4))
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(parse_snapshot_file, tasks, chunksize=chunksize))
+    
+    def run(self, full=False):
+        """Importar las instantáneas pendientes; devuelve estadísticas"""
+        started = time.perf_counter()
+        snapshots = self.scan(full)
+        stats = {'files': len(snapshots), 'symbols': 0, 'points': 0, 'candles': 0, 'errors': 0}
+        if not snapshots:
+            stats['seconds'] = round(time.perf_counter() - started, 3)
+            return stats
+        
+        # Agrupar por símbolo; la deduplicación por timestamp la hace insert_snapshot_candles
+        files_by_key = {}
+        for result in self.parse_all(snapshots):
+            if result.get('points') is None:
+                stats['errors'] += 1
+                print(f"Error importing snapshot {result['filename']}: {result.get('error')}")
+                continue
+            stats['points'] += len(result['points'])
+            files_by_key.setdefault(result['key'], []).append(result)
+        stats['parse_seconds'] = round(time.perf_counter() - started, 3)
+        
+        # Una transacción por símbolo; el estado se guarda tras cada una para poder reanudar
+        for key, results in files_by_key.items():
+            written = self.database.insert_snapshot_candles(
+                key, [(result['stamp'].isoformat(), result['points']) for result in results])
+            if written is None:
+                stats['errors'] += 1
+                continue
+            for result in results:
+                self.state[result['filename']] = result['signature']
+            self.save_state()
+            stats['symbols'] += 1
+            stats['candles'] += written
+        
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        return stats
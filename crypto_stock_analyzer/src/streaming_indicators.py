@@ -0,0 +1,474 @@
+import math
+import time
+from collections import deque
+
+try:
+    from .indicators import PriceSeries, rsi_from_averages, invalidation_from_recent
+except ImportError:
+    from indicators import PriceSeries, rsi_from_averages, invalidation_from_recent
+
+class WelfordStats:
+    """Media y suma de cuadrados (Welford) con altas y bajas en O(1)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+    
+    def add(self, value):
+        self.count, self.mean, self.m2 = self.with_value(value)
+    
+    def remove(self, value):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        
+        count = self.count - 1
+        delta = value - self.mean
+        mean = self.mean - delta / count
+        self.m2 = max(0.0, self.m2 - delta * (value - mean))
+        self.count, self.mean = count, mean
+    
+    def with_value(self, value):
+        """(count, mean, m2) si se añadiera `value`, sin modificar el estado"""
+        count = self.count + 1
+        delta = value - self.mean
+        mean = self.mean + delta / count
+        return count, mean, self.m2 + delta * (value - mean)
+    
+    def reset(self, values):
+        """Recalcular desde cero para eliminar el error acumulado"""
+        self.count = len(values)
+        self.mean = math.fsum(values) / self.count if self.count else 0.0
+        self.m2 = math.fsum((value - self.mean) ** 2 for value in values)
+    
+    def sample_std(self, stats=None):
+        """Desviación estándar muestral (del estado o de una tupla de `with_value`)"""
+        count, mean, m2 = stats or (self.count, self.mean, self.m2)
+        return math.sqrt(m2 / (count - 1)) if count > 1 else 0
+
+
+class RollingStats:
+    """Media y varianza de los últimos `size` valores actualizadas en O(1)"""
+    
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.stats = WelfordStats()
+        self._updates = 0
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def push(self, value):
+        self.values.append(value)
+        self.stats.add(value)
+        if len(self.values) > self.size:
+            self.stats.remove(self.values.popleft())
+        self._resync()
+    
+    def pop_oldest(self):
+        self.stats.remove(self.values.popleft())
+        self._resync()
+    
+    def _resync(self):
+        # Recalcular cada `size` actualizaciones: coste amortizado O(1) y sin deriva numérica
+        self._updates += 1
+        if self._updates >= self.size:
+            self._updates = 0
+            self.stats.reset(self.values)
+    
+    def peek(self, value=None):
+        """(count, mean, m2) de la ventana si se añadiera `value`, sin modificarla"""
+        stats = self.stats
+        if value is None:
+            return stats.count, stats.mean, stats.m2
+        
+        count, mean, m2 = stats.with_value(value)
+        if len(self.values) < self.size:
+            return count, mean, m2
+        
+        # Ventana llena: sale el valor más antiguo
+        oldest = self.values[0]
+        count -= 1
+        delta = oldest - mean
+        new_mean = mean - delta / count
+        return count, new_mean, max(0.0, m2 - delta * (oldest - new_mean))
+
+
+class RecursiveEMA:
+    """EMA recursiva sembrada con la SMA de los primeros `period` precios"""
+    
+    def __init__(self, period):
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = None
+    
+    def push(self, price):
+        self.count, self.seed_sum, self.value = self._advance(price)
+    
+    def _advance(self, price):
+        count = self.count + 1
+        if count < self.period:
+            return count, self.seed_sum + price, None
+        if count == self.period:
+            return count, self.seed_sum + price, (self.seed_sum + price) / self.period
+        return count, self.seed_sum, price * self.multiplier + self.value * (1 - self.multiplier)
+    
+    def peek(self, price=None, last_price=None):
+        """EMA incluyendo `price` (o el último precio si aún no hay `period` precios)"""
+        if price is None:
+            return self.value if self.value is not None else last_price
+        
+        value = self._advance(price)[2]
+        return value if value is not None else price
+
+
+class IndicatorWindow:
+    """Indicadores de una ventana de `days` días que avanza una vela cada vez.
+    
+    Las medias móviles, RSI, ATR, Bollinger y EMAs se actualizan en O(1); máximos y
+    mínimos con colas monótonas (O(1) amortizado). La volatilidad de los primeros
+    retornos de la ventana se mantiene igual que en el cálculo completo.
+    """
+    
+    SMA_PERIODS = (20, 50, 100, 200)
+    RSI_PERIODS = (14, 30)
+    EMA_PERIODS = (12, 26)
+    LEADING_COUNTS = (10, 30, 252)
+    ATR_PERIOD = 14
+    
+    def __init__(self, days):
+        self.days = days
+        self.points = deque()
+        self.returns = deque()
+        self.first_seq = 0
+        self.next_seq = 0
+        self.highs = deque()
+        self.lows = deque()
+        
+        self.smas = {period: RollingStats(period) for period in self.SMA_PERIODS}
+        self.gains = {period: RollingStats(period) for period in self.RSI_PERIODS}
+        self.losses = {period: RollingStats(period) for period in self.RSI_PERIODS}
+        self.abs_diffs = RollingStats(self.ATR_PERIOD)
+        self.emas = {period: RecursiveEMA(period) for period in self.EMA_PERIODS}
+        self.leading = {count: WelfordStats() for count in self.LEADING_COUNTS}
+        self._leading_updates = {count: 0 for count in self.LEADING_COUNTS}
+    
+    def __len__(self):
+        return len(self.points)
+    
+    def push(self, point):
+        """Añadir una vela cerrada [ts_ms, precio, volumen]"""
+        price = point[1]
+        if self.points:
+            previous = self.points[-1][1]
+            diff = price - previous
+            self.returns.append(diff / previous)
+            for count, stats in self.leading.items():
+                if len(self.returns) <= count:
+                    stats.add(self.returns[-1])
+            
+            for period in self.RSI_PERIODS:
+                self.gains[period].push(diff if diff > 0 else 0.0)
+                self.losses[period].push(0.0 if diff > 0 else -diff)
+            self.abs_diffs.push(abs(diff))
+        
+        self.points.append(list(point))
+        seq = self.next_seq
+        self.next_seq += 1
+        
+        while self.highs and self.highs[-1][1] <= price:
+            self.highs.pop()
+        self.highs.append((seq, price))
+        while self.lows and self.lows[-1][1] >= price:
+            self.lows.pop()
+        self.lows.append((seq, price))
+        
+        for stats in self.smas.values():
+            stats.push(price)
+        for ema in self.emas.values():
+            ema.push(price)
+    
+    def expire(self, now_ms=None):
+        """Sacar de la ventana las velas anteriores al corte de `days` días"""
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        cutoff = now_ms - self.days * 86400 * 1000
+        while self.points and self.points[0][0] < cutoff:
+            self._pop_front()
+    
+    def _pop_front(self):
+        self.points.popleft()
+        self.first_seq += 1
+        if self.highs[0][0] < self.first_seq:
+            self.highs.popleft()
+        if self.lows[0][0] < self.first_seq:
+            self.lows.popleft()
+        
+        if self.returns:
+            oldest = self.returns.popleft()
+            for count, stats in self.leading.items():
+                if stats.count:
+                    stats.remove(oldest)
+                if len(self.returns) >= count:
+                    stats.add(self.returns[count - 1])
+                
+                # Recalcular cada `count` salidas: coste amortizado O(1) y sin deriva numérica
+                self._leading_updates[count] += 1
+                if self._leading_updates[count] >= count:
+                    self._leading_updates[count] = 0
+                    stats.reset([self.returns[i] for i in range(min(count, len(self.returns)))])
+        
+        # Las ventanas móviles nunca pueden contener velas que ya salieron
+        for stats in self.smas.values():
+            while len(stats) > len(self.points):
+                stats.pop_oldest()
+        for stats in list(self.gains.values()) + list(self.losses.values()) + [self.abs_diffs]:
+            while len(stats) > len(self.returns):
+                stats.pop_oldest()
+        # La EMA continúa la recursión: la semilla antigua pesa decay^n, despreciable tras un año
+    
+    def _price_from_end(self, offset, live):
+        """Precio en la posición -offset de la serie (incluyendo el punto provisional)"""
+        if live is not None:
+            return live[1] if offset == 1 else self.points[-(offset - 1)][1]
+        return self.points[-offset][1]
+    
+    def _tail(self, count, live):
+        """Últimos `count` puntos de la serie (incluyendo el provisional)"""
+        tail = [self.points[-i] for i in range(min(count, len(self.points)), 0, -1)]
+        if live is not None:
+            tail = (tail + [live])[-count:]
+        return tail
+    
+    def _leading_stats(self, count, live_return):
+        """Estadísticos de los primeros `count` retornos, incluyendo el provisional si cabe"""
+        stats = self.leading[count]
+        if live_return is not None and len(self.returns) < count:
+            return stats.with_value(live_return)
+        return stats.count, stats.mean, stats.m2
+    
+    def _leading_volatility(self, count, live_return):
+        return self.leading[count].sample_std(self._leading_stats(count, live_return))
+    
+    def _snapshot(self, live):
+        """Valores comunes de la serie cerrada más el punto provisional, sin modificar el estado"""
+        snapshot = {
+            'n': len(self.points),
+            'diff': None,
+            'live_return': None,
+            'current_price': self.points[-1][1] if self.points else None,
+            'high': self.highs[0][1] if self.highs else None,
+            'low': self.lows[0][1] if self.lows else None
+        }
+        if live is None:
+            return snapshot
+        
+        price = live[1]
+        snapshot['n'] += 1
+        snapshot['current_price'] = price
+        if self.points:
+            previous = self.points[-1][1]
+            snapshot['diff'] = price - previous
+            snapshot['live_return'] = snapshot['diff'] / previous
+            snapshot['high'] = max(snapshot['high'], price)
+            snapshot['low'] = min(snapshot['low'], price)
+        else:
+            snapshot['high'] = snapshot['low'] = price
+        return snapshot
+    
+    def _rsi(self, period, snapshot):
+        if snapshot['n'] < period + 1:
+            return 50.0
+        diff = snapshot['diff']
+        gain = None if diff is None else (diff if diff > 0 else 0.0)
+        loss = None if diff is None else (0.0 if diff > 0 else -diff)
+        return rsi_from_averages(self.gains[period].peek(gain)[1], self.losses[period].peek(loss)[1])
+    
+    def _sma(self, period, live):
+        return self.smas[period].peek(live[1] if live is not None else None)[1]
+    
+    def _bollinger(self, live):
+        count, sma, m2 = self.smas[20].peek(live[1] if live is not None else None)
+        std_dev = math.sqrt(m2 / count)
+        upper = sma + 2 * std_dev
+        lower = sma - 2 * std_dev
+        return upper, lower, (upper - lower) / sma
+    
+    def _atr(self, snapshot):
+        if snapshot['n'] < self.ATR_PERIOD + 1:
+            return snapshot['current_price'] * 0.02
+        diff = snapshot['diff']
+        return round(self.abs_diffs.peek(None if diff is None else abs(diff))[1], 6)
+    
+    def _invalidation_level(self, snapshot, live):
+        if snapshot['n'] < 20:
+            return snapshot['current_price'] * 0.95
+        
+        stats = self._leading_stats(10, snapshot['live_return'])
+        volatility = self.leading[10].sample_std(stats) if stats[0] > 1 else 0.02
+        return invalidation_from_recent([point[1] for point in self._tail(20, live)], volatility)
+    
+    def _volume_trend(self, live):
+        tail = self._tail(10, live)
+        return PriceSeries([point[1] for point in tail], [point[2] for point in tail]).volume_trend()
+    
+    def annual_indicators(self, live=None):
+        """Mismo resultado que `calculate_indicators` sobre la ventana más el punto provisional"""
+        snapshot = self._snapshot(live)
+        n = snapshot['n']
+        if n < 50:
+            return {}
+        # Igual que el cálculo completo: sin rango anual (precio plano) no hay indicadores
+        if snapshot['high'] == snapshot['low']:
+            return {}
+        
+        current_price = snapshot['current_price']
+        live_price = live[1] if live is not None else None
+        indicators = {}
+        
+        indicators['rsi_14'] = self._rsi(14, snapshot)
+        indicators['rsi_30'] = self._rsi(30, snapshot)
+        
+        indicators['sma_20'] = self._sma(20, live)
+        indicators['sma_50'] = self._sma(50, live)
+        if n >= 100:
+            indicators['sma_100'] = self._sma(100, live)
+        if n >= 200:
+            indicators['sma_200'] = self._sma(200, live)
+        
+        if 'sma_200' in indicators and indicators['sma_200'] > 0:
+            indicators['distance_to_sma200_pct'] = ((current_price - indicators['sma_200']) / indicators['sma_200']) * 100
+        
+        indicators['bb_upper'], indicators['bb_lower'], indicators['bb_width'] = self._bollinger(live)
+        
+        indicators['macd'] = self.emas[12].peek(live_price, current_price) - self.emas[26].peek(live_price, current_price)
+        indicators['macd_signal'] = indicators['macd']
+        indicators['macd_histogram'] = indicators['macd'] - indicators['macd_signal']
+        
+        indicators['volatility_30d'] = self._leading_volatility(30, snapshot['live_return'])
+        if n >= 252:
+            indicators['volatility_annual'] = self._leading_volatility(252, snapshot['live_return'])
+        
+        indicators['year_high'] = float(snapshot['high'])
+        indicators['year_low'] = float(snapshot['low'])
+        indicators['year_range'] = indicators['year_high'] - indicators['year_low']
+        indicators['current_position'] = (current_price - indicators['year_low']) / indicators['year_range']
+        
+        indicators['invalidation_level'] = self._invalidation_level(snapshot, live)
+        indicators['atr'] = self._atr(snapshot)
+        
+        if n >= 90:
+            base = self._price_from_end(90, live)
+            indicators['momentum_3m'] = (current_price - base) / base * 100
+        if n >= 180:
+            base = self._price_from_end(180, live)
+            indicators['momentum_6m'] = (current_price - base) / base * 100
+        
+        indicators['volume_trend'] = self._volume_trend(live)
+        
+        return indicators
+    
+    def monthly_indicators(self, live=None):
+        """Mismo resultado que `calculate_monthly_indicators` sobre la ventana más el punto provisional"""
+        snapshot = self._snapshot(live)
+        n = snapshot['n']
+        if n < 20:
+            return {}
+        if snapshot['high'] == snapshot['low']:
+            return {}
+        
+        current_price = snapshot['current_price']
+        indicators = {}
+        
+        indicators['rsi_14'] = self._rsi(14, snapshot)
+        indicators['sma_20'] = self._sma(20, live)
+        indicators['bb_upper'], indicators['bb_lower'], indicators['bb_width'] = self._bollinger(live)
+        indicators['volatility_10d'] = self._leading_volatility(10, snapshot['live_return'])
+        
+        indicators['month_high'] = float(snapshot['high'])
+        indicators['month_low'] = float(snapshot['low'])
+        indicators['month_range'] = indicators['month_high'] - indicators['month_low']
+        indicators['current_month_position'] = (current_price - indicators['month_low']) / indicators['month_range']
+        
+        base = self._price_from_end(7, live)
+        indicators['momentum_1w'] = (current_price - base) / base * 100
+        
+        indicators['volume_trend'] = self._volume_trend(live)
+        indicators['atr'] = self._atr(snapshot)
+        
+        return indicators
+    
+    def to_dict(self):
+        """Estado persistible: sólo las EMAs (las velas de la ventana ya están en el historial)"""
+        return {
+            'days': self.days,
+            'emas': {str(period): [ema.count, ema.seed_sum, ema.value] for period, ema in self.emas.items()}
+        }
+    
+    def load_dict(self, data):
+        """Restaurar las EMAs guardadas con `to_dict` sobre una ventana ya reconstruida"""
+        for period, (count, seed_sum, value) in data.get('emas', {}).items():
+            ema = self.emas[int(period)]
+            ema.count, ema.seed_sum, ema.value = count, seed_sum, value
+
+
+class StreamingIndicators:
+    """Estado incremental de indicadores de un símbolo (ventana anual y mensual)"""
+    
+    def __init__(self, history_days=365, monthly_days=30):
+        self.annual = IndicatorWindow(history_days)
+        self.monthly = IndicatorWindow(monthly_days)
+        self.last_ts = None
+    
+    def rebuild(self, points, now_ms=None):
+        """Reconstruir desde las velas cerradas del historial (sólo las de cada ventana)"""
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        self.annual = IndicatorWindow(self.annual.days)
+        self.monthly = IndicatorWindow(self.monthly.days)
+        
+        for window in (self.annual, self.monthly):
+            cutoff = now_ms - window.days * 86400 * 1000
+            for point in points:
+                if point[0] >= cutoff:
+                    window.push(point)
+        self.last_ts = points[-1][0] if points else None
+    
+    def push(self, point):
+        """Avanzar una vela cerrada"""
+        self.annual.push(point)
+        self.monthly.push(point)
+        self.last_ts = point[0]
+    
+    def expire(self, now_ms=None):
+        self.annual.expire(now_ms)
+        self.monthly.expire(now_ms)
+    
+    def get_indicators(self, live=None):
+        """Indicadores anuales y mensuales combinando el estado con el punto provisional"""
+        return self.annual.annual_indicators(live), self.monthly.monthly_indicators(live)
+    
+    def to_dict(self):
+        return {
+            'last_ts': self.last_ts,
+            'annual': self.annual.to_dict(),
+            'monthly': self.monthly.to_dict()
+        }
+    
+    def load_dict(self, data, points, now_ms=None):
+        """Reconstruir las ventanas con las velas cerradas del historial hasta el `last_ts` guardado
+        y recuperar las EMAs, que continúan su recursión. Si el historial no llega a ese punto
+        el estado queda desfasado y el llamador lo reconstruye entero"""
+        last_ts = data.get('last_ts')
+        if last_ts is None:
+            return
+        self.annual = IndicatorWindow(data['annual']['days'])
+        self.monthly = IndicatorWindow(data['monthly']['days'])
+        self.rebuild([point for point in points if point[0] <= last_ts], now_ms)
+        if self.last_ts == last_ts:
+            self.annual.load_dict(data['annual'])
+            self.monthly.load_dict(data['monthly'])
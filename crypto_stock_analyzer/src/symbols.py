@@ -0,0 +1,53 @@
+# Mapeo de símbolos comunes a nombres completos de CoinGecko
+COINGECKO_IDS = {
+    'btc': 'bitcoin',
+    'eth': 'ethereum', 
+    'ada': 'cardano',
+    'sol': 'solana',
+    'dot': 'polkadot',
+    'avax': 'avalanche-2',
+    'matic': 'matic-network',
+    'link': 'chainlink',
+    'uni': 'uniswap',
+    'atom': 'cosmos',
+    'near': 'near-protocol',
+    'ftm': 'fantom',
+    'sand': 'the-sandbox',
+    'mana': 'decentraland',
+    'axs': 'axie-infinity',
+    'enj': 'enjincoin',
+    'chz': 'chiliz',
+    'shib': 'shiba-inu',
+    'doge': 'dogecoin',
+    'ltc': 'litecoin',
+    'bch': 'bitcoin-cash',
+    'xrp': 'ripple',
+    'xlm': 'stellar',
+    'vet': 'vechain',
+    'theta': 'theta-token',
+    'bnb': 'binancecoin',
+    'usdt': 'tether',
+    'usdc': 'usd-coin'
+}
+
+# Mapeo de nombres a símbolos para Yahoo Finance
+YAHOO_CRYPTO_SYMBOLS = {
+    'bitcoin': 'BTC',
+    'ethereum': 'ETH', 
+    'cardano': 'ADA',
+    'solana': 'SOL',
+    'polkadot': 'DOT',
+    'avalanche': 'AVAX',
+    'polygon': 'MATIC',
+    'chainlink': 'LINK',
+    'uniswap': 'UNI',
+    'cosmos': 'ATOM'
+}
+
+def yahoo_crypto_ticker(symbol):
+    """Ticker de Yahoo Finance de una criptomoneda ('bitcoin' → 'BTC-USD'), igual en cotizaciones e historial"""
+    return f"{YAHOO_CRYPTO_SYMBOLS.get(symbol.lower(), symbol[:4].upper())}-USD"
+
+def infer_asset_type(symbol):
+    """Tipo por defecto de un símbolo sin tipo declarado: 'crypto' si CoinGecko lo conoce"""
+    return 'crypto' if symbol.lower() in COINGECKO_IDS else 'stock'
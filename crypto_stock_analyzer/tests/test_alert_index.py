@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from alert_index import build_alert_index, canonical_key
+
+
+def test_canonical_key_keeps_asset_type():
+    assert canonical_key('BTC_crypto') == ('BTC', 'crypto')
+    assert canonical_key('BTC_stock') == ('BTC', 'stock')
+    assert canonical_key('BTC-USD') == ('BTC', 'crypto')
+    assert canonical_key('btc', 'stock') == ('BTC', 'stock')
+    assert canonical_key('aapl') == ('AAPL', 'stock')
+
+
+def test_same_symbol_as_crypto_and_stock_are_separate_assets():
+    index = build_alert_index({
+        'watchlist': {
+            'btc': {'symbol': 'BTC', 'custom_name': 'Bitcoin', 'sell_alert_price': 100000.0, 'asset_type': 'crypto'}
+        },
+        'alerts': {
+            'BTC_stock_SELL_30.0': {'symbol': 'BTC', 'type': 'SELL', 'target_price': 30.0,
+                                    'custom_name': 'BTC ETF', 'asset_type': 'stock'}
+        }
+    })
+    
+    triggered = index.evaluate_data({
+        'BTC_crypto': {'type': 'crypto', 'current_price': 101000.0},
+        'BTC_stock': {'type': 'stock', 'current_price': 31.0}
+    })
+    
+    assert [(alert['custom_name'], data_key) for alert, price, data_key in triggered] == [
+        ('Bitcoin', 'BTC_crypto'), ('BTC ETF', 'BTC_stock')
+    ]
+    # Un precio de la acción nunca activa la alerta de la criptomoneda
+    assert index.evaluate_data({'BTC_stock': {'type': 'stock', 'current_price': 200000.0}})[0][0]['custom_name'] == 'BTC ETF'
+    assert len(index.evaluate_data({'BTC_stock': {'type': 'stock', 'current_price': 200000.0}})) == 1
@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from database import Database
+
+
+def test_latest_market_data_returns_saved_indicators(tmp_path):
+    database = Database(db_path=os.path.join(str(tmp_path), 'test.db'))
+    indicators = {'rsi_14': 61.5, 'sma_20': 101.25, 'volume_trend': 'BULLISH_CONFIRMED'}
+    database.save_refresh({
+        'BTC_crypto': {'symbol': 'BTC', 'type': 'crypto', 'current_price': 102.0, 'indicators': indicators}
+    }, candles={'BTC_crypto': [[1700000000000, 100.0, 5.0]]})
+    
+    latest = database.get_latest_market_data('BTC', limit=1)
+    
+    assert latest[0]['indicators'] == indicators
+    assert latest[0]['current_price'] == 102.0
+    assert database.get_latest_indicators('BTC_crypto') == indicators
+    database.close()
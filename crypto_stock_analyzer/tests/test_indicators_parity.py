@@ -0,0 +1,295 @@
+import math
+import os
+import random
+import statistics
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+import indicators
+
+
+# --- Implementación de referencia: fórmulas originales en Python puro (RealDataCollector) ---
+
+def ref_rsi(prices, period):
+    if len(prices) < period + 1:
+        return 50.0
+    
+    gains = []
+    losses = []
+    for i in range(1, len(prices)):
+        change = prices[i] - prices[i-1]
+        if change > 0:
+            gains.append(change)
+            losses.append(0)
+        else:
+            gains.append(0)
+            losses.append(abs(change))
+    
+    if len(gains) >= period:
+        avg_gain = sum(gains[-period:]) / period
+        avg_loss = sum(losses[-period:]) / period
+        if avg_loss > 0:
+            rs = avg_gain / avg_loss
+            return 100 - (100 / (1 + rs))
+        return 100.0
+    return 50.0
+
+
+def ref_ema(prices, period):
+    if len(prices) < period:
+        return prices[-1] if prices else 0
+    
+    multiplier = 2 / (period + 1)
+    ema = sum(prices[:period]) / period
+    for price in prices[period:]:
+        ema = (price * multiplier) + (ema * (1 - multiplier))
+    return ema
+
+
+def ref_volume_trend(prices, volumes):
+    if len(prices) < 10 or len(volumes) < 10:
+        return 'INSUFFICIENT_DATA'
+    
+    price_change = (prices[-1] - prices[-10]) / prices[-10]
+    recent_volume_avg = sum(volumes[-5:]) / 5
+    historical_volume_avg = sum(volumes[-10:-5]) / 5
+    volume_ratio = recent_volume_avg / historical_volume_avg if historical_volume_avg > 0 else 1
+    
+    if price_change > 0.02:
+        if volume_ratio > 1.2:
+            return 'BULLISH_CONFIRMED'
+        elif volume_ratio < 0.8:
+            return 'BULLISH_WEAK'
+        return 'BULLISH_NEUTRAL'
+    elif price_change < -0.02:
+        if volume_ratio > 1.2:
+            return 'BEARISH_CONFIRMED'
+        elif volume_ratio < 0.8:
+            return 'BEARISH_WEAK'
+        return 'BEARISH_NEUTRAL'
+    if volume_ratio > 1.5:
+        return 'ACCUMULATION'
+    return 'NEUTRAL'
+
+
+def ref_atr(prices, period=14):
+    if len(prices) < period + 1:
+        return prices[-1] * 0.02
+    
+    true_ranges = []
+    for i in range(1, len(prices)):
+        high = prices[i]
+        low = prices[i]
+        prev_close = prices[i-1]
+        true_ranges.append(max(high - low, abs(high - prev_close), abs(low - prev_close)))
+    
+    if len(true_ranges) >= period:
+        atr = sum(true_ranges[-period:]) / period
+    else:
+        atr = sum(true_ranges) / len(true_ranges)
+    return round(atr, 6)
+
+
+def ref_invalidation_level(prices):
+    if len(prices) < 20:
+        return prices[-1] * 0.95
+    
+    current_price = prices[-1]
+    recent_prices = prices[-20:]
+    support_levels = []
+    for i in range(2, len(recent_prices) - 2):
+        if (recent_prices[i] <= recent_prices[i-1] and
+            recent_prices[i] <= recent_prices[i-2] and
+            recent_prices[i] <= recent_prices[i+1] and
+            recent_prices[i] <= recent_prices[i+2]):
+            support_levels.append(recent_prices[i])
+    
+    if not support_levels:
+        recent_lows = sorted(recent_prices)[:len(recent_prices)//3]
+        mean_low = sum(recent_lows) / len(recent_lows)
+        std_dev = (sum((x - mean_low) ** 2 for x in recent_lows) / len(recent_lows)) ** 0.5
+        invalidation_level = max(mean_low - (2 * std_dev), current_price * 0.9)
+    else:
+        valid_supports = [s for s in support_levels if s < current_price]
+        if valid_supports:
+            invalidation_level = max(valid_supports)
+        else:
+            mean_support = sum(support_levels) / len(support_levels)
+            invalidation_level = min(mean_support, current_price * 0.95)
+    
+    if len(prices) >= 10:
+        returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, min(11, len(prices)))]
+        volatility = statistics.stdev(returns) if len(returns) > 1 else 0.02
+        invalidation_level -= (current_price * min(0.05, volatility * 2))
+    
+    invalidation_level = max(invalidation_level, current_price * 0.85)
+    return round(invalidation_level, 4)
+
+
+def ref_indicators(prices, volumes):
+    if len(prices) < 50:
+        return {}
+    
+    try:
+        result = {}
+        result['rsi_14'] = ref_rsi(prices, 14)
+        result['rsi_30'] = ref_rsi(prices, 30)
+        result['sma_20'] = sum(prices[-20:]) / 20
+        result['sma_50'] = sum(prices[-50:]) / 50
+        if len(prices) >= 100:
+            result['sma_100'] = sum(prices[-100:]) / 100
+        if len(prices) >= 200:
+            result['sma_200'] = sum(prices[-200:]) / 200
+        if 'sma_200' in result and result['sma_200'] > 0:
+            result['distance_to_sma200_pct'] = ((prices[-1] - result['sma_200']) / result['sma_200']) * 100
+        
+        sma_20 = sum(prices[-20:]) / 20
+        std_dev = (sum((p - sma_20) ** 2 for p in prices[-20:]) / 20) ** 0.5
+        result['bb_upper'] = sma_20 + (2 * std_dev)
+        result['bb_lower'] = sma_20 - (2 * std_dev)
+        result['bb_width'] = (result['bb_upper'] - result['bb_lower']) / sma_20
+        
+        ema_12 = ref_ema(prices, 12)
+        ema_26 = ref_ema(prices, 26)
+        result['macd'] = ema_12 - ema_26
+        result['macd_signal'] = ref_ema([ema_12 - ema_26], 9)
+        result['macd_histogram'] = result['macd'] - result['macd_signal']
+        
+        returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, min(31, len(prices)))]
+        result['volatility_30d'] = statistics.stdev(returns) if len(returns) > 1 else 0
+        if len(prices) >= 252:
+            annual_returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, min(253, len(prices)))]
+            result['volatility_annual'] = statistics.stdev(annual_returns) if len(annual_returns) > 1 else 0
+        
+        result['year_high'] = max(prices)
+        result['year_low'] = min(prices)
+        result['year_range'] = result['year_high'] - result['year_low']
+        result['current_position'] = (prices[-1] - result['year_low']) / result['year_range']
+        result['invalidation_level'] = ref_invalidation_level(prices)
+        result['atr'] = ref_atr(prices, 14)
+        if len(prices) >= 90:
+            result['momentum_3m'] = (prices[-1] - prices[-90]) / prices[-90] * 100
+        if len(prices) >= 180:
+            result['momentum_6m'] = (prices[-1] - prices[-180]) / prices[-180] * 100
+        result['volume_trend'] = ref_volume_trend(prices, volumes)
+        return result
+    except Exception:
+        return {}
+
+
+def ref_monthly_indicators(prices, volumes):
+    if len(prices) < 20:
+        return {}
+    
+    try:
+        result = {}
+        result['rsi_14'] = ref_rsi(prices, 14)
+        result['sma_20'] = sum(prices[-20:]) / 20
+        sma_20 = result['sma_20']
+        std_dev = (sum((p - sma_20) ** 2 for p in prices[-20:]) / 20) ** 0.5
+        result['bb_upper'] = sma_20 + (2 * std_dev)
+        result['bb_lower'] = sma_20 - (2 * std_dev)
+        result['bb_width'] = (result['bb_upper'] - result['bb_lower']) / sma_20
+        
+        returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, min(11, len(prices)))]
+        result['volatility_10d'] = statistics.stdev(returns) if len(returns) > 1 else 0
+        
+        result['month_high'] = max(prices)
+        result['month_low'] = min(prices)
+        result['month_range'] = result['month_high'] - result['month_low']
+        result['current_month_position'] = (prices[-1] - result['month_low']) / result['month_range']
+        result['momentum_1w'] = (prices[-1] - prices[-7]) / prices[-7] * 100
+        result['volume_trend'] = ref_volume_trend(prices, volumes)
+        result['atr'] = ref_atr(prices, 14)
+        return result
+    except Exception:
+        return {}
+
+
+# --- Series de prueba ---
+
+def random_walk(rng, n, start=100.0):
+    prices = [start]
+    for _ in range(n - 1):
+        prices.append(max(0.01, prices[-1] * (1 + rng.gauss(0, 0.03))))
+    volumes = [rng.uniform(1e5, 5e6) for _ in range(n)]
+    return prices, volumes
+
+
+def plateau_series(rng, n, start=50.0):
+    """Tramos de precio constante (RSI con pérdidas nulas, soportes repetidos, volumen cero)"""
+    prices = []
+    price = start
+    while len(prices) < n:
+        prices.extend([price] * rng.randint(1, 12))
+        price = round(max(0.5, price + rng.choice([-2, -1, 1, 2]) * rng.random()), 2)
+    volumes = [rng.choice([0.0, 0.0, rng.uniform(1e3, 1e6)]) for _ in range(n)]
+    return prices[:n], volumes
+
+
+def generate_series():
+    rng = random.Random(20260118)
+    series = []
+    for _ in range(25):
+        series.append(('random', random_walk(rng, 366, rng.uniform(0.05, 90000))))
+        series.append(('plateau', plateau_series(rng, 366)))
+    # Longitudes en los límites de cada indicador
+    for n in (10, 19, 20, 21, 25, 26, 30, 31, 49, 50, 51, 89, 90, 99, 100, 179, 180, 199, 200, 251, 252, 253):
+        series.append((f'short_{n}', random_walk(rng, n, rng.uniform(1, 1000))))
+        series.append((f'short_plateau_{n}', plateau_series(rng, n)))
+    series.append(('flat', ([42.0] * 120, [1.0] * 120)))
+    return series
+
+
+SERIES = generate_series()
+
+
+def guarded(function, prices, volumes):
+    """Igual que los envoltorios del colector: un error de cálculo deja los indicadores vacíos"""
+    try:
+        return function(prices, volumes)
+    except Exception:
+        return {}
+
+
+def assert_same_indicators(expected, actual, prices):
+    assert sorted(actual) == sorted(expected)
+    # Tolerancia relativa a la escala de precios: MACD e histograma son restas de magnitudes parecidas
+    scale = max(abs(p) for p in prices)
+    for key, value in expected.items():
+        if isinstance(value, str):
+            assert actual[key] == value, key
+        else:
+            assert math.isclose(actual[key], value, rel_tol=1e-9, abs_tol=1e-9 * scale), (key, actual[key], value)
+
+
+@pytest.mark.parametrize('name,series', SERIES, ids=[name for name, series in SERIES])
+def test_yearly_indicators_match_reference(name, series):
+    prices, volumes = series
+    expected = ref_indicators(prices, volumes)
+    assert_same_indicators(expected, guarded(indicators.calculate_indicators, prices, volumes), prices)
+
+
+@pytest.mark.parametrize('name,series', SERIES, ids=[name for name, series in SERIES])
+def test_monthly_indicators_match_reference(name, series):
+    prices, volumes = series
+    prices, volumes = prices[-30:], volumes[-30:]
+    expected = ref_monthly_indicators(prices, volumes)
+    assert_same_indicators(expected, guarded(indicators.calculate_monthly_indicators, prices, volumes), prices)
+
+
+@pytest.mark.parametrize('name,series', SERIES, ids=[name for name, series in SERIES])
+def test_price_series_helpers_match_reference(name, series):
+    prices, volumes = series
+    price_series = indicators.PriceSeries(prices, volumes)
+    for period in (14, 30):
+        assert math.isclose(price_series.rsi(period), ref_rsi(prices, period), rel_tol=1e-9)
+    for period in (12, 26):
+        assert math.isclose(price_series.ema(period), ref_ema(prices, period), rel_tol=1e-9)
+    assert math.isclose(price_series.atr(14), ref_atr(prices, 14), rel_tol=1e-9)
+    assert price_series.volume_trend() == ref_volume_trend(prices, volumes)
+    assert math.isclose(price_series.invalidation_level(), ref_invalidation_level(prices), rel_tol=1e-9)
+
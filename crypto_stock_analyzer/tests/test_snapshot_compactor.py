@@ -0,0 +1,111 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from database import Database
+from snapshot_compactor import SnapshotCompactor
+
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+
+class FailingDatabase:
+    """Base de datos que nunca consigue guardar velas (bloqueada, disco lleno...)"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def insert_snapshot_candles(self, symbol, snapshots, interval='1d'):
+        self.calls.append(symbol)
+        return None
+
+
+def write_snapshot(data_dir, symbol, stamp, price=100.0):
+    filename = f"{symbol}_crypto_{stamp.strftime('%Y%m%d_%H%M%S')}.json"
+    history = [{'timestamp': (stamp - timedelta(days=days)).replace(microsecond=0).isoformat(),
+                'price': price + days, 'volume': 1000.0 + days} for days in range(5, -1, -1)]
+    with open(os.path.join(data_dir, filename), 'w') as f:
+        json.dump({'symbol': symbol, 'current_price': price, 'historical_data': history}, f)
+    return filename
+
+
+def make_archive(data_dir):
+    """Instantáneas de dos activos: recientes, del periodo de muestreo y antiguas"""
+    files = {'keep': [], 'thin': [], 'delete': []}
+    for symbol in ('BTC', 'ETH'):
+        files['keep'].append(write_snapshot(data_dir, symbol, NOW - timedelta(hours=3)))
+        # Dos en el mismo día: se conserva la última
+        files['delete'].append(write_snapshot(data_dir, symbol, datetime(2026, 2, 20, 8, 0, 0)))
+        files['thin'].append(write_snapshot(data_dir, symbol, datetime(2026, 2, 20, 18, 0, 0)))
+        files['delete'].append(write_snapshot(data_dir, symbol, NOW - timedelta(days=60)))
+    return files
+
+
+def test_plan_keeps_recent_thins_one_per_bucket_and_deletes_old(tmp_path):
+    files = make_archive(str(tmp_path))
+    compactor = SnapshotCompactor(data_dir=str(tmp_path), database=FailingDatabase())
+    actions = compactor.plan(compactor.scan(), now=NOW)
+    
+    for action, filenames in files.items():
+        for filename in filenames:
+            assert actions[filename] == action, filename
+
+
+def test_run_once_deletes_only_after_candles_are_stored(tmp_path):
+    data_dir = str(tmp_path)
+    files = make_archive(data_dir)
+    database = Database(db_path=os.path.join(data_dir, 'test.db'))
+    compactor = SnapshotCompactor(data_dir=data_dir, database=database)
+    
+    stats = compactor.run_once(now=NOW)
+    
+    assert stats['failed'] == 0
+    assert stats['deleted'] == len(files['delete'])
+    assert stats['thinned'] == len(files['thin'])
+    for filename in files['delete']:
+        assert not os.path.exists(os.path.join(data_dir, filename))
+    for filename in files['keep'] + files['thin']:
+        assert os.path.exists(os.path.join(data_dir, filename))
+    
+    # Las velas de los archivos borrados están en la base de datos
+    for symbol in ('BTC_crypto', 'ETH_crypto'):
+        stored = {candle['ts'] for candle in database.get_candles(symbol)}
+        old_stamp = NOW - timedelta(days=60)
+        old_ts = int((old_stamp - timedelta(days=5)).timestamp() * 1000)
+        assert old_ts in stored
+        assert len(compactor.load_index(symbol)) == 4
+    database.close()
+
+
+def test_run_once_keeps_files_when_candles_are_not_stored(tmp_path):
+    data_dir = str(tmp_path)
+    make_archive(data_dir)
+    before = sorted(os.listdir(data_dir))
+    database = FailingDatabase()
+    compactor = SnapshotCompactor(data_dir=data_dir, database=database)
+    
+    stats = compactor.run_once(now=NOW)
+    
+    assert sorted(database.calls) == ['BTC_crypto', 'ETH_crypto']
+    assert stats['deleted'] == 0 and stats['thinned'] == 0 and stats['folded'] == 0
+    assert stats['failed'] == 8
+    assert sorted(name for name in os.listdir(data_dir) if name != 'snapshot_index') == before
+    assert compactor.load_index('BTC_crypto') == []
+
+
+def test_run_until_done_reports_every_scanned_file(tmp_path):
+    data_dir = str(tmp_path)
+    make_archive(data_dir)
+    database = Database(db_path=os.path.join(data_dir, 'test.db'))
+    compactor = SnapshotCompactor(data_dir=data_dir, database=database, policy={'max_files_per_run': 3})
+    
+    totals = compactor.run_until_done(now=NOW)
+    
+    assert totals['scanned'] == 8
+    assert totals['folded'] == 8
+    assert totals['deleted'] == 4
+    assert totals['pending'] == 0
+    database.close()
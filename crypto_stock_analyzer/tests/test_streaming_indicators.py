@@ -0,0 +1,130 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+import indicators
+from streaming_indicators import StreamingIndicators
+from test_indicators_parity import assert_same_indicators, guarded, plateau_series, random_walk
+
+DAY_MS = 86400 * 1000
+START_MS = 1700000000000
+
+
+def make_points(prices, volumes, start_ms=START_MS):
+    """Velas diarias [ts_ms, precio, volumen]"""
+    return [[start_ms + i * DAY_MS, price, volume] for i, (price, volume) in enumerate(zip(prices, volumes))]
+
+
+def batch_indicators(state, points, now_ms, live=None):
+    """Cálculo completo sobre las velas de cada ventana (más el punto provisional)"""
+    results = []
+    for window, function in ((state.annual, indicators.calculate_indicators),
+                             (state.monthly, indicators.calculate_monthly_indicators)):
+        cutoff = now_ms - window.days * DAY_MS
+        series = [point for point in points if point[0] >= cutoff] + ([live] if live is not None else [])
+        prices = [point[1] for point in series]
+        results.append((guarded(function, prices, [point[2] for point in series]), prices))
+    return results
+
+
+def assert_matches_batch(state, points, now_ms, live=None):
+    annual, monthly = state.get_indicators(live)
+    (expected_annual, annual_prices), (expected_monthly, monthly_prices) = batch_indicators(state, points, now_ms, live)
+    assert_same_indicators(expected_annual, annual, annual_prices)
+    assert_same_indicators(expected_monthly, monthly, monthly_prices)
+
+
+def series_cases():
+    rng = random.Random(20260301)
+    return [
+        ('random', random_walk(rng, 700, 250.0)),
+        ('plateau', plateau_series(rng, 700)),
+        ('cheap', random_walk(rng, 700, 0.08))
+    ]
+
+
+CASES = series_cases()
+
+
+@pytest.mark.parametrize('name,series', CASES, ids=[name for name, series in CASES])
+def test_push_and_expiry_match_batch(name, series):
+    points = make_points(*series)
+    state = StreamingIndicators()
+    state.rebuild(points[:120], now_ms=points[119][0])
+    
+    # Primero la ventana se llena; a partir de 365 días las velas antiguas empiezan a salir
+    for i in range(120, len(points)):
+        state.push(points[i])
+        now_ms = points[i][0]
+        state.expire(now_ms)
+        if i % 37 == 0 or i == len(points) - 1:
+            assert_matches_batch(state, points[:i + 1], now_ms)
+    assert len(state.annual) == 366
+    assert len(state.monthly) == 31
+
+
+@pytest.mark.parametrize('name,series', CASES, ids=[name for name, series in CASES])
+def test_live_point_matches_batch(name, series):
+    points = make_points(*series)
+    closed, live = points[:-1], points[-1]
+    state = StreamingIndicators()
+    state.rebuild(closed, now_ms=live[0])
+    state.expire(live[0])
+    
+    assert_matches_batch(state, closed, live[0], live)
+    # El punto provisional no modifica el estado
+    assert_matches_batch(state, closed, live[0])
+
+
+@pytest.mark.parametrize('name,series', CASES, ids=[name for name, series in CASES])
+def test_save_load_round_trip_matches_batch(name, series):
+    points = make_points(*series)
+    state = StreamingIndicators()
+    state.rebuild(points[:400], now_ms=points[399][0])
+    for point in points[400:600]:
+        state.push(point)
+        state.expire(point[0])
+    
+    restored = StreamingIndicators()
+    restored.load_dict(state.to_dict(), points, now_ms=points[599][0])
+    
+    assert restored.last_ts == state.last_ts
+    prices = [point[1] for point in points]
+    for expected, actual in zip(state.get_indicators(), restored.get_indicators()):
+        assert_same_indicators(expected, actual, prices)
+    
+    # Ambos siguen avanzando igual que el cálculo completo
+    for point in points[600:]:
+        for current in (state, restored):
+            current.push(point)
+            current.expire(point[0])
+    now_ms = points[-1][0]
+    assert_matches_batch(restored, points, now_ms)
+    for expected, actual in zip(state.get_indicators(), restored.get_indicators()):
+        assert_same_indicators(expected, actual, prices)
+
+
+def test_load_dict_without_history_leaves_state_stale():
+    points = make_points(*random_walk(random.Random(3), 200))
+    state = StreamingIndicators()
+    state.rebuild(points, now_ms=points[-1][0])
+    
+    restored = StreamingIndicators()
+    restored.load_dict(state.to_dict(), points[:150], now_ms=points[-1][0])
+    
+    # El historial no llega al last_ts guardado: el llamador debe reconstruir
+    assert restored.last_ts != state.last_ts
+
+
+def test_flat_prices_give_no_indicators():
+    points = make_points([42.0] * 120, [1.0] * 120)
+    state = StreamingIndicators()
+    state.rebuild(points, now_ms=points[-1][0])
+    
+    assert state.get_indicators() == ({}, {})
+    assert state.get_indicators([points[-1][0] + DAY_MS, 42.0, 1.0]) == ({}, {})
+    assert_matches_batch(state, points, points[-1][0])